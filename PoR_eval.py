@@ -1,34 +1,197 @@
+import argparse
+import sys
+from typing import Dict, Iterator, Optional
 
+import numpy as np
 import pandas as pd
 
 # Configuration
 THRESHOLD = 0.5  # PoR firing threshold (tunable)
+CHUNK_SIZE = 100_000  # rows per chunk in evaluate_por_chunked
+INPUT_COLUMNS = ["question", "Q", "S_q", "t"]
 
-def evaluate_por(file_path):
-    """Evaluate PoR firing from a CSV of Q, S_q, and t values."""
-    df = pd.read_csv(file_path)
 
-    results = []
-    for _, row in df.iterrows():
-        q = row['Q']
-        s_q = row['S_q']
-        t = row['t']
-        question = row['question']
-        E = q * s_q * t
-        fired = E >= THRESHOLD
-        results.append({
-            "question": question,
-            "Q": q,
-            "S_q": s_q,
-            "t": t,
-            "E": round(E, 4),
-            "PoR_fired": "✅" if fired else "❌"
-        })
-
-    result_df = pd.DataFrame(results)
+def round_decimals(values, decimals: int = 4) -> np.ndarray:
+    """Vectorised built-in ``round(value, decimals)`` for float64 arrays.
+
+    ``np.round`` scales by ``10**decimals`` first, and the rounding error of
+    that product decides near-ties such as ``0.00125`` differently from
+    ``round``, which rounds the exact binary value. Here the product with
+    twice the scale is computed exactly (as a sum of two doubles), so every
+    value is compared exactly with the midpoints around its candidate, with
+    exact ties going to the even neighbour just like ``round``.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** decimals
+    result = x.copy()
+    # Values too large to have fractional digits at this scale (and nan/inf) are returned as-is.
+    mask = np.abs(x) * scale < 2.0 ** 52
+    v = x[mask]
+    r = np.rint(v * scale)
+
+    # Exact v * 2 * scale == p + err (Dekker's product; 2 * scale needs no splitting).
+    twice = 2.0 * scale
+    p = v * twice
+    c = 134217729.0 * v  # 2**27 + 1: Veltkamp split of v into two 26-bit halves
+    hi = c - (c - v)
+    lo = v - hi
+    err = (hi * twice - p) + lo * twice
+
+    above = (p - (2.0 * r + 1.0)) + err  # sign of v * scale - (r + 0.5)
+    below = (p - (2.0 * r - 1.0)) + err  # sign of v * scale - (r - 0.5)
+    r = np.where(above > 0, r + 1, r)
+    r = np.where(below < 0, r - 1, r)
+    tie_up = (above == 0) & (r % 2 == 1)
+    tie_down = (below == 0) & (r % 2 == 1)
+    r = np.where(tie_up, r + 1, np.where(tie_down, r - 1, r))
+
+    result[mask] = r / scale
+    return result
+
+
+def _evaluate_frame(df: pd.DataFrame, E: pd.Series, threshold: float = THRESHOLD) -> pd.DataFrame:
+    """Build the result table for ``df`` and its column-wise ``E = Q × S_q × t``."""
+    return pd.DataFrame({
+        "question": df['question'],
+        "Q": df['Q'],
+        "S_q": df['S_q'],
+        "t": df['t'],
+        "E": pd.Series(round_decimals(E.to_numpy(dtype=np.float64), 4), index=E.index),
+        "PoR_fired": np.where(E >= threshold, "✅", "❌"),
+    })
+
+
+def _result_schema(result: pd.DataFrame):
+    """Arrow schema of a result chunk, independent of the dtypes pandas inferred for it.
+
+    Chunks are typed separately, so ``Q`` may read as int64 in one chunk and
+    float64 in the next; numeric columns are always float64 and text columns
+    strings (even when a chunk is empty), so every chunk matches the file.
+    """
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(result, preserve_index=False)
+    types = {"question": pa.string(), "PoR_fired": pa.string()}
+    types.update({name: pa.float64() for name in ("Q", "S_q", "t", "E")})
+    for name, type_ in types.items():
+        schema = schema.set(schema.get_field_index(name), pa.field(name, type_))
+    return schema
+
+
+def evaluate_por(file_path, cache=None):
+    """Evaluate PoR firing from a CSV of Q, S_q, and t values.
+
+    With a ``models.por_cache.ResultCache``, results are keyed by the file's
+    digest, the threshold and this module's source, and a repeated call
+    loads them from the memory-mapped cache entry.
+    """
+    key = None
+    if cache is not None:
+        key = cache.make_key(
+            "PoR_eval.evaluate_por",
+            {"threshold": THRESHOLD},
+            files=[file_path],
+            code=[sys.modules[__name__]],
+        )
+        result_df = cache.get_table(key)
+        if result_df is not None:
+            print(result_df.to_string(index=False))
+            return result_df
+
+    df = pd.read_csv(file_path)
+    result_df = _evaluate_frame(df, df['Q'] * df['S_q'] * df['t'])
+    if key is not None:
+        cache.put_table(key, result_df)
     print(result_df.to_string(index=False))
     return result_df
 
+
+def _read_chunks(file_path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yield the input columns of a CSV or Parquet file ``chunksize`` rows at a time.
+
+    At least one (possibly empty) chunk is yielded, so an input without rows
+    still produces an output file with the result columns.
+    """
+    if file_path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(file_path)
+        empty = True
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=INPUT_COLUMNS):
+            empty = False
+            yield batch.to_pandas()
+        if empty:
+            yield parquet_file.schema_arrow.empty_table().select(INPUT_COLUMNS).to_pandas()
+    else:
+        yield from pd.read_csv(file_path, usecols=INPUT_COLUMNS, chunksize=chunksize)
+
+
+def evaluate_por_chunked(
+    file_path: str,
+    output_file: Optional[str] = None,
+    threshold: float = THRESHOLD,
+    chunksize: int = CHUNK_SIZE,
+    verbose: bool = True,
+) -> Dict[str, float]:
+    """Columnar, chunked variant of :func:`evaluate_por` for large inputs.
+
+    Reads ``file_path`` (CSV or Parquet) ``chunksize`` rows at a time, computes
+    ``E`` and the fired flag vectorised and appends each result chunk to
+    ``output_file`` (CSV, or Parquet row groups for ``.parquet``). Only a
+    summary is kept in memory, returned, and printed when ``verbose``.
+    """
+    rows = fired = 0
+    E_sum, E_min, E_max = 0.0, np.inf, -np.inf
+    writer = None
+    try:
+        for i, chunk in enumerate(_read_chunks(file_path, chunksize)):
+            E = chunk['Q'] * chunk['S_q'] * chunk['t']
+            rows += len(chunk)
+            fired += int((E >= threshold).sum())
+            if len(chunk):
+                E_sum += float(E.sum())
+                E_min = min(E_min, float(E.min()))
+                E_max = max(E_max, float(E.max()))
+
+            if output_file is None:
+                continue
+            result = _evaluate_frame(chunk, E, threshold)
+            if output_file.lower().endswith('.parquet'):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(result, schema=_result_schema(result), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_file, table.schema)
+                writer.write_table(table)
+            else:
+                result.to_csv(output_file, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    summary = {
+        "rows": rows,
+        "fired": fired,
+        "firing_rate": fired / rows if rows else None,
+        "E_mean": E_sum / rows if rows else None,
+        "E_min": E_min if rows else None,
+        "E_max": E_max if rows else None,
+    }
+    if verbose:
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+    return summary
+
+
 if __name__ == "__main__":
-    # Example usage
-    evaluate_por("data/por_eval_sample.csv")
+    parser = argparse.ArgumentParser(description="Evaluate PoR firing from Q, S_q and t values")
+    parser.add_argument("--input", "-i", default="data/por_eval_sample.csv", help="Input CSV or Parquet file")
+    parser.add_argument("--output", "-o", default=None, help="Output CSV or Parquet file (chunked mode)")
+    parser.add_argument("--chunksize", type=int, default=None, help="Evaluate in chunks of this many rows")
+    args = parser.parse_args()
+
+    if args.chunksize or args.output:
+        evaluate_por_chunked(args.input, args.output, chunksize=args.chunksize or CHUNK_SIZE)
+    else:
+        evaluate_por(args.input)
@@ -11,7 +11,7 @@ SRC_ROOT = PROJECT_ROOT / "src"
 if str(SRC_ROOT) not in sys.path:
     sys.path.insert(0, str(SRC_ROOT))
 
-from unconscious_gravity_exp.logger import append_log  # noqa: E402
+from unconscious_gravity_exp.logger import TurnLogWriter  # noqa: E402
 from unconscious_gravity_exp.proxy_config import TurnLog  # noqa: E402
 
 
@@ -31,18 +31,19 @@ def main() -> None:
     out_file = args.out
     out_file.parent.mkdir(parents=True, exist_ok=True)
 
-    for i in range(1, 11):
-        turn = TurnLog(
-            TurnId=i,
-            Prompt=f"User prompt {i}",
-            Response=f"AI response {i}",
-            Q_self=random.random(),
-            S_q=random.random(),
-            t_total=random.randint(50, 500),
-            M=random.random(),
-        )
-        append_log(turn, file=str(out_file))
-        print(f"[{i}] wrote: {out_file}")
+    with TurnLogWriter(str(out_file)) as writer:
+        for i in range(1, 11):
+            turn = TurnLog(
+                TurnId=i,
+                Prompt=f"User prompt {i}",
+                Response=f"AI response {i}",
+                Q_self=random.random(),
+                S_q=random.random(),
+                t_total=random.randint(50, 500),
+                M=random.random(),
+            )
+            writer.append(turn)
+            print(f"[{i}] wrote: {out_file}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,236 @@
+"""Content-addressed on-disk cache for simulation and evaluation results.
+
+Entries are keyed by a SHA-256 over the call parameters, the digests of any
+input files and the source code of the functions that produced them, so a
+changed input or a code change never returns a stale result. Arrays are
+stored as ``.npy`` and tables as Arrow IPC files, and both are memory-mapped
+on a hit instead of being re-read or recomputed; small JSON documents (such
+as API responses) are stored as ``.json``. The store is capped in size
+and evicts least-recently-used entries. The total size is tracked as
+entries are written, so the directory is only scanned when the cap is
+exceeded.
+"""
+import hashlib
+import inspect
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".por_cache"
+DEFAULT_MAX_BYTES = 1 << 30  # 1 GiB
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_digest(*objects: Any) -> str:
+    """SHA-256 over the source of modules/classes/functions (the "code version")."""
+    digest = hashlib.sha256()
+    for obj in objects:
+        try:
+            digest.update(inspect.getsource(obj).encode("utf-8"))
+        except (OSError, TypeError):
+            digest.update(repr(obj).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Size-capped, LRU-evicted store of arrays and tables keyed by content hash."""
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """
+        :param root: Cache directory (created on demand).
+        :param max_bytes: Total size above which least-recently-used entries are evicted.
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Running estimate of size(); other processes sharing ``root`` are only
+        # accounted for when eviction rescans the directory.
+        self._size: Optional[int] = None
+        self._size_lock = threading.Lock()
+
+    def make_key(
+        self,
+        namespace: str,
+        params: Dict[str, Any],
+        files: Iterable[str] = (),
+        code: Iterable[Any] = (),
+    ) -> str:
+        """Hash ``params``, the contents of ``files`` and the source of ``code`` into a key."""
+        payload = {
+            "namespace": namespace,
+            "params": params,
+            "files": [file_digest(str(path)) for path in files],
+            "code": code_digest(*code),
+        }
+        blob = json.dumps(payload, sort_keys=True, default=repr).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def _hit(self, path: Path) -> bool:
+        """Return whether ``path`` exists, refreshing its LRU timestamp if so."""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        logger.info("Cache hit: %s", path.name)
+        return True
+
+    def temp_path(self, suffix: str) -> str:
+        """Fresh path inside the cache directory for writing an entry before :meth:`commit`."""
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.root)
+        os.close(fd)
+        return path
+
+    def commit(self, key: str, temp_path: str, suffix: str) -> Path:
+        """Atomically move a fully written ``temp_path`` into place as ``key``, evicting if over the cap."""
+        path = self._path(key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        added = os.path.getsize(temp_path) - self._file_size(path)
+        os.replace(temp_path, path)
+        with self._size_lock:
+            if self._size is None:
+                self._size = self.size()
+            else:
+                self._size += added
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+        return path
+
+    @staticmethod
+    def _file_size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def get_array(self, key: str) -> Optional[np.ndarray]:
+        """Read-only memory map of a cached array, or ``None`` on a miss."""
+        path = self._path(key, ".npy")
+        if not self._hit(path):
+            return None
+        try:
+            return np.load(path, mmap_mode="r")
+        except FileNotFoundError:  # evicted between the hit and the read
+            return None
+
+    def put_array(self, key: str, array: np.ndarray) -> Path:
+        """Store ``array`` under ``key``."""
+        temp = self.temp_path(".npy")
+        np.save(temp, np.asarray(array))
+        return self.commit(key, temp, ".npy")
+
+    def get_table(self, key: str) -> Optional[pd.DataFrame]:
+        """Cached table read from a memory-mapped Arrow IPC file, or ``None`` on a miss."""
+        path = self._path(key, ".arrow")
+        if not self._hit(path):
+            return None
+        import pyarrow as pa
+
+        try:
+            source = pa.memory_map(str(path), "r")
+        except FileNotFoundError:  # evicted between the hit and the read
+            return None
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+    def put_table(self, key: str, df: pd.DataFrame) -> Path:
+        """Store ``df`` under ``key`` as an Arrow IPC file."""
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        temp = self.temp_path(".arrow")
+        with pa.OSFile(temp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return self.commit(key, temp, ".arrow")
+
+    def get_json(self, key: str) -> Optional[Any]:
+        """Cached JSON document, or ``None`` on a miss."""
+        path = self._path(key, ".json")
+        if not self._hit(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:  # evicted between the hit and the read
+            return None
+
+    def put_json(self, key: str, value: Any) -> Path:
+        """Store a JSON-serialisable ``value`` under ``key``."""
+        temp = self.temp_path(".json")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        return self.commit(key, temp, ".json")
+
+    def discard(self, key: str, suffix: str) -> None:
+        """Remove the entry stored under ``key`` with ``suffix``, if any."""
+        path = self._path(key, suffix)
+        size = self._file_size(path)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._size_lock:
+            if self._size is not None:
+                self._size -= size
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        """``(mtime, size, path)`` of committed entries, skipping any removed while listing."""
+        entries = []
+        for path in self.root.glob("*/*"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        """Total bytes of committed entries."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """Remove least-recently-used entries until the store fits in ``max_bytes``."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                logger.info("Evicted cache entry %s", path.name)
+            except FileNotFoundError:
+                continue
+        with self._size_lock:
+            self._size = total
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        for _, _, path in self._entries():
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        with self._size_lock:
+            self._size = 0
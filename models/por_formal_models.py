@@ -3,6 +3,8 @@
 import math
 from typing import List, Optional
 
+import numpy as np
+
 class PoRModel:
     """Core PoR (Point of Resonance) model calculations."""
 
@@ -35,6 +37,12 @@ class PoRModel:
         """Collapse frequency: λ · exp(−λ t)"""
         return lam * math.exp(-lam * t)
 
+    @staticmethod
+    def por_collapse_frequency_array(lam: np.ndarray, t: np.ndarray) -> np.ndarray:
+        """Element-wise collapse frequency λ · exp(−λ t) over arrays"""
+        lam = np.asarray(lam, dtype=float)
+        return lam * np.exp(-lam * np.asarray(t, dtype=float))
+
     @staticmethod
     def phase_gradient(
         E: float,
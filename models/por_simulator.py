@@ -1,13 +1,69 @@
+import os
 import random
+import sys
 import numpy as np
-import pandas as pd
 import logging
-from typing import Tuple, Optional, Callable
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple, Optional, Callable, Iterator, List, Iterable
 from tqdm import tqdm
 from models.por_formal_models import PoRModel
+from models.por_summary import PoRSummary
+from models.por_sinks import NpySink, open_sink
+from models.por_cache import ResultCache
 
 logger = logging.getLogger(__name__)
 
+# Default number of samples generated per chunk in chunked/parallel modes.
+# The chunk layout (not the worker count) determines the random streams, so
+# changing this value changes the results for a given seed.
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _chunk_sizes(n: int, chunk_size: int) -> List[int]:
+    """Split ``n`` samples into consecutive chunks of at most ``chunk_size``."""
+    if n < 0:
+        raise ValueError(f"n must be non-negative: {n}")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive: {chunk_size}")
+    full, rest = divmod(n, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
+def _sample_and_evaluate(
+    model: PoRModel,
+    rng: np.random.Generator,
+    size: int,
+    q_range: Tuple[float, float],
+    s_range: Tuple[float, float],
+    t_range: Tuple[float, float],
+    distribution: str,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Draw ``size`` samples from ``rng`` and compute ``E`` vectorised."""
+    draw = getattr(rng, distribution)
+    q = draw(q_range[0], q_range[1], size=size)
+    s = draw(s_range[0], s_range[1], size=size)
+    t = draw(t_range[0], t_range[1], size=size)
+    results = np.asarray(model.existence(q, s, t), dtype=float)
+    return np.column_stack([q, s, t]), results
+
+
+def _simulate_chunk(
+    model: PoRModel,
+    seed_seq: np.random.SeedSequence,
+    size: int,
+    q_range: Tuple[float, float],
+    s_range: Tuple[float, float],
+    t_range: Tuple[float, float],
+    distribution: str,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Sample one chunk with its own generator and compute ``E`` vectorised.
+
+    Module-level so that it can be pickled for a process pool.
+    """
+    rng = np.random.default_rng(seed_seq)
+    return _sample_and_evaluate(model, rng, size, q_range, s_range, t_range, distribution)
+
 
 class PoRSimulator:
     """Monte Carlo simulator for PoR (Point of Resonance)."""
@@ -15,6 +71,7 @@ class PoRSimulator:
     def __init__(self, model: PoRModel = PoRModel, seed: Optional[int] = None) -> None:
         """Initialize simulator with a PoR model and optional random seed."""
         self.model = model
+        self.seed = seed
         if seed is not None:
             random.seed(seed)
             np.random.seed(seed)
@@ -77,9 +134,8 @@ class PoRSimulator:
                 results[i] = np.nan
 
         if output_file:
-            df = pd.DataFrame({"Q": samples[:, 0], "S_q": samples[:, 1], "t": samples[:, 2], "E": results})
-            df.to_csv(output_file, index=False)
-            logger.info("Results saved to %s", output_file)
+            with open_sink(output_file, n) as sink:
+                sink.write(samples, results)
 
         return results
 
@@ -98,3 +154,195 @@ class PoRSimulator:
         results = self.run(samples, output_file)
         logger.info("Simulation completed")
         return results
+
+    def _chunk_seed(self, root: np.random.SeedSequence, index: int) -> np.random.SeedSequence:
+        """Return the ``index``-th child of ``root`` (same as ``root.spawn``) without spawning all of them."""
+        return np.random.SeedSequence(
+            root.entropy,
+            spawn_key=root.spawn_key + (index,),
+            pool_size=root.pool_size,
+        )
+
+    def simulate_chunk(
+        self,
+        rng: np.random.Generator,
+        size: int,
+        q_range: Tuple[float, float] = (0.0, 1.0),
+        s_range: Tuple[float, float] = (0.0, 1.0),
+        t_range: Tuple[float, float] = (0.0, 1.0),
+        distribution: str = "uniform",
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Draw ``size`` samples from the caller's ``rng`` and return ``(samples, E)``."""
+        self.validate_range(q_range, "Q")
+        self.validate_range(s_range, "S_q")
+        self.validate_range(t_range, "t")
+        return _sample_and_evaluate(self.model, rng, size, q_range, s_range, t_range, distribution)
+
+    def iter_chunks(
+        self,
+        n: int = 1000,
+        q_range: Tuple[float, float] = (0.0, 1.0),
+        s_range: Tuple[float, float] = (0.0, 1.0),
+        t_range: Tuple[float, float] = (0.0, 1.0),
+        distribution: str = "uniform",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        n_workers: int = 1,
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield ``(samples, E)`` chunk by chunk, in order.
+
+        Chunk ``i`` draws from its own ``np.random.Generator`` seeded with the
+        ``i``-th child of ``SeedSequence(self.seed)``, so the output depends only
+        on the seed, ``n`` and ``chunk_size`` — never on ``n_workers`` — and the
+        global ``random``/``np.random`` state is left untouched.
+
+        ``distribution`` names a ``np.random.Generator`` method taking
+        ``(low, high, size=...)`` such as ``"uniform"``.
+        """
+        self.validate_range(q_range, "Q")
+        self.validate_range(s_range, "S_q")
+        self.validate_range(t_range, "t")
+        if n_workers < 1:
+            raise ValueError(f"n_workers must be positive: {n_workers}")
+        if not hasattr(np.random.Generator, distribution):
+            raise ValueError(f"Unknown Generator distribution: {distribution}")
+
+        root = np.random.SeedSequence(self.seed)
+        sizes = _chunk_sizes(n, chunk_size)
+        args = (
+            (self.model, self._chunk_seed(root, i), size, q_range, s_range, t_range, distribution)
+            for i, size in enumerate(sizes)
+        )
+
+        if n_workers == 1 or len(sizes) <= 1:
+            for chunk_args in args:
+                yield _simulate_chunk(*chunk_args)
+            return
+
+        # Keep a bounded window of in-flight chunks so memory does not grow with n.
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            pending: deque = deque()
+            for chunk_args in args:
+                pending.append(executor.submit(_simulate_chunk, *chunk_args))
+                if len(pending) >= 2 * n_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def simulate_distribution_parallel(
+        self,
+        n: int = 1000,
+        q_range: Tuple[float, float] = (0.0, 1.0),
+        s_range: Tuple[float, float] = (0.0, 1.0),
+        t_range: Tuple[float, float] = (0.0, 1.0),
+        distribution: str = "uniform",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        n_workers: int = 1,
+        output_file: Optional[str] = None,
+        cache: Optional[ResultCache] = None,
+    ) -> np.ndarray:
+        """Chunked, reproducible variant of :meth:`simulate_distribution`.
+
+        Chunks are spread over a process pool of ``n_workers``; results are
+        bit-identical for a given seed whatever the number of workers. Only
+        ``E`` is kept in memory; samples go straight to ``output_file``.
+
+        With a ``cache`` and a fixed seed, the ``(n, 4)`` result is stored
+        under a hash of the arguments, seed and code; a repeated call returns
+        a read-only memory-mapped ``E`` column instead of recomputing.
+        """
+        logger.info(
+            "Starting parallel simulation: n=%s, chunk_size=%s, n_workers=%s",
+            n,
+            chunk_size,
+            n_workers,
+        )
+        cache_key = None
+        if cache is not None and self.seed is not None:
+            cache_key = cache.make_key(
+                "PoRSimulator.simulate_distribution_parallel",
+                {
+                    "n": n,
+                    "q_range": list(q_range),
+                    "s_range": list(s_range),
+                    "t_range": list(t_range),
+                    "distribution": distribution,
+                    "chunk_size": chunk_size,
+                    "seed": self.seed,
+                    "model": repr(self.model),
+                },
+                code=(sys.modules[__name__], self.model),
+            )
+            cached = cache.get_array(cache_key)
+            if cached is not None:
+                if output_file:
+                    with open_sink(output_file, n) as sink:
+                        for start in range(0, n, chunk_size):
+                            block = cached[start:start + chunk_size]
+                            sink.write(block[:, :3], block[:, 3])
+                return cached[:, 3]
+
+        results = np.empty(n)
+        sinks = [open_sink(output_file, n)] if output_file else []
+        cache_temp = cache.temp_path(".npy") if cache_key else None
+        if cache_temp:
+            sinks.append(NpySink(cache_temp, n))
+        offset = 0
+        completed = False
+        try:
+            for samples, chunk in self.iter_chunks(
+                n, q_range, s_range, t_range, distribution, chunk_size, n_workers
+            ):
+                results[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+                for sink in sinks:
+                    sink.write(samples, chunk)
+            completed = True
+        finally:
+            for sink in sinks:
+                sink.close()
+            if cache_temp and not completed:
+                os.remove(cache_temp)
+
+        if cache_temp:
+            cache.commit(cache_key, cache_temp, ".npy")
+        logger.info("Parallel simulation completed")
+        return results
+
+    def simulate_stream(
+        self,
+        n: int = 1000,
+        q_range: Tuple[float, float] = (0.0, 1.0),
+        s_range: Tuple[float, float] = (0.0, 1.0),
+        t_range: Tuple[float, float] = (0.0, 1.0),
+        distribution: str = "uniform",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        n_workers: int = 1,
+        thresholds: Iterable[float] = (0.5,),
+        bins: int = 1024,
+        output_file: Optional[str] = None,
+    ) -> PoRSummary:
+        """Out-of-core simulation returning running summary statistics.
+
+        Only one chunk (plus the pool's in-flight window) is held in memory at
+        a time, so ``n`` is not limited by RAM. When ``output_file`` is given
+        the raw samples are written to it chunk by chunk through the sink
+        matching its suffix (see :func:`models.por_sinks.open_sink`). The
+        chunks are the same as in :meth:`simulate_distribution_parallel` for
+        equal arguments.
+        """
+        logger.info("Starting streaming simulation: n=%s, chunk_size=%s", n, chunk_size)
+        summary = PoRSummary.for_ranges(q_range, s_range, t_range, bins=bins, thresholds=thresholds)
+        sink = open_sink(output_file, n) if output_file else None
+        try:
+            for samples, results in self.iter_chunks(
+                n, q_range, s_range, t_range, distribution, chunk_size, n_workers
+            ):
+                summary.update(results)
+                if sink:
+                    sink.write(samples, results)
+        finally:
+            if sink:
+                sink.close()
+
+        logger.info("Streaming simulation completed: %s samples", summary.count)
+        return summary
@@ -0,0 +1,172 @@
+"""Chunked output sinks for PoRSimulator results.
+
+Every sink receives ``(samples, E)`` chunk by chunk so results never have to
+be materialised as a single DataFrame. The sink is chosen from the output
+file suffix by :func:`open_sink`; :func:`load_results` maps binary outputs
+back without parsing.
+"""
+import os
+import logging
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("Q", "S_q", "t", "E")
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:  # pragma: no cover - optional dependency
+        raise ImportError("pyarrow is required for Parquet/Arrow output: pip install pyarrow") from e
+    return pa
+
+
+class ResultSink:
+    """Base class: write ``(samples, E)`` chunks, then :meth:`close`."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.rows_written = 0
+
+    def write(self, samples: np.ndarray, results: np.ndarray) -> None:
+        """Append one chunk of ``n×3`` samples and their ``E`` values."""
+        self._write(samples, results)
+        self.rows_written += len(results)
+
+    def _write(self, samples: np.ndarray, results: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Flush and finalise the output file."""
+        logger.info("Results saved to %s (%s rows)", self.path, self.rows_written)
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CSVSink(ResultSink):
+    """Plain CSV, appended chunk by chunk (the historical format)."""
+
+    def _write(self, samples: np.ndarray, results: np.ndarray) -> None:
+        df = pd.DataFrame({"Q": samples[:, 0], "S_q": samples[:, 1], "t": samples[:, 2], "E": results})
+        first = self.rows_written == 0
+        df.to_csv(self.path, mode="w" if first else "a", header=first, index=False)
+
+    def close(self) -> None:
+        if self.rows_written == 0:
+            pd.DataFrame(columns=list(COLUMNS)).to_csv(self.path, index=False)
+        super().close()
+
+
+class NpySink(ResultSink):
+    """``.npy`` file of shape ``(n, 4)`` (columns ``Q, S_q, t, E``) written through a memory map.
+
+    The total row count must be known up front.
+    """
+
+    def __init__(self, path: str, n: int) -> None:
+        super().__init__(path)
+        self._mmap = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(n, len(COLUMNS)))
+
+    def _write(self, samples: np.ndarray, results: np.ndarray) -> None:
+        start, stop = self.rows_written, self.rows_written + len(results)
+        self._mmap[start:stop, :3] = samples
+        self._mmap[start:stop, 3] = results
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap = None
+        super().close()
+
+
+class ParquetSink(ResultSink):
+    """Parquet file with one row group per chunk."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        pa = _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([(c, pa.float64()) for c in COLUMNS])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def _write(self, samples: np.ndarray, results: np.ndarray) -> None:
+        arrays = [self._pa.array(samples[:, i]) for i in range(3)] + [self._pa.array(results)]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        super().close()
+
+
+class ArrowIPCSink(ResultSink):
+    """Arrow IPC (Feather v2) file with one record batch per chunk."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        pa = _require_pyarrow()
+        self._pa = pa
+        self._schema = pa.schema([(c, pa.float64()) for c in COLUMNS])
+        self._sink = pa.OSFile(path, "wb")
+        self._writer = pa.ipc.new_file(self._sink, self._schema)
+
+    def _write(self, samples: np.ndarray, results: np.ndarray) -> None:
+        arrays = [self._pa.array(samples[:, i]) for i in range(3)] + [self._pa.array(results)]
+        self._writer.write_batch(self._pa.RecordBatch.from_arrays(arrays, schema=self._schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = None
+        super().close()
+
+
+def open_sink(path: str, n: Optional[int] = None) -> ResultSink:
+    """Pick a sink from the suffix of ``path`` (``.npy``, ``.parquet``, ``.arrow``; anything else is CSV).
+
+    ``n`` (the total row count) is required for ``.npy`` output.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".npy":
+        if n is None:
+            raise ValueError(".npy output needs the total number of rows up front")
+        return NpySink(path, n)
+    if suffix == ".parquet":
+        return ParquetSink(path)
+    if suffix in ARROW_SUFFIXES:
+        return ArrowIPCSink(path)
+    return CSVSink(path)
+
+
+def load_results(path: str) -> Any:
+    """Load simulator output written by a sink.
+
+    ``.npy`` comes back as a read-only ``(n, 4)`` memmap and Arrow IPC as a
+    zero-copy ``pyarrow.Table`` over a memory-mapped file; Parquet is read
+    through a memory map and CSV is parsed into a DataFrame.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".npy":
+        return np.load(path, mmap_mode="r")
+    if suffix == ".parquet":
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, memory_map=True)
+    if suffix in ARROW_SUFFIXES:
+        pa = _require_pyarrow()
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return pd.read_csv(path)
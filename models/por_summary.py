@@ -0,0 +1,156 @@
+import numpy as np
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class PoRSummary:
+    """Running summary statistics of an ``E`` stream in constant memory.
+
+    Keeps count/mean/variance (Chan et al. parallel update), min/max, a
+    fixed-bin histogram over ``value_range``, firing counts at each threshold
+    and histogram-based approximate quantiles. Summaries built over disjoint
+    chunks can be combined with :meth:`merge`.
+    """
+
+    def __init__(
+        self,
+        bins: int = 1024,
+        value_range: Tuple[float, float] = (0.0, 1.0),
+        thresholds: Iterable[float] = (0.5,),
+    ) -> None:
+        """Create an empty summary with ``bins`` histogram bins over ``value_range``."""
+        if bins < 1:
+            raise ValueError(f"bins must be positive: {bins}")
+        if value_range[0] >= value_range[1]:
+            raise ValueError(f"value_range min must < max: {value_range}")
+        self.value_range = (float(value_range[0]), float(value_range[1]))
+        self.bin_edges = np.linspace(self.value_range[0], self.value_range[1], bins + 1)
+        self.hist = np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+        self.thresholds = np.array(sorted(thresholds), dtype=float)
+        self.fired = np.zeros(len(self.thresholds), dtype=np.int64)
+        self.count = 0
+        self.nan_count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray) -> None:
+        """Fold a chunk of ``E`` values into the summary. NaNs are only counted."""
+        values = np.asarray(values, dtype=float).ravel()
+        nan_mask = np.isnan(values)
+        self.nan_count += int(nan_mask.sum())
+        values = values[~nan_mask]
+        n = len(values)
+        if n == 0:
+            return
+
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+        self._combine(n, chunk_mean, chunk_m2)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        lo, hi = self.value_range
+        self.underflow += int((values < lo).sum())
+        self.overflow += int((values > hi).sum())
+        self.hist += np.histogram(values, bins=self.bin_edges)[0]
+
+        # Sorting once lets every threshold be counted with a binary search.
+        ordered = np.sort(values)
+        self.fired += n - np.searchsorted(ordered, self.thresholds, side="left")
+
+    def _combine(self, n: int, mean: float, m2: float) -> None:
+        """Combine running moments with those of another batch."""
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    def merge(self, other: "PoRSummary") -> "PoRSummary":
+        """Merge ``other`` (same bins, range and thresholds) into this summary."""
+        if not np.array_equal(self.bin_edges, other.bin_edges) or not np.array_equal(
+            self.thresholds, other.thresholds
+        ):
+            raise ValueError("Cannot merge summaries with different bins or thresholds")
+        self.nan_count += other.nan_count
+        if other.count:
+            self._combine(other.count, other.mean, other._m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.hist += other.hist
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self.fired += other.fired
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Population variance (``ddof=0``) of the values seen so far."""
+        return self._m2 / self.count if self.count else float("nan")
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation of the values seen so far."""
+        return float(np.sqrt(self.variance))
+
+    def firing_rate(self) -> Dict[float, float]:
+        """Fraction of values ``>= threshold`` for each configured threshold."""
+        if not self.count:
+            return {float(th): float("nan") for th in self.thresholds}
+        return {float(th): int(c) / self.count for th, c in zip(self.thresholds, self.fired)}
+
+    def quantile(self, q: float) -> float:
+        """Approximate ``q``-quantile, interpolated linearly inside histogram bins.
+
+        The error is at most one bin width for values inside ``value_range``;
+        values outside the range are clamped to the observed min/max.
+        """
+        if not 0.0 <= q <= 1.0:
+            raise ValueError(f"q must be in [0, 1]: {q}")
+        if not self.count:
+            return float("nan")
+        target = q * self.count
+        if target <= self.underflow:
+            return self.min if self.underflow else self.value_range[0]
+        if target >= self.count - self.overflow:
+            return self.max if self.overflow else self.value_range[1]
+
+        cum = self.underflow + np.cumsum(self.hist)
+        i = int(np.searchsorted(cum, target, side="left"))
+        prev = cum[i - 1] if i > 0 else self.underflow
+        frac = (target - prev) / self.hist[i] if self.hist[i] else 0.0
+        value = self.bin_edges[i] + frac * (self.bin_edges[i + 1] - self.bin_edges[i])
+        return float(min(max(value, self.min), self.max))
+
+    def to_dict(self, quantiles: Iterable[float] = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)) -> Dict:
+        """Plain-``dict`` view of the summary, e.g. for logging or JSON output."""
+        return {
+            "count": self.count,
+            "nan_count": self.nan_count,
+            "mean": self.mean if self.count else None,
+            "variance": self.variance if self.count else None,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "firing_rate": self.firing_rate(),
+            "quantiles": {float(q): self.quantile(q) for q in quantiles},
+        }
+
+    @classmethod
+    def for_ranges(
+        cls,
+        q_range: Tuple[float, float],
+        s_range: Tuple[float, float],
+        t_range: Tuple[float, float],
+        bins: int = 1024,
+        thresholds: Iterable[float] = (0.5,),
+        value_range: Optional[Tuple[float, float]] = None,
+    ) -> "PoRSummary":
+        """Summary whose histogram spans the reachable ``E = Q × S_q × t`` range."""
+        if value_range is None:
+            lo = q_range[0] * s_range[0] * t_range[0]
+            hi = q_range[1] * s_range[1] * t_range[1]
+            value_range = (lo, hi if hi > lo else lo + 1.0)
+        return cls(bins=bins, value_range=value_range, thresholds=thresholds)
@@ -9,9 +9,13 @@ setup(
     install_requires=[
         "numpy",
         "pandas",
+        "pyarrow",
         "tqdm",
         "transformers",
     ],
+    extras_require={
+        "fast-json": ["orjson"],
+    },
     python_requires=">=3.10",
     entry_points={
         "console_scripts": [
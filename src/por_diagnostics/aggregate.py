@@ -0,0 +1,216 @@
+# por_diagnostics/aggregate.py
+"""
+Running, mergeable aggregates over PoR log entries.
+
+Entries are folded in one at a time, so diagnostics need memory independent
+of the number of entries, and partial aggregates computed over different
+files can be merged. Latency percentiles come from a :class:`QuantileSketch`
+and per-minute/per-hour metrics from time buckets keyed on the entry
+``timestamp``.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from .sketch import QuantileSketch
+
+PERCENTILES = (0.5, 0.95, 0.99)
+BUCKET_FORMATS = {
+    'minute': '%Y-%m-%dT%H:%M',
+    'hour': '%Y-%m-%dT%H:00',
+}
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """
+    Parse an ISO-8601 string or epoch seconds; ``None`` if unusable.
+
+    A trailing ``Z`` is accepted, and timestamps with an offset are
+    converted to UTC so that entries from different zones share buckets.
+    """
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return datetime.fromtimestamp(value, timezone.utc)
+        if isinstance(value, str):
+            if value.endswith(('Z', 'z')):
+                value = value[:-1] + '+00:00'
+            timestamp = datetime.fromisoformat(value)
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone(timezone.utc)
+            return timestamp
+    except (ValueError, OverflowError, OSError):
+        pass
+    return None
+
+
+def _latency_metrics(sketch: QuantileSketch, prefix: str = 'latency') -> Dict[str, Any]:
+    metrics = {
+        f"{prefix}_p{round(q * 100)}_ms": sketch.quantile(q) for q in PERCENTILES
+    }
+    metrics[f"{prefix}_max_ms"] = sketch.max
+    return metrics
+
+
+class TimeBucket:
+    """
+    Counts and latency sketch for one time window.
+    """
+    def __init__(self):
+        self.count = 0
+        self.error_count = 0
+        self.latency = QuantileSketch()
+
+    def merge(self, other: "TimeBucket") -> None:
+        self.count += other.count
+        self.error_count += other.error_count
+        self.latency.merge(other.latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'error_count': self.error_count,
+            'latency': self.latency.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "TimeBucket":
+        bucket = cls()
+        bucket.count = state['count']
+        bucket.error_count = state['error_count']
+        bucket.latency = QuantileSketch.from_dict(state['latency'])
+        return bucket
+
+    def to_metrics(self, start: str) -> Dict[str, Any]:
+        return {
+            'start': start,
+            'count': self.count,
+            'error_count': self.error_count,
+            **_latency_metrics(self.latency),
+        }
+
+
+class LogAggregate:
+    """
+    Running counts behind the PoR diagnostic metrics.
+    """
+    def __init__(self):
+        self.total_entries = 0
+        self.error_count = 0
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.timestamp_errors = 0
+        self.latency = QuantileSketch()
+        self.buckets: Dict[str, Dict[str, TimeBucket]] = {
+            resolution: {} for resolution in BUCKET_FORMATS
+        }
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        """
+        Fold a single log entry into the aggregate.
+        """
+        self.total_entries += 1
+        is_error = entry.get('status') != 'ok'
+        if is_error:
+            self.error_count += 1
+        latency = entry.get('latency_ms')
+        if 'latency_ms' in entry:
+            self.latency_sum += latency
+            self.latency_count += 1
+            self.latency.add(latency)
+
+        timestamp = _parse_timestamp(entry.get('timestamp'))
+        if timestamp is None:
+            if entry.get('timestamp') is not None:
+                self.timestamp_errors += 1
+            return
+        for resolution, fmt in BUCKET_FORMATS.items():
+            key = timestamp.strftime(fmt)
+            bucket = self.buckets[resolution].get(key)
+            if bucket is None:
+                bucket = self.buckets[resolution][key] = TimeBucket()
+            bucket.count += 1
+            bucket.error_count += is_error
+            if 'latency_ms' in entry:
+                bucket.latency.add(latency)
+
+    def merge(self, other: "LogAggregate") -> "LogAggregate":
+        """
+        Merge another partial aggregate into this one and return self.
+        """
+        self.total_entries += other.total_entries
+        self.error_count += other.error_count
+        self.latency_sum += other.latency_sum
+        self.latency_count += other.latency_count
+        self.timestamp_errors += other.timestamp_errors
+        self.latency.merge(other.latency)
+        for resolution, buckets in other.buckets.items():
+            mine = self.buckets[resolution]
+            for key, bucket in buckets.items():
+                if key in mine:
+                    mine[key].merge(bucket)
+                else:
+                    mine[key] = TimeBucket.from_dict(bucket.to_dict())
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON-serialisable state, e.g. for caching in a manifest.
+        """
+        return {
+            'total_entries': self.total_entries,
+            'error_count': self.error_count,
+            'latency_sum': self.latency_sum,
+            'latency_count': self.latency_count,
+            'timestamp_errors': self.timestamp_errors,
+            'latency': self.latency.to_dict(),
+            'buckets': {
+                resolution: {key: bucket.to_dict() for key, bucket in buckets.items()}
+                for resolution, buckets in self.buckets.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "LogAggregate":
+        """
+        Rebuild an aggregate from :meth:`to_dict` output.
+        """
+        aggregate = cls()
+        aggregate.total_entries = state['total_entries']
+        aggregate.error_count = state['error_count']
+        aggregate.latency_sum = state['latency_sum']
+        aggregate.latency_count = state['latency_count']
+        aggregate.timestamp_errors = state['timestamp_errors']
+        aggregate.latency = QuantileSketch.from_dict(state['latency'])
+        for resolution, buckets in state['buckets'].items():
+            aggregate.buckets[resolution] = {
+                key: TimeBucket.from_dict(bucket) for key, bucket in buckets.items()
+            }
+        return aggregate
+
+    def to_metrics(self) -> Dict[str, Any]:
+        """
+        Metrics in the format returned by ``PoRDiagnostic.analyze_logs``.
+        """
+        metrics: Dict[str, Any] = {
+            'total_entries': self.total_entries,
+            'error_count': self.error_count,
+            'timestamp_errors': self.timestamp_errors,
+        }
+        if self.latency_count:
+            metrics['average_latency_ms'] = self.latency_sum / self.latency_count
+        else:
+            metrics['average_latency_ms'] = None
+
+        if self.total_entries > 0:
+            metrics['success_rate'] = (
+                (self.total_entries - self.error_count) / self.total_entries
+            )
+        else:
+            metrics['success_rate'] = None
+
+        metrics.update(_latency_metrics(self.latency))
+        for resolution, buckets in self.buckets.items():
+            series: List[Dict[str, Any]] = [
+                buckets[key].to_metrics(key) for key in sorted(buckets)
+            ]
+            metrics[f'per_{resolution}'] = series
+        return metrics
@@ -9,15 +9,30 @@ def main():
     )
     parser.add_argument(
         "-l", "--log-dir", type=Path, required=True,
-        help="Directory containing PoR JSON logs"
+        help="Directory containing PoR JSON/JSONL logs"
     )
     parser.add_argument(
         "-o", "--out-dir", type=Path, required=True,
         help="Directory to write the markdown report"
     )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1,
+        help="Parallel reader/parser workers (1 = sequential streaming)"
+    )
+    parser.add_argument(
+        "-i", "--incremental", action="store_true",
+        help="Only re-read new or changed log files, using a processed-file manifest"
+    )
+    parser.add_argument(
+        "--manifest", type=Path, default=None,
+        help="Manifest path for --incremental (default: <out-dir>/.por_manifest.json)"
+    )
     args = parser.parse_args()
     args.out_dir.mkdir(parents=True, exist_ok=True)
-    PoRDiagnostic(args.log_dir).run(args.out_dir)
+    manifest = None
+    if args.incremental or args.manifest:
+        manifest = args.manifest or args.out_dir / ".por_manifest.json"
+    PoRDiagnostic(args.log_dir).run(args.out_dir, workers=args.workers, manifest_path=manifest)
 
 if __name__ == "__main__":
     main()
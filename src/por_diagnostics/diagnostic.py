@@ -6,7 +6,22 @@ Provides utilities to parse PoR logs, evaluate quality metrics, and generate mar
 """
 import json
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+
+from .aggregate import LogAggregate
+from .manifest import Manifest
+from .parallel import aggregate_files_parallel, aggregate_parallel, json_loads
+
+LATENCY_LABELS = (
+    ('p50', 'latency_p50_ms'),
+    ('p95', 'latency_p95_ms'),
+    ('p99', 'latency_p99_ms'),
+    ('max', 'latency_max_ms'),
+)
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return f"{value:.2f}" if value is not None else 'N/A'
 
 
 class PoRDiagnostic:
@@ -15,24 +30,58 @@ class PoRDiagnostic:
     """
     def __init__(self, log_dir: Path):
         """
-        :param log_dir: Directory containing PoR log files (each a JSON object per file).
+        :param log_dir: Directory containing PoR log files (``*.json``, one JSON object per
+            file, or ``*.jsonl``, one JSON object per line).
         """
         self.log_dir = log_dir
         self.logs: List[Dict[str, Any]] = []
 
+    def log_files(self) -> List[Path]:
+        """
+        Log files in the log directory: ``*.json`` (one entry per file) and
+        ``*.jsonl`` (one entry per line, as written by ``PoRLogWriter``).
+        """
+        return sorted(
+            list(self.log_dir.glob("*.json")) + list(self.log_dir.glob("*.jsonl"))
+        )
+
+    @staticmethod
+    def iter_file_entries(filepath: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the entries of one log file, skipping anything that is not valid JSON.
+        """
+        if filepath.suffix == '.jsonl':
+            with filepath.open('r', encoding='utf-8') as f:
+                for lineno, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json_loads(line)
+                    except json.JSONDecodeError as e:
+                        print(f"Warning: could not parse {filepath}:{lineno}: {e}")
+            return
+
+        try:
+            entry = json_loads(filepath.read_bytes())
+        except json.JSONDecodeError as e:
+            # Skip invalid JSON and continue
+            print(f"Warning: could not parse {filepath}: {e}")
+            return
+        yield entry
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield every log entry in the log directory.
+        """
+        for filepath in self.log_files():
+            yield from self.iter_file_entries(filepath)
+
     def load_logs(self) -> None:
         """
-        Load all JSON log files from the log directory into memory.
+        Load all JSON/JSONL log entries from the log directory into memory.
         """
         self.logs.clear()
-        for filepath in self.log_dir.glob("*.json"):
-            try:
-                with filepath.open('r', encoding='utf-8') as f:
-                    entry = json.load(f)
-                self.logs.append(entry)
-            except json.JSONDecodeError as e:
-                # Skip invalid JSON and continue
-                print(f"Warning: could not parse {filepath}: {e}")
+        self.logs.extend(self.iter_entries())
 
     def analyze_logs(self) -> Dict[str, Any]:
         """
@@ -42,34 +91,52 @@ class PoRDiagnostic:
             A dict containing metrics such as total_entries, error_count,
             average_latency_ms, success_rate.
         """
-        metrics: Dict[str, Any] = {
-            'total_entries': len(self.logs),
-            'error_count': 0,
-            'latencies': [],  # intermediate list
-        }
-
+        aggregate = LogAggregate()
         for entry in self.logs:
-            status = entry.get('status')
-            if status != 'ok':
-                metrics['error_count'] += 1
-            if 'latency_ms' in entry:
-                metrics['latencies'].append(entry['latency_ms'])
-
-        latencies = metrics.pop('latencies')
-        if latencies:
-            metrics['average_latency_ms'] = sum(latencies) / len(latencies)
-        else:
-            metrics['average_latency_ms'] = None
+            aggregate.add(entry)
+        return aggregate.to_metrics()
 
-        if metrics['total_entries'] > 0:
-            metrics['success_rate'] = (
-                (metrics['total_entries'] - metrics['error_count'])
-                / metrics['total_entries']
-            )
+    def analyze_stream(self) -> Dict[str, Any]:
+        """
+        Compute the same metrics as :meth:`analyze_logs` by folding entries
+        into running aggregates as they are read, without holding them in memory.
+        """
+        aggregate = LogAggregate()
+        for entry in self.iter_entries():
+            aggregate.add(entry)
+        return aggregate.to_metrics()
+
+    def analyze_parallel(self, workers: int = 4) -> Dict[str, Any]:
+        """
+        Compute the metrics of :meth:`analyze_stream` with a thread pool for
+        reading and a process pool for parsing, merging per-file partial
+        aggregates at the end.
+        """
+        return aggregate_parallel(self.log_files(), workers).to_metrics()
+
+    def analyze_incremental(self, manifest_path: Path, workers: int = 1) -> Dict[str, Any]:
+        """
+        Compute the metrics of :meth:`analyze_stream`, re-reading only log
+        files that are new or changed since the last run recorded in the
+        manifest at ``manifest_path``, which is updated afterwards.
+        """
+        manifest = Manifest(manifest_path)
+        files = self.log_files()
+        manifest.prune(files)
+        changed = [f for f in files if not manifest.is_current(f)]
+
+        if workers > 1 and changed:
+            for filepath, aggregate in aggregate_files_parallel(changed, workers).items():
+                manifest.update(filepath, aggregate)
         else:
-            metrics['success_rate'] = None
+            for filepath in changed:
+                aggregate = LogAggregate()
+                for entry in self.iter_file_entries(filepath):
+                    aggregate.add(entry)
+                manifest.update(filepath, aggregate)
 
-        return metrics
+        manifest.save()
+        return manifest.total().to_metrics()
 
     def generate_report(self, metrics: Dict[str, Any], output_file: Path) -> None:
         """
@@ -83,6 +150,8 @@ class PoRDiagnostic:
             f"- Total entries: {metrics.get('total_entries', 0)}",
             f"- Error count: {metrics.get('error_count', 0)}",
         ]
+        if metrics.get('timestamp_errors'):
+            lines.append(f"- Unparseable timestamps: {metrics['timestamp_errors']}")
         avg = metrics.get('average_latency_ms')
         if avg is not None:
             lines.append(f"- Average latency: {avg:.2f} ms")
@@ -95,13 +164,52 @@ class PoRDiagnostic:
         else:
             lines.append("- Success rate: N/A")
 
+        for label, key in LATENCY_LABELS:
+            value = metrics.get(key)
+            if value is not None:
+                lines.append(f"- Latency {label}: {value:.2f} ms")
+            elif key in metrics:
+                lines.append(f"- Latency {label}: N/A")
+
+        hourly = metrics.get('per_hour')
+        if hourly:
+            lines.extend([
+                '',
+                '## Hourly breakdown',
+                '| Hour | Entries | Errors | p50 (ms) | p95 (ms) | p99 (ms) | Max (ms) |',
+                '| --- | --- | --- | --- | --- | --- | --- |',
+            ])
+            for bucket in hourly:
+                cells = [_format_ms(bucket.get(key)) for _, key in LATENCY_LABELS]
+                lines.append(
+                    f"| {bucket['start']} | {bucket['count']} | {bucket['error_count']} | "
+                    + " | ".join(cells) + " |"
+                )
+
         output_file.write_text("\n".join(lines), encoding='utf-8')
 
-    def run(self, output_dir: Path) -> None:
+    def generate_json_report(self, metrics: Dict[str, Any], output_file: Path) -> None:
+        """
+        Write the metrics (including per-minute/per-hour buckets) as JSON.
+
+        :param metrics: Dict of metrics from analyze_logs()
+        :param output_file: Path to write the JSON report
+        """
+        output_file.write_text(json.dumps(metrics, indent=2), encoding='utf-8')
+
+    def run(self, output_dir: Path, workers: int = 1, manifest_path: Optional[Path] = None) -> None:
         """
-        Full pipeline: load logs, analyze, and write report to output_dir/por_eval_result.md.
+        Full pipeline: stream and analyze logs, and write reports to
+        output_dir/por_eval_result.md and output_dir/por_eval_result.json.
+        With ``workers > 1`` logs are loaded and parsed in parallel; with a
+        ``manifest_path`` only new or changed files are re-read.
         """
-        self.load_logs()
-        metrics = self.analyze_logs()
+        if manifest_path is not None:
+            metrics = self.analyze_incremental(manifest_path, workers)
+        elif workers > 1:
+            metrics = self.analyze_parallel(workers)
+        else:
+            metrics = self.analyze_stream()
         report_path = output_dir / 'por_eval_result.md'
         self.generate_report(metrics, report_path)
+        self.generate_json_report(metrics, output_dir / 'por_eval_result.json')
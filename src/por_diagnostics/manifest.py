@@ -0,0 +1,86 @@
+# por_diagnostics/manifest.py
+"""
+Processed-file manifest for incremental PoR diagnostics.
+
+Each log file is recorded with its size, mtime and the partial
+:class:`LogAggregate` computed from it. On the next run only files that are
+new or whose size/mtime changed are re-read; the rest are served from the
+manifest, and deleted files are dropped.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, Iterable
+
+from .aggregate import LogAggregate
+
+MANIFEST_VERSION = 3
+
+
+class Manifest:
+    """
+    JSON manifest mapping log file paths to their stat signature and cached aggregate.
+    """
+    def __init__(self, path: Path):
+        """
+        :param path: Manifest file; loaded if it exists, written by :meth:`save`.
+        """
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding='utf-8'))
+            except json.JSONDecodeError as e:
+                print(f"Warning: ignoring unreadable manifest {path}: {e}")
+                data = {}
+            if data.get('version') == MANIFEST_VERSION:
+                self.files = data.get('files', {})
+
+    @staticmethod
+    def _signature(filepath: Path) -> Dict[str, int]:
+        stat = filepath.stat()
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def is_current(self, filepath: Path) -> bool:
+        """
+        True if ``filepath`` is recorded with its current size and mtime.
+        """
+        record = self.files.get(str(filepath))
+        if record is None:
+            return False
+        signature = self._signature(filepath)
+        return record['size'] == signature['size'] and record['mtime_ns'] == signature['mtime_ns']
+
+    def update(self, filepath: Path, aggregate: LogAggregate) -> None:
+        """
+        Record ``filepath``'s current signature and its aggregate.
+        """
+        self.files[str(filepath)] = {**self._signature(filepath), 'aggregate': aggregate.to_dict()}
+
+    def prune(self, existing: Iterable[Path]) -> None:
+        """
+        Drop records for files that no longer exist in the log directory.
+        """
+        keep = {str(p) for p in existing}
+        self.files = {k: v for k, v in self.files.items() if k in keep}
+
+    def total(self) -> LogAggregate:
+        """
+        Merge the cached aggregates of all recorded files.
+        """
+        total = LogAggregate()
+        for record in self.files.values():
+            total.merge(LogAggregate.from_dict(record['aggregate']))
+        return total
+
+    def save(self) -> None:
+        """
+        Atomically write the manifest.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(
+            json.dumps({'version': MANIFEST_VERSION, 'files': self.files}),
+            encoding='utf-8',
+        )
+        os.replace(tmp, self.path)
@@ -0,0 +1,164 @@
+# por_diagnostics/parallel.py
+"""
+Parallel log loading for PoR diagnostics.
+
+Files (and large JSONL files split into line-aligned byte ranges) are read by
+a thread pool, which hides I/O latency on network mounts, and parsed into
+partial :class:`LogAggregate` objects by a process pool. The partials are
+merged at the end. ``orjson`` is used for decoding when installed.
+"""
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .aggregate import LogAggregate
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# JSONL files larger than this are split into several parse tasks.
+BLOCK_BYTES = 8 << 20
+
+ReadTask = Tuple[Path, int, Optional[int]]
+
+
+def json_loads(data: Any) -> Any:
+    """
+    Decode JSON with ``orjson`` when available, falling back to :mod:`json`
+    for input it rejects (e.g. ``NaN`` literals).
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def plan_reads(files: Sequence[Path], block_bytes: int = BLOCK_BYTES) -> List[ReadTask]:
+    """
+    Split files into ``(path, start, end)`` read tasks. ``*.json`` files are
+    read whole (``end`` is ``None``); ``*.jsonl`` files in ranges of ``block_bytes``.
+    """
+    tasks: List[ReadTask] = []
+    for path in files:
+        size = path.stat().st_size
+        if path.suffix != '.jsonl' or size <= block_bytes:
+            tasks.append((path, 0, None))
+            continue
+        for start in range(0, size, block_bytes):
+            tasks.append((path, start, min(start + block_bytes, size)))
+    return tasks
+
+
+def read_range(path: Path, start: int, end: Optional[int]) -> bytes:
+    """
+    Read the lines starting in ``[start, end)`` (the whole file if ``end`` is ``None``).
+    A line belongs to the range its first byte falls in, so adjacent ranges
+    neither drop nor duplicate lines.
+    """
+    with path.open('rb') as f:
+        if end is None:
+            return f.read()
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()  # finish the line that started before this range
+        begin = f.tell()
+        if begin >= end:
+            return b''
+        data = f.read(end - begin)
+        if not data.endswith(b'\n'):
+            data += f.readline()
+        return data
+
+
+def parse_block(name: str, is_jsonl: bool, data: bytes) -> Tuple[LogAggregate, List[str]]:
+    """
+    Parse one read task into a partial aggregate plus warning messages.
+    Runs in a worker process.
+    """
+    aggregate = LogAggregate()
+    warnings: List[str] = []
+    if not is_jsonl:
+        try:
+            aggregate.add(json_loads(data))
+        except ValueError as e:
+            warnings.append(f"Warning: could not parse {name}: {e}")
+        return aggregate, warnings
+
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            aggregate.add(json_loads(line))
+        except ValueError as e:
+            warnings.append(f"Warning: could not parse a line of {name}: {e}")
+    return aggregate, warnings
+
+
+def aggregate_files_parallel(
+    files: Sequence[Path],
+    workers: int = 4,
+    block_bytes: int = BLOCK_BYTES,
+) -> Dict[Path, LogAggregate]:
+    """
+    Read ``files`` with ``workers`` threads, parse them with ``workers``
+    processes and merge the partial aggregates per file. At most
+    ``2 * workers`` blocks are in memory at once.
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be positive: {workers}")
+    per_file: Dict[Path, LogAggregate] = {path: LogAggregate() for path in files}
+    tasks = iter(plan_reads(files, block_bytes))
+    window = 2 * workers
+
+    with ThreadPoolExecutor(max_workers=workers) as io_pool, \
+            ProcessPoolExecutor(max_workers=workers) as cpu_pool:
+        reads: deque = deque()
+        parses: deque = deque()
+
+        def fill() -> None:
+            while len(reads) + len(parses) < window:
+                task = next(tasks, None)
+                if task is None:
+                    return
+                reads.append((task[0], io_pool.submit(read_range, *task)))
+
+        def collect() -> None:
+            path, future = parses.popleft()
+            aggregate, warnings = future.result()
+            per_file[path].merge(aggregate)
+            for message in warnings:
+                print(message)
+
+        fill()
+        while reads or parses:
+            if reads:
+                path, future = reads.popleft()
+                parses.append((
+                    path,
+                    cpu_pool.submit(parse_block, str(path), path.suffix == '.jsonl', future.result()),
+                ))
+            if parses and (len(parses) >= workers or not reads):
+                collect()
+            fill()
+
+    return per_file
+
+
+def aggregate_parallel(
+    files: Sequence[Path],
+    workers: int = 4,
+    block_bytes: int = BLOCK_BYTES,
+) -> LogAggregate:
+    """
+    Like :func:`aggregate_files_parallel`, merged into a single aggregate.
+    """
+    total = LogAggregate()
+    for aggregate in aggregate_files_parallel(files, workers, block_bytes).values():
+        total.merge(aggregate)
+    return total
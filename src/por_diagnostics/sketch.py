@@ -0,0 +1,106 @@
+# por_diagnostics/sketch.py
+"""
+Mergeable streaming quantile sketch for latency percentiles.
+
+Values are counted in logarithmic buckets (as in DDSketch), so every
+quantile estimate is within ``relative_accuracy`` of a true sample value
+while memory depends only on the value range, not on the number of values.
+"""
+import math
+from typing import Dict, Any, Optional
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch with relative-error guarantees.
+    """
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        :param relative_accuracy: Maximum relative error of quantile estimates.
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be in (0, 1): {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        """
+        Add one value; values ``<= 0`` share a single zero bucket.
+        """
+        value = float(value)
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value <= 0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Merge a sketch with the same relative accuracy into this one and return self.
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Approximate ``q``-quantile (``0 <= q <= 1``), or ``None`` if empty.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(f"q must be in [0, 1]: {q}")
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank >= self.count - 1:
+            return self.max
+        seen = self.zero_count
+        if rank < seen:
+            return min(0.0, self.max)
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                estimate = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON-serialisable state.
+        """
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'buckets': {str(k): v for k, v in self.buckets.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "QuantileSketch":
+        """
+        Rebuild a sketch from :meth:`to_dict` output.
+        """
+        sketch = cls(state['relative_accuracy'])
+        sketch.buckets = {int(k): v for k, v in state['buckets'].items()}
+        sketch.zero_count = state['zero_count']
+        sketch.count = state['count']
+        sketch.min = state['min']
+        sketch.max = state['max']
+        return sketch
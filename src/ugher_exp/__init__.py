@@ -5,8 +5,10 @@ ugher_exp パッケージ初期化モジュール
 __version__ = "0.1.0"
 
 # 主要な関数をパッケージ公開
-from .por_detector import detect_pors  # noqa
+from .por_detector import detect_pors, detect_pors_arrow, detect_pors_stream  # noqa
 
 __all__ = [
     "detect_pors",
+    "detect_pors_arrow",
+    "detect_pors_stream",
 ]
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Batch ``cosine_shift`` computation for raw dialog logs.
+
+``cosine_shift`` is ``1 - cos(emb(resp_i), emb(resp_{i-1}))`` between
+consecutive turns of the same session, and ``0.0`` on the first turn of a
+session. Responses are embedded in batches and the shifts are computed with
+segmented, vectorised operations; the last embedding of each batch is
+carried over so streamed batches give the same result as one big frame.
+Rows are expected in session/turn order.
+"""
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Any callable mapping a list of texts to an ``(n, dim)`` embedding matrix.
+EmbedFn = Callable[[List[str]], np.ndarray]
+
+DEFAULT_EMBED_MODEL = "distilbert-base-uncased"
+
+
+class TransformersEmbedder:
+    """
+    Mean-pooled embeddings from a ``transformers`` feature-extraction pipeline,
+    the same backend (and default model) ``PoRInference`` uses.
+    """
+
+    def __init__(self, model: str = DEFAULT_EMBED_MODEL, device: Optional[int] = None, pipeline=None):
+        """
+        :param model: Hugging Face model name.
+        :param device: Pipeline device (``-1`` CPU, ``0`` first GPU); auto-detected if ``None``.
+        :param pipeline: Pre-built feature-extraction pipeline to reuse instead of loading ``model``.
+        """
+        if pipeline is None:
+            from transformers import pipeline as make_pipeline
+
+            if device is None:
+                try:
+                    import torch
+
+                    device = 0 if torch.cuda.is_available() else -1
+                except ImportError:
+                    device = -1
+            pipeline = make_pipeline("feature-extraction", model=model, device=device)
+        self.pipeline = pipeline
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        outputs = self.pipeline(texts, batch_size=len(texts) or 1, truncation=True)
+        return np.vstack([np.asarray(out[0], dtype=np.float64).mean(axis=0) for out in outputs])
+
+
+class CosineShiftStage:
+    """
+    Pipeline stage adding a ``cosine_shift`` column to dialog-log batches.
+    """
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        batch_size: int = 64,
+        text_col: str = "curr_resp",
+        session_col: str = "session_id",
+    ):
+        """
+        :param embed_fn: Embedding backend (e.g. :class:`TransformersEmbedder`).
+        :param batch_size: Number of texts passed to ``embed_fn`` per call.
+        :param text_col: Column holding the response text.
+        :param session_col: Column identifying sessions; if absent the whole
+            stream is treated as a single session.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive: {batch_size}")
+        self.embed_fn = embed_fn
+        self.batch_size = batch_size
+        self.text_col = text_col
+        self.session_col = session_col
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the carried-over last turn (call between independent inputs)."""
+        self._prev_vec: Optional[np.ndarray] = None
+        self._prev_session = None
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed ``texts`` in batches and L2-normalise the rows (zero vectors stay zero)."""
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0))
+        parts = [
+            np.asarray(self.embed_fn(texts[i:i + self.batch_size]), dtype=np.float64)
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        vecs = np.vstack(parts)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        return np.divide(vecs, norms, out=np.zeros_like(vecs), where=norms > 0)
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add ``cosine_shift`` to ``df`` in place and return it."""
+        n = len(df)
+        if n == 0:
+            df['cosine_shift'] = pd.Series(dtype=float)
+            return df
+
+        texts = df[self.text_col].fillna('').astype(str) if self.text_col in df.columns else [''] * n
+        vecs = self.embed(texts)
+        sessions = df[self.session_col].to_numpy() if self.session_col in df.columns else np.zeros(n)
+
+        prev = np.empty_like(vecs)
+        prev[1:] = vecs[:-1]
+        prev[0] = self._prev_vec if self._prev_vec is not None else 0.0
+
+        same_session = np.empty(n, dtype=bool)
+        same_session[1:] = sessions[1:] == sessions[:-1]
+        same_session[0] = self._prev_vec is not None and sessions[0] == self._prev_session
+
+        similarity = np.einsum('ij,ij->i', vecs, prev)
+        df['cosine_shift'] = np.where(same_session, 1.0 - similarity, 0.0)
+
+        self._prev_vec = vecs[-1]
+        self._prev_session = sessions[-1]
+        return df
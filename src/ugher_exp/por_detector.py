@@ -1,6 +1,13 @@
 import pandas as pd
 import math
+import os
 import argparse
+from typing import Dict, Iterator, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .cosine_shift import CosineShiftStage, TransformersEmbedder
 
 # Optional: integrate with your project logger
 try:
@@ -13,6 +20,9 @@ except ImportError:
 # Threshold for PoR detection
 THRESHOLD = 0.35
 
+# Rows per batch in streaming mode
+BATCH_SIZE = 100_000
+
 def sigmoid(x: float) -> float:
     """
     Compute the sigmoid function: 1 / (1 + exp(-x)).
@@ -22,21 +32,80 @@ def sigmoid(x: float) -> float:
     except OverflowError:
         return 0.0
 
-def detect_pors(path: str) -> pd.DataFrame:
+def sigmoid_array(values: pa.Array) -> pa.Array:
     """
-    Load a Parquet or CSV file, detect Points of Resonance (PoR) using heuristics,
-    and return a DataFrame with added 'PoR_flag' and 'intensity' columns.
+    Vectorised, overflow-safe :func:`sigmoid` over a float64 Arrow array.
+
+    Arrow's ``exp`` goes through libm like ``math.exp`` and matches it bit for
+    bit, whereas NumPy's SIMD ``exp`` can differ in the last ulp. Overflow
+    yields ``inf`` and therefore ``0.0``, exactly like :func:`sigmoid`.
     """
-    # 1. Read input (CSV or Parquet に対応)
+    return pc.divide(1.0, pc.add(1.0, pc.exp(pc.negate(values))))
+
+def _numeric_shift(values: pa.Array) -> pa.Array:
+    """
+    Coerce a ``cosine_shift`` array to float64 with null/NaN/unparsable as 0.0.
+    """
+    if not (pa.types.is_floating(values.type) or pa.types.is_integer(values.type)):
+        coerced = pd.to_numeric(pd.Series(values.to_pandas()), errors='coerce')
+        values = pa.array(coerced, type=pa.float64(), from_pandas=True)
+    values = pc.cast(values, pa.float64())
+    return pc.fill_null(pc.if_else(pc.is_nan(values), 0.0, values), 0.0)
+
+def detect_kernel(cosine_shift: pa.Array, curr_resp: pa.Array) -> Tuple[pa.Array, pa.Array]:
+    """
+    Arrow-native PoR kernel: return ``(PoR_flag, intensity)`` arrays.
+
+    ``cosine_shift`` must already be a float64 array without nulls (see
+    :func:`_numeric_shift`); nulls in ``curr_resp`` count as no marker.
+    """
+    has_q = pc.fill_null(pc.match_substring(curr_resp, 'Q'), False)
+    flag = pc.or_(pc.greater(cosine_shift, THRESHOLD), has_q)
+    return pc.cast(flag, pa.int64()), sigmoid_array(cosine_shift)
+
+def detect_pors_arrow(path: str) -> pa.Table:
+    """
+    Run :func:`detect_kernel` on a CSV or Parquet file, reading only the
+    ``cosine_shift`` and ``curr_resp`` columns. Returns an Arrow table with
+    those two columns (normalised as in :func:`detect_pors`) plus
+    ``PoR_flag`` and ``intensity``.
+    """
+    wanted = ['cosine_shift', 'curr_resp']
     if path.lower().endswith('.csv'):
-        df = pd.read_csv(path)
+        from pyarrow import csv
+
+        table = csv.read_csv(
+            path,
+            convert_options=csv.ConvertOptions(include_columns=wanted, include_missing_columns=True),
+        )
     else:
-        df = pd.read_parquet(path)
+        import pyarrow.parquet as pq
 
-    if LOG_ENABLED:
-        logger.info(f"Loaded DataFrame from {path} with {len(df)} rows")
+        names = pq.read_schema(path).names
+        table = pq.read_table(path, columns=[c for c in wanted if c in names])
+
+    n = table.num_rows
+    shift = (
+        _numeric_shift(table.column('cosine_shift').combine_chunks())
+        if 'cosine_shift' in table.column_names else pa.array([0.0] * n)
+    )
+    resp = (
+        pc.fill_null(pc.cast(table.column('curr_resp').combine_chunks(), pa.string()), '')
+        if 'curr_resp' in table.column_names else pa.array([''] * n)
+    )
+    flag, intensity = detect_kernel(shift, resp)
+    return pa.table({'cosine_shift': shift, 'curr_resp': resp, 'PoR_flag': flag, 'intensity': intensity})
+
+def apply_detection(df: pd.DataFrame, shift_stage: Optional[CosineShiftStage] = None) -> pd.DataFrame:
+    """
+    Add 'PoR_flag' and 'intensity' columns to ``df`` in place and return it.
+    If 'cosine_shift' is missing and ``shift_stage`` is given, it is computed
+    from the responses first.
+    """
+    # 2. 必要なカラムがなければ計算するかデフォルトを埋める
+    if 'cosine_shift' not in df.columns and shift_stage is not None:
+        df = shift_stage(df)
 
-    # 2. 必要なカラムがなければデフォルトを埋める
     if 'cosine_shift' not in df.columns:
         df['cosine_shift'] = 0.0
     else:
@@ -49,34 +118,239 @@ def detect_pors(path: str) -> pd.DataFrame:
     else:
         df['curr_resp'] = df['curr_resp'].fillna('')
 
-    # 3. PoR フラグ＆強度計算
-    df['PoR_flag'] = (
-        (df['cosine_shift'] > THRESHOLD)
-        | df['curr_resp'].str.contains(r'Q', na=False)
-    ).astype(int)
+    # 3. PoR フラグ＆強度計算 (Arrow カーネル、文字列以外が混ざる場合は pandas)
+    shift = pa.array(df['cosine_shift'], type=pa.float64())
+    try:
+        resp = pa.array(df['curr_resp'], type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        resp = None
+
+    if resp is not None:
+        flag, intensity = detect_kernel(shift, resp)
+        df['PoR_flag'] = flag.to_numpy()
+    else:
+        df['PoR_flag'] = (
+            (df['cosine_shift'] > THRESHOLD)
+            | df['curr_resp'].str.contains(r'Q', na=False)
+        ).astype(int)
+        intensity = sigmoid_array(shift)
+
+    df['intensity'] = intensity.to_numpy()
+    return df
 
-    df['intensity'] = df['cosine_shift'].apply(sigmoid)
+# Old private name, kept for existing callers
+_apply_detection = apply_detection
+
+def detect_pors(path: str, shift_stage: Optional[CosineShiftStage] = None) -> pd.DataFrame:
+    """
+    Load a Parquet or CSV file, detect Points of Resonance (PoR) using heuristics,
+    and return a DataFrame with added 'PoR_flag' and 'intensity' columns.
+    Raw logs without 'cosine_shift' get it from ``shift_stage`` when given.
+    """
+    # 1. Read input (CSV or Parquet に対応)
+    if path.lower().endswith('.csv'):
+        df = pd.read_csv(path)
+    else:
+        df = pd.read_parquet(path)
+
+    if LOG_ENABLED:
+        logger.info(f"Loaded DataFrame from {path} with {len(df)} rows")
+
+    df = apply_detection(df, shift_stage)
 
     if LOG_ENABLED:
         logger.info(f"PoR detection completed: {df['PoR_flag'].sum()} flags set")
 
     return df
 
+def iter_batches(path: str, batch_size: int = BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yield a CSV file in chunks or a Parquet file row group by row group,
+    at most ``batch_size`` rows at a time.
+    """
+    if path.lower().endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=batch_size)
+    else:
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+
+def _common_type(a: pa.DataType, b: pa.DataType) -> pa.DataType:
+    """
+    Type both ``a`` and ``b`` values fit in: Arrow's permissive promotion
+    (e.g. int64 + double -> double), or string when the types are unrelated.
+    """
+    try:
+        merged = pa.unify_schemas(
+            [pa.schema([('x', a)]), pa.schema([('x', b)])], promote_options='permissive'
+        )
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        return pa.string()
+    return merged.field('x').type
+
+class _ParquetBatchWriter:
+    """
+    Parquet writer whose schema widens as batches arrive.
+
+    CSV chunks are typed independently, so a pass-through column can be int64
+    in one batch and double (or string) in the next. When a batch does not fit
+    the schema so far, the column types are promoted and the row groups
+    already written are rewritten with the new schema. Columns that only held
+    nulls so far simply take the type of the first batch with values.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.schema: Optional[pa.Schema] = None
+        self._writer = None
+        self._null_columns: set = set()
+
+    def write(self, table: pa.Table) -> None:
+        import pyarrow.parquet as pq
+
+        if self.schema is None:
+            self.schema = table.schema
+            self._writer = pq.ParquetWriter(self.path, self.schema)
+            self._null_columns = set(table.column_names)
+        else:
+            schema = self._promote(table)
+            if not schema.equals(self.schema):
+                self._rewrite(schema)
+        self._writer.write_table(table.cast(self.schema))
+        self._null_columns -= {
+            name for name in table.column_names if table.column(name).null_count < len(table)
+        }
+
+    def _promote(self, table: pa.Table) -> pa.Schema:
+        fields = []
+        for field in self.schema:
+            column = table.column(field.name)
+            if column.type == field.type or column.null_count == len(column):
+                fields.append(field)
+            elif field.name in self._null_columns:
+                fields.append(field.with_type(column.type))
+            else:
+                fields.append(field.with_type(_common_type(field.type, column.type)))
+        # Without the pandas metadata, which records the dtypes of the first batch.
+        return pa.schema(fields)
+
+    def _rewrite(self, schema: pa.Schema) -> None:
+        import pyarrow.parquet as pq
+
+        self._writer.close()
+        directory, name = os.path.split(self.path)
+        previous = os.path.join(directory, f".{name}.promote")
+        os.replace(self.path, previous)
+        try:
+            self._writer = pq.ParquetWriter(self.path, schema)
+            with pq.ParquetFile(previous) as source:
+                for i in range(source.num_row_groups):
+                    self._writer.write_table(source.read_row_group(i).cast(schema))
+        finally:
+            os.remove(previous)
+        self.schema = schema
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+def detect_pors_stream(
+    input_path: str,
+    output_path: str,
+    batch_size: int = BATCH_SIZE,
+    shift_stage: Optional[CosineShiftStage] = None,
+) -> Dict[str, int]:
+    """
+    Streaming variant of :func:`detect_pors`: detect PoRs batch by batch and
+    append each batch to ``output_path`` (CSV, or Parquet row groups), so peak
+    memory is bounded by ``batch_size`` instead of the file size. Parquet
+    column types are promoted across batches (see :class:`_ParquetBatchWriter`).
+
+    Returns a dict with the number of ``rows`` processed and ``flags`` set.
+    """
+    rows = flags = 0
+    to_csv = output_path.lower().endswith('.csv')
+    writer = None if to_csv else _ParquetBatchWriter(output_path)
+    try:
+        for i, batch in enumerate(iter_batches(input_path, batch_size)):
+            batch = apply_detection(batch, shift_stage)
+            rows += len(batch)
+            flags += int(batch['PoR_flag'].sum())
+
+            if to_csv:
+                batch.to_csv(output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            else:
+                writer.write(pa.Table.from_pandas(batch, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if LOG_ENABLED:
+        logger.info(f"PoR detection completed: {flags} flags set in {rows} rows")
+
+    return {"rows": rows, "flags": flags}
+
 def main():
     parser = argparse.ArgumentParser(
         description="Detect PoRs in a Parquet or CSV dataset"
     )
     parser.add_argument(
         '--input', '-i', required=True,
-        help="Input CSV or Parquet file path"
+        help="Input CSV or Parquet file path, or a directory/glob of shards"
     )
     parser.add_argument(
         '--output', '-o', required=True,
-        help="Output CSV or Parquet file path"
+        help="Output CSV or Parquet file path (output directory for shard datasets)"
+    )
+    parser.add_argument(
+        '--batch-size', '-b', type=int, default=None,
+        help="Stream the input in batches of this many rows (bounded memory)"
+    )
+    parser.add_argument(
+        '--embed-model', default=None,
+        help="Compute missing cosine_shift with this transformers model (e.g. distilbert-base-uncased)"
+    )
+    parser.add_argument(
+        '--session-col', default='session_id',
+        help="Session column used to segment cosine_shift computation"
+    )
+    parser.add_argument(
+        '--workers', '-w', type=int, default=1,
+        help="Worker processes for directory/glob inputs"
+    )
+    parser.add_argument(
+        '--force', action='store_true',
+        help="Reprocess shards whose output is already up to date"
     )
     args = parser.parse_args()
 
-    df = detect_pors(args.input)
+    from .por_dataset import detect_dataset, is_dataset_spec
+
+    shift_stage = None
+    if args.embed_model:
+        shift_stage = CosineShiftStage(TransformersEmbedder(args.embed_model), session_col=args.session_col)
+
+    if is_dataset_spec(args.input):
+        stats = detect_dataset(
+            args.input, args.output, workers=args.workers,
+            batch_size=args.batch_size or BATCH_SIZE, force=args.force,
+            shift_stage=shift_stage,
+        )
+        print(
+            f"{stats['processed']}/{stats['shards']} shards processed "
+            f"({stats['skipped']} up to date): {stats['flags']} PoR flags in "
+            f"{stats['rows']} rows, {stats['seconds']:.2f}s "
+            f"({stats['rows_per_sec']:.0f} rows/s)"
+        )
+        return
+
+    if args.batch_size:
+        stats = detect_pors_stream(args.input, args.output, args.batch_size, shift_stage)
+        print(f"{stats['flags']} PoR flags in {stats['rows']} rows")
+        return
+
+    df = detect_pors(args.input, shift_stage)
 
     # 4. Save output in matching format
     if args.output.lower().endswith('.csv'):
@@ -0,0 +1,268 @@
+"""Merge per-process PoR log shards into time-ordered, date-partitioned files.
+
+Each shard written by ``PoRLogWriter(shard=True)`` (and each of its
+rotations) is already in time order, so the shards are combined with a
+streaming k-way merge on ``timestamp`` and written to
+``{out_dir}/date=YYYY-MM-DD/{name}``. A partition from an earlier compaction is
+merged in again only when the new inputs have entries for that date, so every
+partition stays a single ordered file and a run costs O(new entries + touched
+partitions) rather than O(history).
+
+Output is written under a temporary directory. The run then commits by
+atomically writing a journal (``.compaction-journal.json``) that lists the
+moves into place, the inputs to delete and (with ``remove_inputs=False``) the
+inputs to record as consumed in ``.compaction-manifest.json``. The journal is
+then applied and removed. A run that crashes after the commit is finished by
+the next run, and one that crashes before it leaves nothing behind, so
+entries are never duplicated or lost. Inputs recorded in the manifest (matched
+by size and modification time) are skipped. Only one compaction may run per
+``out_dir`` at a time.
+
+By default only rotated files are compacted, since active shard files may
+still be appended to; rotate or close the writers first, or pass
+``include_active=True`` once they have stopped.
+
+Usage::
+
+    python -m unconscious_gravity.por_log_compaction logs/por_log.jsonl compacted/ --format parquet
+"""
+import argparse
+import glob
+import heapq
+import json
+import logging
+import os
+import shutil
+import tempfile
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from unconscious_gravity.por_log_sinks import (
+    INDEX_SUFFIX,
+    iter_log_files,
+    log_format,
+    open_log_sink,
+    read_log,
+    shard_files,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10_000
+JOURNAL_NAME = ".compaction-journal.json"
+MANIFEST_NAME = ".compaction-manifest.json"
+FORMAT_SUFFIXES = {"jsonl": ".jsonl", "parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _timestamp(entry: Mapping) -> str:
+    timestamp = entry.get("timestamp")
+    return timestamp if isinstance(timestamp, str) else ""
+
+
+def _partition(entry: Mapping) -> str:
+    timestamp = _timestamp(entry)
+    return f"date={timestamp[:10]}" if timestamp else "date=unknown"
+
+
+def compaction_inputs(path: str, include_active: bool = False) -> List[List[str]]:
+    """Files to compact for ``path``: one time-ordered list (rotations, then active file) per shard."""
+    inputs = []
+    for shard in shard_files(path) or [path]:
+        files = [f for f in iter_log_files(shard) if include_active or f != shard]
+        if files:
+            inputs.append(files)
+    return inputs
+
+
+def _file_key(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _load_json(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _apply_journal(out_dir: str) -> bool:
+    """Finish a committed compaction recorded in ``out_dir``; return whether there was one."""
+    journal_path = os.path.join(out_dir, JOURNAL_NAME)
+    journal = _load_json(journal_path)
+    if not journal:
+        return False
+    for src, dst in journal["moves"]:
+        if os.path.exists(src):  # moves already done by a crashed run are skipped
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            os.replace(src, dst)
+    if journal["consumed"]:
+        manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        manifest = _load_json(manifest_path)
+        manifest.update(journal["consumed"])
+        _write_json(manifest_path, manifest)
+    for file in journal["remove"]:
+        for victim in (file, file + INDEX_SUFFIX):
+            if os.path.exists(victim):
+                os.remove(victim)
+    shutil.rmtree(journal["tmp_dir"], ignore_errors=True)
+    os.remove(journal_path)
+    return True
+
+
+def recover_compaction(out_dir: str) -> None:
+    """Finish a committed compaction and drop the output of uncommitted ones."""
+    if _apply_journal(out_dir):
+        logger.info("Finished interrupted compaction in %s", out_dir)
+    for tmp_dir in glob.glob(os.path.join(glob.escape(out_dir), ".compact-*")):
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def commit_compaction(
+    out_dir: str,
+    tmp_dir: str,
+    moves: List[Tuple[str, str]],
+    remove: List[str],
+    consumed: Optional[Dict[str, List[int]]] = None,
+) -> None:
+    """Commit output written under ``tmp_dir`` (a ``.compact-*`` directory in ``out_dir``).
+
+    The journal is written atomically first; from then on the moves into
+    place, the input removals and the manifest update are completed, if need
+    be by :func:`recover_compaction` in the next run.
+    """
+    _write_json(os.path.join(out_dir, JOURNAL_NAME), {
+        "tmp_dir": tmp_dir,
+        "moves": moves,
+        "remove": remove,
+        "consumed": consumed or {},
+    })
+    _apply_journal(out_dir)
+
+
+def _read_files(files: List[str]) -> Iterator[Dict[str, Any]]:
+    for file in files:
+        for entry in read_log(file):
+            yield dict(entry)
+
+
+def _batches(entries: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def compact_logs(
+    path: str,
+    out_dir: str,
+    fmt: str = "jsonl",
+    include_active: bool = False,
+    remove_inputs: bool = True,
+    batch_size: int = BATCH_SIZE,
+) -> Dict[str, int]:
+    """Merge the shards of ``path`` into ``{out_dir}/date=YYYY-MM-DD/{name}``.
+
+    :param path: Log path the shards were derived from (e.g. ``logs/por_log.jsonl``).
+    :param out_dir: Root of the partitioned output.
+    :param fmt: Output format: ``"jsonl"``, ``"parquet"`` or ``"arrow"``.
+    :param include_active: Also compact the shards' current (non-rotated) files.
+    :param remove_inputs: Delete compacted input files (and their indexes) afterwards;
+        otherwise record them in the manifest so later runs skip them.
+    :param batch_size: Entries per written batch / row group.
+    :return: Counts of ``files`` read, ``entries`` (new entries) and ``partitions`` written.
+    """
+    if fmt not in FORMAT_SUFFIXES:
+        raise ValueError(f"fmt must be one of {tuple(FORMAT_SUFFIXES)}: {fmt}")
+    name = os.path.splitext(os.path.basename(path))[0] + FORMAT_SUFFIXES[fmt]
+    os.makedirs(out_dir, exist_ok=True)
+    recover_compaction(out_dir)
+
+    consumed = _load_json(os.path.join(out_dir, MANIFEST_NAME))
+    inputs = []
+    for files in compaction_inputs(path, include_active):
+        files = [f for f in files if consumed.get(os.path.abspath(f)) != _file_key(f)]
+        if files:
+            inputs.append(files)
+    files = [f for group in inputs for f in group]
+    if not files:
+        return {"files": 0, "entries": 0, "partitions": 0}
+    keys = {os.path.abspath(f): _file_key(f) for f in files}
+
+    tmp_dir = tempfile.mkdtemp(prefix=".compact-", dir=out_dir)
+    written: List[str] = []
+    entries = 0
+    try:
+        merged = heapq.merge(*(_read_files(group) for group in inputs), key=_timestamp)
+        for partition, group in groupby(merged, key=_partition):
+            # Only partitions that receive new entries are rewritten (merged with their earlier output).
+            existing = os.path.join(out_dir, partition, name)
+            streams = [_read_files([existing])] if os.path.exists(existing) else []
+            new_entries = 0
+
+            def counted(group=group):
+                nonlocal new_entries
+                for entry in group:
+                    new_entries += 1
+                    yield entry
+
+            target = os.path.join(tmp_dir, partition, name)
+            with open_log_sink(target, max_file_size_mb=float("inf")) as sink:
+                for batch in _batches(heapq.merge(*streams, counted(), key=_timestamp), batch_size):
+                    sink.write(batch)
+            entries += new_entries
+            written.append(partition)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    moves = [
+        (os.path.join(tmp_dir, partition, file), os.path.join(out_dir, partition, file))
+        for partition in written
+        for file in sorted(os.listdir(os.path.join(tmp_dir, partition)))
+    ]
+    commit_compaction(out_dir, tmp_dir, moves, files if remove_inputs else [], None if remove_inputs else keys)
+
+    logger.info("Compacted %s files (%s entries) into %s partitions under %s",
+                len(files), entries, len(written), out_dir)
+    return {"files": len(files), "entries": entries, "partitions": len(written)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge PoR log shards into date-partitioned files")
+    parser.add_argument("log_path", help="Log path the shards were written for, e.g. logs/por_log.jsonl")
+    parser.add_argument("out_dir", help="Output root for date=YYYY-MM-DD partitions")
+    parser.add_argument("--format", choices=sorted(FORMAT_SUFFIXES), default=None,
+                        help="Output format (default: format of log_path)")
+    parser.add_argument("--include-active", action="store_true",
+                        help="Also compact files that writers may still append to")
+    parser.add_argument("--keep-inputs", action="store_true", help="Do not delete compacted inputs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    stats = compact_logs(
+        args.log_path,
+        args.out_dir,
+        fmt=args.format or log_format(args.log_path),
+        include_active=args.include_active,
+        remove_inputs=not args.keep_inputs,
+    )
+    print(f"Compacted {stats['files']} files, {stats['entries']} entries into {stats['partitions']} partitions")
+
+
+if __name__ == "__main__":
+    main()
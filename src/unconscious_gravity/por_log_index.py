@@ -0,0 +1,218 @@
+"""Time-range queries over PoR logs using the sparse time index.
+
+JSONL and Arrow IPC logs carry a ``.idx`` sidecar (see
+:mod:`unconscious_gravity.por_log_sinks`) listing the min/max ``timestamp``
+of every written batch with its byte range or batch number, and Parquet row
+groups carry column statistics. :func:`query_time_range` uses these to seek
+straight to the batches overlapping a window, across a log path and all of
+its rotations, and only parses those. Parts of a file the index does not
+cover (e.g. written before indexing existed) are always scanned, so results
+never depend on the index being complete, and an index whose size/mtime
+stamp no longer matches its log is ignored.
+
+Gzip-compressed rotations cannot seek without decompressing everything
+before the target, so they are read in a single forward pass: the index
+still saves parsing the skipped blocks, but not decompressing them. Only
+plain files get true random access.
+"""
+import gzip
+import json
+import logging
+import os
+from collections import deque
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from unconscious_gravity.por_log_sinks import (
+    CONTEXT_KEY,
+    INDEX_SUFFIX,
+    REF_KEY,
+    LogRecord,
+    iter_log_files,
+    log_format,
+    rows_to_entries,
+)
+
+logger = logging.getLogger(__name__)
+
+TimeBound = Optional[Union[str, datetime]]
+
+
+def to_iso(value: TimeBound) -> Optional[str]:
+    """Normalise a time bound to the ISO string compared against stored timestamps."""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def load_index(path: str) -> Tuple[List[Dict[str, Any]], Dict[str, Tuple[int, int]]]:
+    """Return ``(blocks, contexts)`` from the sidecar of ``path``.
+
+    ``blocks`` are the batch records; ``contexts`` maps context ids of a
+    normalised JSONL log to the ``(offset, length)`` of their record. Both
+    are empty (so the whole file is scanned) if there is no sidecar or its
+    latest stamp does not match the log's current size and mtime.
+    """
+    blocks: List[Dict[str, Any]] = []
+    contexts: Dict[str, Tuple[int, int]] = {}
+    stamp = None
+    try:
+        with open(path + INDEX_SUFFIX, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "log_size" in record:
+                    stamp = (record["log_size"], record["log_mtime_ns"])
+                if "context" in record:
+                    contexts[record["context"]] = (record["offset"], record["length"])
+                elif "rows" in record:
+                    blocks.append(record)
+        st = os.stat(path)
+    except FileNotFoundError:
+        return [], {}
+    if stamp != (st.st_size, st.st_mtime_ns):
+        logger.warning("Ignoring stale index for %s", path)
+        return [], {}
+    return blocks, contexts
+
+
+def _overlaps(block: Dict[str, Any], start: Optional[str], end: Optional[str]) -> bool:
+    """Whether a block may hold timestamps in ``[start, end)``; unknown ranges always may."""
+    if block.get("min_ts") is None:
+        return True
+    return (end is None or block["min_ts"] < end) and (start is None or block["max_ts"] >= start)
+
+
+def _in_range(timestamp: Any, start: Optional[str], end: Optional[str]) -> bool:
+    if start is None and end is None:
+        return True
+    if not isinstance(timestamp, str):
+        return False
+    return (start is None or timestamp >= start) and (end is None or timestamp < end)
+
+
+def _byte_blocks(blocks: List[Dict[str, Any]], size: Optional[int]) -> List[Dict[str, Any]]:
+    """Indexed byte ranges plus unindexed gaps (``length`` ``None`` reads to EOF)."""
+    covered: List[Dict[str, Any]] = []
+    position = 0
+    for block in sorted(blocks, key=lambda b: b["offset"]):
+        if block["offset"] > position:
+            covered.append({"offset": position, "length": block["offset"] - position})
+        covered.append(block)
+        position = max(position, block["offset"] + block["length"])
+    if size is None or size > position:
+        covered.append({"offset": position, "length": None if size is None else size - position})
+    return covered
+
+
+def _query_jsonl(path: str, start: Optional[str], end: Optional[str], rehydrate: bool) -> Iterator[Mapping]:
+    blocks, context_offsets = load_index(path)
+    compressed = path.endswith(".gz")
+    size = None if compressed else os.path.getsize(path)
+    contexts: Dict[str, Dict[str, Any]] = {}
+    # Compressed files are only read forwards, so contexts in skipped blocks are
+    # picked up on the way past rather than seeked back to when referenced.
+    pending = deque(sorted(context_offsets.values()) if compressed else [])
+
+    with (gzip.open if compressed else open)(path, "rb") as f:
+        def load_context(offset: int, length: int) -> None:
+            f.seek(offset)
+            record = json.loads(f.read(length))
+            contexts[record.pop(CONTEXT_KEY)] = record
+
+        def context(ctx_id: str) -> Dict[str, Any]:
+            if ctx_id not in contexts:
+                load_context(*context_offsets[ctx_id])
+            return contexts[ctx_id]
+
+        for block in _byte_blocks(blocks, size):
+            overlaps = _overlaps(block, start, end)
+            block_end = None if block["length"] is None else block["offset"] + block["length"]
+            while pending and (block_end is None or pending[0][0] < block_end):
+                offset, length = pending.popleft()
+                if not overlaps:  # contexts in a block that is read are parsed with it
+                    load_context(offset, length)
+            if not overlaps:
+                continue
+            f.seek(block["offset"])
+            data = f.read() if block["length"] is None else f.read(block["length"])
+            for line in data.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if CONTEXT_KEY in record:
+                    contexts[record.pop(CONTEXT_KEY)] = record
+                elif _in_range(record.get("timestamp"), start, end):
+                    if REF_KEY in record and rehydrate:
+                        ctx = context(record.pop(REF_KEY))
+                        yield LogRecord(record, ctx)
+                    else:
+                        yield record
+
+
+def _filter_table(table, start: Optional[str], end: Optional[str]):
+    if start is None and end is None:
+        return table
+    import pyarrow.compute as pc
+
+    mask = None
+    timestamps = table.column("timestamp")
+    if start is not None:
+        mask = pc.greater_equal(timestamps, start)
+    if end is not None:
+        upper = pc.less(timestamps, end)
+        mask = upper if mask is None else pc.and_(mask, upper)
+    return table.filter(pc.fill_null(mask, False))
+
+
+def _query_parquet(path: str, start: Optional[str], end: Optional[str]) -> Iterator[Mapping]:
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    column = parquet_file.schema_arrow.get_field_index("timestamp")
+    for i in range(parquet_file.num_row_groups):
+        stats = parquet_file.metadata.row_group(i).column(column).statistics
+        if stats is not None and stats.has_min_max:
+            if not _overlaps({"min_ts": stats.min, "max_ts": stats.max}, start, end):
+                continue
+        yield from rows_to_entries(_filter_table(parquet_file.read_row_group(i), start, end))
+
+
+def _query_arrow(path: str, start: Optional[str], end: Optional[str]) -> Iterator[Mapping]:
+    import pyarrow as pa
+
+    blocks, _ = load_index(path)
+    by_batch = {block["batch"]: block for block in blocks}
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            if i in by_batch and not _overlaps(by_batch[i], start, end):
+                continue
+            table = pa.Table.from_batches([reader.get_batch(i)])
+            yield from rows_to_entries(_filter_table(table, start, end))
+
+
+def query_file(path: str, start: TimeBound = None, end: TimeBound = None, rehydrate: bool = True) -> Iterator[Mapping]:
+    """Entries of one log file with ``start <= timestamp < end`` (either bound may be ``None``)."""
+    start, end = to_iso(start), to_iso(end)
+    fmt = log_format(path)
+    if fmt == "parquet":
+        return _query_parquet(path, start, end)
+    if fmt == "arrow":
+        return _query_arrow(path, start, end)
+    return _query_jsonl(path, start, end, rehydrate)
+
+
+def query_time_range(
+    path: str,
+    start: TimeBound = None,
+    end: TimeBound = None,
+    rehydrate: bool = True,
+) -> Iterator[Mapping]:
+    """Entries of ``path`` and its rotations with ``start <= timestamp < end``, oldest file first.
+
+    Bounds are ISO-8601 strings or datetimes and are compared with the
+    stored ISO timestamps, so they must use the same timezone convention.
+    """
+    for file in iter_log_files(path):
+        yield from query_file(file, start, end, rehydrate)
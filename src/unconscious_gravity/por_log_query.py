@@ -0,0 +1,309 @@
+"""Streaming queries with projection and predicate pushdown over PoR logs.
+
+:func:`query_logs` reads ``PoRLogWriter`` output in any sink format, as well
+as ``TurnLog`` Parquet files and compacted partition directories, and yields
+Arrow record batches holding only the requested columns and matching rows.
+
+* Parquet and Arrow IPC files are scanned with :mod:`pyarrow.dataset`, so
+  predicates on stored columns skip row groups by their statistics and only
+  projected columns are decoded. Fields kept in the JSON ``extra`` column
+  (e.g. an un-promoted ``model_version``) are decoded per batch after the
+  pushed-down filter has run.
+* JSONL logs are filtered record by record as they are read and never fully
+  materialised; a ``start``/``end`` window uses the sparse time index.
+
+Filters are ``(column, op, value)`` tuples combined with AND, where ``op`` is
+one of ``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, ``in`` and ``not in``.
+As in Arrow, missing values never match.
+
+Every yielded batch has the same schema. By default the columns are the PoR
+fields plus any other columns stored in columnar files. Column types come from
+the PoR log layout, then from the columnar files' own schemas, then from the
+optional ``schema`` argument. Any other field (e.g. one only found in JSONL
+records or the JSON ``extra`` column) is returned as a string, like a
+promoted ``extra_columns`` column.
+
+Example::
+
+    for batch in query_logs("logs/por_log.jsonl", columns=["question", "score"],
+                            filters=[("fired", "==", True), ("model_version", "==", "v1")]):
+        ...
+"""
+import glob
+import json
+import operator
+import os
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from unconscious_gravity.por_log_index import TimeBound, query_file, to_iso
+from unconscious_gravity.por_log_sinks import (
+    BASE_FIELDS,
+    EXTRA_FIELD,
+    INDEX_SUFFIX,
+    iter_log_files,
+    log_format,
+    shard_files,
+)
+
+Filter = Tuple[str, str, Any]
+
+BATCH_SIZE = 65_536
+# Types of the PoR log fields (the plain value types of the columnar sinks' schema).
+FIELD_TYPES: Dict[str, pa.DataType] = {
+    "question": pa.string(),
+    "score": pa.float64(),
+    "timestamp": pa.string(),
+    "context": pa.string(),
+    "time_score": pa.float64(),
+    "threshold": pa.float64(),
+    "fired": pa.bool_(),
+}
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda a, b: a in b,
+    "not in": lambda a, b: a not in b,
+}
+
+
+def _check_filters(filters: Sequence[Filter]) -> None:
+    for column, op, _ in filters:
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported operator {op!r} for column {column!r}; use one of {tuple(OPERATORS)}")
+
+
+def resolve_log_files(paths: Union[str, Iterable[str]]) -> List[str]:
+    """Expand log paths into files.
+
+    Each item may be a directory (searched recursively), a glob, an existing
+    file, or a log path whose shards and rotations are collected.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = glob.glob(os.path.join(glob.escape(path), "**", "*"), recursive=True)
+            files.extend(sorted(
+                f for f in found
+                if os.path.isfile(f) and not os.path.basename(f).startswith(".")
+                and not f.endswith((INDEX_SUFFIX, ".tmp"))
+            ))
+        elif glob.has_magic(path):
+            files.extend(sorted(f for f in glob.glob(path) if not f.endswith(INDEX_SUFFIX)))
+        else:
+            for shard in shard_files(path) or [path]:
+                files.extend(iter_log_files(shard))
+    return files
+
+
+def _matches(record: Mapping, filters: Sequence[Filter]) -> bool:
+    for column, op, value in filters:
+        field = record.get(column)
+        if field is None:
+            return False
+        try:
+            if not OPERATORS[op](field, value):
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+def _to_array(values: List[Any], type_: pa.DataType) -> pa.Array:
+    """``values`` as an array of ``type_``; strings hold other values as text (JSON for containers)."""
+    if pa.types.is_string(type_):
+        values = [
+            v if v is None or isinstance(v, str)
+            else json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else str(v)
+            for v in values
+        ]
+    try:
+        return pa.array(values, type_)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed value types: convert value by value, unconvertible values become null.
+        converted = []
+        for v in values:
+            try:
+                converted.append(pa.scalar(v, type_).as_py())
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+                converted.append(None)
+        return pa.array(converted, type_)
+
+
+def _batch_from_rows(rows: List[Mapping], schema: pa.Schema) -> pa.RecordBatch:
+    arrays = [_to_array([row.get(field.name) for row in rows], field.type) for field in schema]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _query_jsonl(
+    files: Sequence[str],
+    schema: pa.Schema,
+    filters: Sequence[Filter],
+    start: Optional[str],
+    end: Optional[str],
+    batch_size: int,
+) -> Iterator[pa.RecordBatch]:
+    rows: List[Mapping] = []
+    for file in files:
+        for record in query_file(file, start, end):
+            if _matches(record, filters):
+                rows.append(record)
+                if len(rows) >= batch_size:
+                    yield _batch_from_rows(rows, schema)
+                    rows = []
+    if rows:
+        yield _batch_from_rows(rows, schema)
+
+
+def _expression(
+    filters: Sequence[Filter],
+    start: Optional[str],
+    end: Optional[str],
+    names: Sequence[str],
+) -> Optional[ds.Expression]:
+    """Conjunction of the filters (and time bounds) on stored columns."""
+    expr = None
+    conditions = list(filters)
+    if start is not None:
+        conditions.append(("timestamp", ">=", start))
+    if end is not None:
+        conditions.append(("timestamp", "<", end))
+    for column, op, value in conditions:
+        if column not in names:
+            continue
+        field = ds.field(column)
+        if op == "in":
+            condition = field.isin(list(value))
+        elif op == "not in":
+            condition = ~field.isin(list(value))
+        else:
+            condition = OPERATORS[op](field, value)
+        expr = condition if expr is None else expr & condition
+    return expr
+
+
+def _stored_schema(files: Sequence[str], fmt: str) -> pa.Schema:
+    file_format = "parquet" if fmt == "parquet" else "ipc"
+    return pa.unify_schemas([ds.dataset(f, format=file_format).schema for f in files])
+
+
+def _query_columnar(
+    files: Sequence[str],
+    fmt: str,
+    stored: pa.Schema,
+    schema: pa.Schema,
+    filters: Sequence[Filter],
+    start: Optional[str],
+    end: Optional[str],
+    batch_size: int,
+) -> Iterator[pa.RecordBatch]:
+    file_format = "parquet" if fmt == "parquet" else "ipc"
+    names = stored.names
+    dataset = ds.dataset(list(files), schema=stored, format=file_format)
+
+    # Fields that are not stored as columns are looked up in the JSON extra column.
+    wanted = schema.names
+    residual = [f for f in filters if f[0] not in names]
+    derived = [c for c in wanted if c not in names]
+    needs_extra = (residual or derived) and EXTRA_FIELD in names
+    read = [c for c in wanted if c in names]
+    read += [f[0] for f in residual if f[0] in names and f[0] not in read]
+    if needs_extra and EXTRA_FIELD not in read:
+        read.append(EXTRA_FIELD)
+
+    scanner = dataset.scanner(columns=read, filter=_expression(filters, start, end, names), batch_size=batch_size)
+    for batch in scanner.to_batches():
+        if batch.num_rows == 0:
+            continue
+        extras = None
+        if residual or derived:
+            raw = batch.column(EXTRA_FIELD).to_pylist() if needs_extra else [None] * batch.num_rows
+            extras = [json.loads(e) if e else {} for e in raw]
+        if residual:
+            mask = [_matches(extra, residual) for extra in extras]
+            if not any(mask):
+                continue
+            batch = batch.filter(pa.array(mask))
+            extras = [extra for extra, keep in zip(extras, mask) if keep]
+        arrays = []
+        for field in schema:
+            if field.name in names:
+                arrays.append(batch.column(field.name).cast(field.type))
+            else:
+                arrays.append(_to_array([extra.get(field.name) for extra in extras], field.type))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _value_type(type_: pa.DataType) -> pa.DataType:
+    return type_.value_type if pa.types.is_dictionary(type_) else type_
+
+
+def _output_schema(
+    columns: Optional[Sequence[str]],
+    stored: Sequence[pa.Schema],
+    has_jsonl: bool,
+    schema: Optional[pa.Schema],
+) -> pa.Schema:
+    """One schema for every batch of a query: requested (or default) columns with fixed types."""
+    types = dict(FIELD_TYPES)
+    for file_schema in stored:
+        for field in file_schema:
+            if field.name not in FIELD_TYPES and not pa.types.is_null(field.type):
+                types.setdefault(field.name, _value_type(field.type))
+    if schema is not None:
+        types.update(zip(schema.names, schema.types))
+
+    if columns is None:
+        defaults: Dict[str, None] = {}
+        if has_jsonl:
+            defaults.update(dict.fromkeys(BASE_FIELDS))
+        for file_schema in stored:
+            defaults.update(dict.fromkeys(n for n in file_schema.names if n != EXTRA_FIELD))
+        columns = list(defaults)
+    return pa.schema([(name, types.get(name, pa.string())) for name in columns])
+
+
+def query_logs(
+    paths: Union[str, Iterable[str]],
+    columns: Optional[Sequence[str]] = None,
+    filters: Sequence[Filter] = (),
+    start: TimeBound = None,
+    end: TimeBound = None,
+    batch_size: int = BATCH_SIZE,
+    schema: Optional[pa.Schema] = None,
+) -> Iterator[pa.RecordBatch]:
+    """Stream ``pyarrow.RecordBatch`` objects of matching log records.
+
+    :param paths: Log path(s), directories or globs (see :func:`resolve_log_files`).
+    :param columns: Columns to return (default: the PoR fields and any other stored columns).
+    :param filters: ``(column, op, value)`` predicates, all of which must hold.
+    :param start: Keep records with ``timestamp >= start`` (ISO string or datetime).
+    :param end: Keep records with ``timestamp < end``.
+    :param batch_size: Maximum rows per yielded batch.
+    :param schema: Types for columns not covered by the PoR fields or stored columns
+        (which are otherwise returned as strings).
+    """
+    filters = list(filters)
+    _check_filters(filters)
+    start, end = to_iso(start), to_iso(end)
+
+    groups: Dict[str, List[str]] = {}
+    for file in resolve_log_files(paths):
+        groups.setdefault(log_format(file), []).append(file)
+    stored = {fmt: _stored_schema(files, fmt) for fmt, files in groups.items() if fmt != "jsonl"}
+    output = _output_schema(columns, list(stored.values()), "jsonl" in groups, schema)
+    for fmt, files in groups.items():
+        if fmt == "jsonl":
+            yield from _query_jsonl(files, output, filters, start, end, batch_size)
+        else:
+            yield from _query_columnar(files, fmt, stored[fmt], output, filters, start, end, batch_size)
+
@@ -0,0 +1,544 @@
+"""Pluggable output sinks for PoRLogWriter.
+
+A sink receives batches of log entries (dicts) and owns the on-disk format
+and rotation of one log path:
+
+* :class:`JSONLSink` - one JSON object per line, optionally gzip-compressed
+  when a file is rotated. With ``normalize=True`` the fields shared by all
+  candidates of one ``log_results`` call (context, time score, threshold and
+  extra data) are written once per file as a context record keyed by a
+  content hash, and entries only reference that id.
+* :class:`ParquetSink` / :class:`ArrowIPCSink` - columnar files with one row
+  group / record batch per flushed batch. The fixed PoR fields become typed
+  columns, any other fields are kept as a JSON ``extra`` column and fields
+  named in ``extra_columns`` (e.g. ``model_version``) are promoted to their
+  own string columns. ``context``, ``extra`` and promoted columns are
+  dictionary-encoded: per row group in Parquet, and against a per-file
+  dictionary written as deltas in Arrow IPC, so each distinct value is stored
+  once per row group / file.
+
+JSONL and Arrow IPC sinks also keep a sparse time index in a ``.idx``
+sidecar: one JSON line per written batch with its min/max ``timestamp`` and
+byte range (JSONL, offsets into the uncompressed text) or batch number (IPC),
+stamped with the log's size and mtime so that an index left behind by a
+rewritten log is detected and ignored.
+Parquet needs no sidecar since row groups carry column statistics. See
+:mod:`unconscious_gravity.por_log_index` for range queries.
+
+Several processes can log "to the same path" by each writing its own shard,
+``{root}.{host}-{pid}{ext}`` (see :func:`shard_path`); shards are merged
+by :mod:`unconscious_gravity.por_log_compaction`.
+
+Rotated files are atomically renamed to ``{path}.{timestamp}`` (plus ``.gz``
+when compressed), together with their index. :func:`read_log` iterates the entries
+of any of these files, rehydrating normalised entries lazily, and
+:func:`iter_log_files` lists a log path together with its rotations.
+"""
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import socket
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+BASE_FIELDS = ("question", "score", "timestamp", "context", "time_score", "threshold", "fired")
+EXTRA_FIELD = "extra"
+# Fields that vary per candidate; everything else is per-call context.
+ENTRY_FIELDS = ("question", "score", "timestamp", "fired")
+CONTEXT_KEY = "_context"  # id of a context record (normalised JSONL)
+REF_KEY = "_ctx"          # context id referenced by a normalised entry
+INDEX_SUFFIX = ".idx"
+PARQUET_SUFFIXES = (".parquet",)
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+JSONL_SUFFIXES = (".jsonl", ".json")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:  # pragma: no cover - optional dependency
+        raise ImportError("pyarrow is required for Parquet/Arrow logs: pip install pyarrow") from e
+    return pa
+
+
+def log_format(path: str) -> str:
+    """Format of a (possibly rotated) log file: ``"jsonl"``, ``"parquet"`` or ``"arrow"``.
+
+    The format suffix may be followed by a rotation timestamp and ``.gz``,
+    e.g. ``por_log.jsonl.20240101_120000.gz``.
+    """
+    name = os.path.basename(path).lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    for fmt, suffixes in (("parquet", PARQUET_SUFFIXES), ("arrow", ARROW_SUFFIXES), ("jsonl", JSONL_SUFFIXES)):
+        for suffix in suffixes:
+            if name.endswith(suffix) or f"{suffix}." in name:
+                return fmt
+    return "jsonl"
+
+
+def context_id(fields: Dict[str, Any]) -> str:
+    """Content hash identifying a set of shared context fields."""
+    blob = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+class LogRecord(Mapping):
+    """Read-only view of a normalised entry merged with its context record.
+
+    Lookups fall through to the shared context dict, so rehydrating an entry
+    does not copy the context.
+    """
+
+    __slots__ = ("_entry", "_context")
+
+    def __init__(self, entry: Dict[str, Any], context: Dict[str, Any]) -> None:
+        self._entry = entry
+        self._context = context
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._entry:
+            return self._entry[key]
+        return self._context[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._entry
+        for key in self._context:
+            if key not in self._entry:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self._entry) + sum(1 for key in self._context if key not in self._entry)
+
+    def __repr__(self) -> str:
+        return f"LogRecord({dict(self)!r})"
+
+
+def _time_range(entries: List[Dict[str, Any]]):
+    timestamps = [e["timestamp"] for e in entries if isinstance(e.get("timestamp"), str)]
+    return (min(timestamps), max(timestamps)) if timestamps else (None, None)
+
+
+def append_index(path: str, records: List[Dict[str, Any]]) -> None:
+    """Append records to the ``.idx`` sidecar of ``path``."""
+    with open(path + INDEX_SUFFIX, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(record) + "\n" for record in records))
+
+
+def index_stamp(path: str) -> Dict[str, int]:
+    """Size and mtime of ``path``; the latest stamp in a sidecar must match the log for it to be used."""
+    st = os.stat(path)
+    return {"log_size": st.st_size, "log_mtime_ns": st.st_mtime_ns}
+
+
+def shard_path(path: str, shard_id: Optional[str] = None) -> str:
+    """Per-process shard of ``path``: ``logs/por_log.jsonl`` -> ``logs/por_log.{host}-{pid}.jsonl``."""
+    if shard_id is None:
+        shard_id = f"{socket.gethostname().split('.')[0]}-{os.getpid()}"
+    root, ext = os.path.splitext(path)
+    return f"{root}.{shard_id}{ext}"
+
+
+def shard_files(path: str) -> List[str]:
+    """Base paths of ``path`` and of its shards that exist or have rotated files."""
+    root, ext = os.path.splitext(path)
+    prefix = os.path.basename(root) + "."
+    shards = set()
+    for match in glob.glob(glob.escape(root) + ".*" + glob.escape(ext) + "*") if ext else []:
+        shard_id, sep, rest = os.path.basename(match)[len(prefix):].partition(ext)
+        if shard_id and sep and "." not in shard_id and (not rest or rest.startswith(".")):
+            shards.add(f"{root}.{shard_id}{ext}")
+    has_own = os.path.exists(path) or glob.glob(glob.escape(path) + ".*")
+    return ([path] if has_own else []) + sorted(shards)
+
+
+def _rotated_path(path: str) -> str:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    rotated = f"{path}.{timestamp}"
+    n = 1
+    while os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+        rotated = f"{path}.{timestamp}_{n}"
+        n += 1
+    return rotated
+
+
+class LogSink:
+    """Base class: :meth:`write` batches of entries, then :meth:`close`.
+
+    Subclasses implement :meth:`_write`, :meth:`_size` and :meth:`_close_file`.
+    """
+
+    def __init__(self, path: str, max_file_size_mb: float = 10) -> None:
+        """
+        :param path: Log file path; rotated files are ``{path}.{timestamp}``.
+        :param max_file_size_mb: Size above which the file is rotated before the next write.
+        """
+        self.path = path
+        self.max_file_size_mb = max_file_size_mb
+        self.rows_written = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        """Append a batch of entries, rotating first if the file is too large."""
+        if not entries:
+            return
+        if self._size() / (1024 * 1024) > self.max_file_size_mb:
+            self.rotate()
+        self._write(entries)
+        self.rows_written += len(entries)
+
+    def rotate(self) -> Optional[str]:
+        """Close the current file and rename it to ``{path}.{timestamp}``; return the new name."""
+        self._close_file()
+        index = self.path + INDEX_SUFFIX
+        if not os.path.exists(self.path):
+            if os.path.exists(index):
+                os.remove(index)  # stale index without its log
+            return None
+        rotated = _rotated_path(self.path)
+        os.replace(self.path, rotated)
+        if os.path.exists(index):
+            os.replace(index, rotated + INDEX_SUFFIX)
+        logger.info("Rotated log file to %s", rotated)
+        return rotated
+
+    def close(self) -> None:
+        """Flush and finalise the current file."""
+        self._close_file()
+
+    def __enter__(self) -> "LogSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def _size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def _close_file(self) -> None:
+        pass
+
+
+class JSONLSink(LogSink):
+    """JSON Lines, appended per batch; rotated files are optionally gzip-compressed."""
+
+    def __init__(
+        self,
+        path: str,
+        max_file_size_mb: float = 10,
+        compress_on_rotation: bool = False,
+        normalize: bool = False,
+        index: bool = True,
+    ) -> None:
+        """
+        :param compress_on_rotation: Gzip rotated files to ``{path}.{timestamp}.gz``.
+        :param normalize: Write shared fields once per file as context records.
+        :param index: Maintain the ``.idx`` time index sidecar.
+        """
+        super().__init__(path, max_file_size_mb)
+        self.compress_on_rotation = compress_on_rotation
+        self.normalize = normalize
+        self.index = index
+        self._contexts: set = set()  # context ids already written to the current file
+        self._last_shared: Optional[Dict[str, Any]] = None
+        self._last_id = ""
+
+    def _normalized_lines(self, entries: List[Dict[str, Any]], written: set) -> Iterator[Dict[str, Any]]:
+        """Records for ``entries``; ids of contexts emitted are added to ``written``."""
+        for entry in entries:
+            shared = {k: v for k, v in entry.items() if k not in ENTRY_FIELDS}
+            if shared != self._last_shared:  # consecutive entries usually share a call
+                self._last_shared, self._last_id = shared, context_id(shared)
+            if self._last_id not in self._contexts and self._last_id not in written:
+                written.add(self._last_id)
+                yield {CONTEXT_KEY: self._last_id, **shared}
+            record = {k: entry[k] for k in ENTRY_FIELDS if k in entry}
+            record[REF_KEY] = self._last_id
+            yield record
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        # Contexts only count as written once the whole batch has been serialised and written.
+        written: set = set()
+        records = list(self._normalized_lines(entries, written)) if self.normalize else entries
+        lines = [(json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8") for record in records]
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(b"".join(lines))
+        self._contexts |= written
+        if not self.index:
+            return
+
+        first, last = _time_range(entries)
+        index = [{"min_ts": first, "max_ts": last, "offset": offset,
+                  "length": sum(map(len, lines)), "rows": len(entries), **index_stamp(self.path)}]
+        if self.normalize:
+            position = offset
+            for record, line in zip(records, lines):
+                if CONTEXT_KEY in record:
+                    index.append({"context": record[CONTEXT_KEY], "offset": position, "length": len(line)})
+                position += len(line)
+        append_index(self.path, index)
+
+    def rotate(self) -> Optional[str]:
+        self._contexts.clear()
+        rotated = super().rotate()
+        if rotated is None or not self.compress_on_rotation:
+            return rotated
+        compressed = rotated + ".gz"
+        with open(rotated, "rb") as src, gzip.open(compressed + ".tmp", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(compressed + ".tmp", compressed)
+        os.remove(rotated)
+        if os.path.exists(rotated + INDEX_SUFFIX):
+            os.replace(rotated + INDEX_SUFFIX, compressed + INDEX_SUFFIX)
+            append_index(compressed, [index_stamp(compressed)])
+        return compressed
+
+
+class _ColumnarSink(LogSink):
+    """Shared schema/row conversion for the Parquet and Arrow IPC sinks."""
+
+    def __init__(self, path: str, max_file_size_mb: float = 10, extra_columns: Sequence[str] = ()) -> None:
+        """
+        :param extra_columns: Extra fields stored as their own (string) columns
+            instead of inside the JSON ``extra`` column.
+        """
+        super().__init__(path, max_file_size_mb)
+        pa = _require_pyarrow()
+        self._pa = pa
+        self.extra_columns = tuple(extra_columns)
+        self.dictionary_columns = ("context",) + self.extra_columns + (EXTRA_FIELD,)
+        interned = pa.dictionary(pa.int32(), pa.string())
+        self.schema = pa.schema(
+            [
+                ("question", pa.string()),
+                ("score", pa.float64()),
+                ("timestamp", pa.string()),
+                ("context", interned),
+                ("time_score", pa.float64()),
+                ("threshold", pa.float64()),
+                ("fired", pa.bool_()),
+            ]
+            + [(name, interned) for name in self.extra_columns]
+            + [(EXTRA_FIELD, interned)]
+        )
+        self._file = None
+        self._writer = None
+        # Per-file dictionaries for cumulative_dictionaries sinks (see _intern).
+        self._dictionaries: Dict[str, Dict[str, int]] = {}
+
+    # Whether each batch's dictionaries extend those of the previous batches.
+    cumulative_dictionaries = False
+
+    def _intern(self, name: str, values: List[Optional[str]]):
+        if not self.cumulative_dictionaries:
+            # Only this batch's distinct values: Parquet stores a dictionary per row group.
+            return self._pa.array(values, self._pa.string()).dictionary_encode()
+        dictionary = self._dictionaries.setdefault(name, {})
+        indices = [None if v is None else dictionary.setdefault(v, len(dictionary)) for v in values]
+        return self._pa.DictionaryArray.from_arrays(
+            self._pa.array(indices, self._pa.int32()),
+            self._pa.array(list(dictionary), self._pa.string()),
+        )
+
+    def _to_batch(self, entries: List[Dict[str, Any]]):
+        known = set(BASE_FIELDS) | set(self.extra_columns)
+        columns: Dict[str, list] = {name: [] for name in self.schema.names}
+        for entry in entries:
+            for name in BASE_FIELDS:
+                columns[name].append(entry.get(name))
+            for name in self.extra_columns:
+                value = entry.get(name)
+                columns[name].append(None if value is None else str(value))
+            extra = {k: v for k, v in entry.items() if k not in known}
+            columns[EXTRA_FIELD].append(json.dumps(extra, ensure_ascii=False) if extra else None)
+        arrays = [
+            self._intern(field.name, columns[field.name]) if field.name in self.dictionary_columns
+            else self._pa.array(columns[field.name], field.type)
+            for field in self.schema
+        ]
+        return self._pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        if self._writer is None:
+            self.rotate()  # columnar files cannot be appended to
+            self._dictionaries.clear()
+            self._file = self._pa.OSFile(self.path, "wb")
+            self._writer = self._open_writer(self._file)
+        self._write_batch(self._to_batch(entries))
+
+    def _size(self) -> int:
+        return self._file.tell() if self._file is not None else super()._size()
+
+    def _close_file(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._file.close()
+            self._writer = None
+            self._file = None
+
+    def _open_writer(self, sink):
+        raise NotImplementedError
+
+    def _write_batch(self, batch) -> None:
+        raise NotImplementedError
+
+
+class ParquetSink(_ColumnarSink):
+    """Parquet file with one row group per written batch.
+
+    Parquet files cannot be appended to, so an existing file at ``path`` is
+    rotated away before the first write.
+    """
+
+    def _open_writer(self, sink):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(sink, self.schema)
+
+    def _write_batch(self, batch) -> None:
+        self._writer.write_table(self._pa.Table.from_batches([batch]))
+
+
+class ArrowIPCSink(_ColumnarSink):
+    """Arrow IPC (Feather v2) file with one record batch per written batch.
+
+    Like :class:`ParquetSink`, an existing file is rotated away before the
+    first write. Batches are listed in the ``.idx`` time index unless
+    ``index=False``. Dictionaries are shared across the batches of a file and
+    written as deltas, so each distinct value is stored once per file.
+    """
+
+    cumulative_dictionaries = True
+
+    def __init__(
+        self,
+        path: str,
+        max_file_size_mb: float = 10,
+        extra_columns: Sequence[str] = (),
+        index: bool = True,
+    ) -> None:
+        super().__init__(path, max_file_size_mb, extra_columns)
+        self.index = index
+        self._batches = 0
+
+    def _open_writer(self, sink):
+        self._batches = 0
+        options = self._pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        return self._pa.ipc.new_file(sink, self.schema, options=options)
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        super()._write(entries)
+        if self.index:
+            first, last = _time_range(entries)
+            append_index(self.path, [{"min_ts": first, "max_ts": last,
+                                      "batch": self._batches - 1, "rows": len(entries)}])
+
+    def _write_batch(self, batch) -> None:
+        self._writer.write_batch(batch)
+        self._batches += 1
+
+    def _close_file(self) -> None:
+        was_open = self._writer is not None
+        super()._close_file()
+        if was_open and self.index:
+            append_index(self.path, [index_stamp(self.path)])  # the footer is written on close
+
+
+def open_log_sink(
+    path: str,
+    max_file_size_mb: float = 10,
+    compress_on_rotation: bool = False,
+    extra_columns: Sequence[str] = (),
+    normalize: bool = False,
+    index: bool = True,
+) -> LogSink:
+    """Pick a sink from the suffix of ``path`` (``.parquet``, ``.arrow``; anything else is JSONL).
+
+    ``compress_on_rotation`` and ``normalize`` apply to JSONL only; columnar
+    sinks always intern shared strings. ``index`` has no effect for Parquet.
+    """
+    fmt = log_format(path)
+    if fmt == "parquet":
+        return ParquetSink(path, max_file_size_mb, extra_columns)
+    if fmt == "arrow":
+        return ArrowIPCSink(path, max_file_size_mb, extra_columns, index)
+    return JSONLSink(path, max_file_size_mb, compress_on_rotation, normalize, index)
+
+
+def iter_log_files(path: str) -> List[str]:
+    """Rotated files of ``path`` (oldest first) followed by ``path`` itself, if present."""
+    rotated = sorted(
+        p for p in glob.glob(glob.escape(path) + ".*")
+        if not p.endswith((".tmp", ".idx"))
+    )
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def rows_to_entries(table) -> Iterator[Dict[str, Any]]:
+    """Convert rows of a columnar log table back into entry dicts."""
+    for batch in table.to_batches():
+        for row in batch.to_pylist():
+            extra = row.pop(EXTRA_FIELD, None)
+            entry = {k: v for k, v in row.items() if v is not None or k in BASE_FIELDS}
+            if extra:
+                entry.update(json.loads(extra))
+            yield entry
+
+
+def read_log(path: str, rehydrate: bool = True) -> Iterator[Mapping]:
+    """Iterate the entries of one log file written by any sink (including ``.gz`` rotations).
+
+    Entries of normalised JSONL files are yielded as :class:`LogRecord` views
+    over their context record; with ``rehydrate=False`` they are yielded as
+    stored (with a ``_ctx`` reference) and context records are skipped.
+    """
+    fmt = log_format(path)
+    if fmt == "parquet":
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for i in range(parquet_file.num_row_groups):
+            yield from rows_to_entries(parquet_file.read_row_group(i))
+        return
+    if fmt == "arrow":
+        pa = _require_pyarrow()
+        with pa.memory_map(path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield from rows_to_entries(pa.Table.from_batches([reader.get_batch(i)]))
+        return
+
+    contexts: Dict[str, Dict[str, Any]] = {}
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if CONTEXT_KEY in record:
+                contexts[record.pop(CONTEXT_KEY)] = record
+            elif REF_KEY in record and rehydrate:
+                yield LogRecord(record, contexts[record.pop(REF_KEY)])
+            else:
+                yield record
+
+
+def read_logs(path: str, rehydrate: bool = True) -> Iterator[Mapping]:
+    """Iterate the entries of ``path`` and all of its rotations, oldest file first."""
+    for file in iter_log_files(path):
+        yield from read_log(file, rehydrate)
@@ -1,20 +1,62 @@
 # por_log_writer.py — PoR照合結果ログ保存スクリプト（改良版）
 
-import json
+import atexit
 import os
+import queue
+import threading
+import time
 from datetime import datetime
-from typing import List, Tuple, Dict, Optional
+from typing import Callable, List, Sequence, Tuple, Dict, Optional
 import logging
-from por_inference import PoRInference  # 実行例のため残す
+
+from unconscious_gravity.por_log_sinks import LogSink, open_log_sink, shard_path
 
 # ロギング設定
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 非同期モードのキューが満杯のときの挙動
+BACKPRESSURE_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+_STOP = object()  # 書き込みスレッドへの終了指示
+
+# 書き込みスレッドの生存確認の間隔（秒）
+_POLL_INTERVAL = 0.1
+
+
 class PoRLogWriter:
-    """PoR照合結果をログに保存するクラス"""
+    """PoR照合結果をログに保存するクラス
+
+    ``async_mode=True`` では、エントリは有界キューに積まれ、専用の書き込み
+    スレッドがバッチ単位（``buffer_size_limit`` 件または ``flush_interval`` 秒ごと）
+    でファイルに書き込む。呼び出し側のスレッドはファイル I/O を行わない。
+    キューが満杯のときは ``backpressure`` に従って待機または破棄する。
+    終了時は ``close()``（コンテキストマネージャ、または ``atexit``）で
+    残りのエントリを書き出してからスレッドを停止する。
+
+    書き込みに失敗したバッチは、I/O エラー（``OSError``）なら保持して次回に
+    再試行し、シリアライズできない値などのデータエラーなら問題のエントリだけを
+    破棄して ``failed`` に数える。非同期モードで起きたエラーは次の ``flush()`` /
+    ``close()`` で呼び出し側に再送出する。非同期モードで保持するエントリは
+    ``buffer_size_limit`` 件までで、上限に達すると再試行に成功するまでキューから
+    取り出さないため、以降のエントリには ``backpressure`` が適用される。
+    """
 
-    def __init__(self, log_path: str = "por_log.jsonl", max_file_size_mb: int = 10, buffer_size_limit: int = 100):
+    def __init__(
+        self,
+        log_path: str = "por_log.jsonl",
+        max_file_size_mb: int = 10,
+        buffer_size_limit: int = 100,
+        async_mode: bool = False,
+        queue_size: int = 10000,
+        flush_interval: float = 1.0,
+        backpressure: str = "block",
+        sink: Optional[LogSink] = None,
+        normalize: bool = False,
+        shard: bool = False,
+        compress_on_rotation: bool = False,
+        extra_columns: Sequence[str] = (),
+    ):
         """
         初期化
 
@@ -22,30 +64,63 @@ class PoRLogWriter:
             log_path (str): ログファイルのパス（デフォルト: por_log.jsonl）
             max_file_size_mb (int): ログファイルの最大サイズ（MB）
             buffer_size_limit (int): ログエントリのバッファサイズ制限
+            async_mode (bool): 専用スレッドでバックグラウンド書き込みを行うか
+            queue_size (int): 非同期モードのキューに保持できるエントリ数の上限
+            flush_interval (float): 非同期モードでバッファを書き出す最大間隔（秒）
+            backpressure (str): キュー満杯時の方針。"block"（空くまで待つ）、
+                "drop_newest"（新しいエントリを捨てる）、"drop_oldest"（最も古いエントリを捨てる）
+            sink (Optional[LogSink]): 出力先。省略時は ``log_path`` の拡張子から選ぶ
+                （``.parquet`` / ``.arrow`` は列指向、それ以外は JSONL）
+            normalize (bool): JSONL で、1 回の呼び出しで共通のコンテキスト・メタデータを
+                ファイルごとに 1 度だけ書き、エントリは ID で参照する（``sink`` 省略時のみ）
+            shard (bool): 複数プロセスから同じ ``log_path`` に書くため、プロセスごとの
+                シャード ``{root}.{host}-{pid}{ext}`` に書き込む（``sink`` 省略時のみ）
+            compress_on_rotation (bool): JSONL で、ローテーションしたファイルを gzip 圧縮する
+                （``sink`` 省略時のみ）
+            extra_columns (Sequence[str]): 列指向の出力で、独立した列として保存する追加フィールド
+                （``sink`` 省略時のみ）
         """
-        self.log_path = log_path
+        self.log_path = shard_path(log_path) if shard and sink is None else log_path
         self.max_file_size_mb = max_file_size_mb
         self.buffer: List[Dict] = []  # ログエントリのバッファ
         self.buffer_size_limit = buffer_size_limit
+        self.async_mode = async_mode
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"backpressure must be one of {BACKPRESSURE_POLICIES}: {backpressure}")
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure
+        self.dropped = 0  # バックプレッシャーで破棄したエントリ数
+        self.failed = 0  # 書き込めずに破棄したエントリ数
+        self._error: Optional[BaseException] = None  # 呼び出し側に未報告の書き込みエラー
+        self._closed = False
+        self._stalled = False  # 再試行待ちのバッチが上限に達し、キューの取り出しを止めているか
+        self._attempts = 0  # 停止中に行った再試行の回数
+        self._wakeup = threading.Event()  # 停止中の再試行を前倒しする
         self._ensure_log_directory_exists()
+        if sink is None:
+            sink = open_log_sink(
+                self.log_path, max_file_size_mb, compress_on_rotation, extra_columns, normalize=normalize
+            )
+        self.sink = sink
+
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        if async_mode:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._writer_loop, name="PoRLogWriter", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def __enter__(self) -> "PoRLogWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
 
     def _ensure_log_directory_exists(self) -> None:
         """ログファイルのディレクトリが存在しない場合は作成する"""
         os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
 
-    def _rotate_log_file(self) -> None:
-        """ログファイルが最大サイズを超えた場合、ローテーション"""
-        try:
-            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) / (1024 * 1024) > self.max_file_size_mb:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                new_path = f"{self.log_path}.{timestamp}"
-                os.rename(self.log_path, new_path)
-                logger.info(f"Rotated log file to {new_path}")
-        except FileNotFoundError:
-            logger.warning(f"Log file not found at {self.log_path}, no rotation needed.")
-        except (OSError, PermissionError) as e:
-            logger.error(f"Failed to rotate log file: {e}")
-
     def _validate_entry(self, entry: Dict) -> bool:
         """ログエントリの必須フィールドを検証"""
         required_fields = ["question", "score", "timestamp", "context", "time_score", "threshold", "fired"]
@@ -76,10 +151,12 @@ class PoRLogWriter:
                 if extra_data:
                     entry.update(extra_data)
 
-                if self._validate_entry(entry):
-                    self.buffer.append(entry)
-                else:
+                if not self._validate_entry(entry):
                     logger.warning(f"Invalid log entry: {entry}")
+                elif self.async_mode:
+                    self._enqueue(entry)
+                else:
+                    self.buffer.append(entry)
 
             if len(self.buffer) >= self.buffer_size_limit:
                 self._flush_buffer()
@@ -87,31 +164,235 @@ class PoRLogWriter:
         except Exception as e:
             logger.error(f"Error logging results: {e}")
 
-    def flush(self) -> None:
-        """バッファの内容を強制的にログファイルに書き込む"""
+    def _enqueue(self, item) -> None:
+        """バックプレッシャー方針に従ってキューに積む"""
+        if self._closed:
+            logger.warning("PoRLogWriter is closed; dropping log entry")
+            self.dropped += 1
+            return
+        if self.backpressure == "block":
+            self._put(item)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                if self.backpressure == "drop_newest":
+                    self.dropped += 1
+                    return
+                try:
+                    oldest = self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+                if isinstance(oldest, threading.Event):
+                    oldest.set()  # flush() の待機を解放する
+                else:
+                    self.dropped += 1
+
+    def _put(self, item, timeout: Optional[float] = None, abort: Optional[Callable[[], bool]] = None) -> bool:
+        """書き込みスレッドが生きている間、キューが空くまで待って積む。積めたかを返す
+
+        ``abort`` が真を返したら待機をやめる。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._thread.is_alive():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if abort is not None and abort():
+                return False
+            try:
+                self._queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        logger.error("PoRLogWriter thread is not running; dropping queued item")
+        if isinstance(item, dict):
+            self.dropped += 1
+        return False
+
+    def _wait(self, event: threading.Event, timeout: Optional[float], abort: Optional[Callable[[], bool]] = None) -> bool:
+        """書き込みスレッドが生きている間 ``event`` を待つ。セットされたかを返す
+
+        ``abort`` が真を返したら待機をやめる。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not event.wait(_POLL_INTERVAL):
+            if not self._thread.is_alive():
+                return event.is_set()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if abort is not None and abort():
+                return event.is_set()
+        return True
+
+    def _retry_failed_since(self) -> Callable[[], bool]:
+        """停止中の書き込みスレッドを起こし、以後の再試行が失敗したら真を返す関数を返す"""
+        attempts = self._attempts
+        self._wakeup.set()
+        return lambda: self._stalled and self._attempts > attempts
+
+    def _raise_error(self) -> None:
+        """書き込みスレッドで起きた未報告のエラーを呼び出し側に送出する"""
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _writer_loop(self) -> None:
+        """書き込みスレッド: キューからエントリを集めてバッチで書き込む
+
+        再試行のために保持したバッチが ``buffer_size_limit`` 件に達している間は
+        キューから取り出さず、``flush_interval`` 秒ごと（または ``flush()`` /
+        ``close()`` の要求時）に再試行する。
+        """
+        batch: List[Dict] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if len(batch) >= self.buffer_size_limit:
+                self._stalled = True
+                self._wakeup.wait(max(deadline - time.monotonic(), 0))
+                self._wakeup.clear()
+                try:
+                    batch = self._write_batch(batch)
+                except Exception as e:
+                    logger.exception("Unexpected error in PoRLogWriter thread")
+                    self._error = e
+                self._attempts += 1
+                deadline = time.monotonic() + self.flush_interval
+                if batch and self._closed:
+                    self._discard(batch)
+                    return
+                continue
+            self._stalled = False
+            item = None
+            try:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    pass
+
+                if isinstance(item, dict):
+                    batch.append(item)
+                    if len(batch) < self.buffer_size_limit:
+                        continue
+                batch = self._write_batch(batch)
+            except Exception as e:  # スレッドを止めないよう、想定外のエラーも記録して続行する
+                logger.exception("Unexpected error in PoRLogWriter thread")
+                self._error = e
+            finally:
+                if isinstance(item, threading.Event):  # flush() の要求
+                    item.set()
+            if not isinstance(item, threading.Event):
+                deadline = time.monotonic() + self.flush_interval
+            if item is _STOP:
+                if batch:
+                    self._discard(batch)
+                return
+
+    def _discard(self, batch: List[Dict]) -> None:
+        """close() 後も書き込めないバッチとキューの残りを破棄する"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, dict):
+                batch.append(item)
+            elif isinstance(item, threading.Event):
+                item.set()
+        logger.error(f"Discarding {len(batch)} unwritten log entries on close")
+        self.failed += len(batch)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """バッファの内容を強制的にログファイルに書き込む
+
+        非同期モードでは、それまでにキューに積まれたエントリが書き込まれるまで
+        （最大 ``timeout`` 秒）待ち、書き込みスレッドで起きたエラーを送出する。
+        """
+        if self.async_mode:
+            if self._closed:
+                return
+            done = threading.Event()
+            abort = self._retry_failed_since()
+            if self._put(done, timeout, abort) and not self._wait(done, timeout, abort):
+                logger.warning("Timed out waiting for PoRLogWriter flush")
+            self._raise_error()
+            return
         self._flush_buffer()
 
-    def _flush_buffer(self) -> None:
-        """バッファの内容をログファイルに書き込み"""
-        if not self.buffer:
+    def close(self, timeout: Optional[float] = None) -> None:
+        """残りのエントリを書き出し、非同期モードでは書き込みスレッドを停止する
+
+        非同期モードでは書き込みスレッドの終了を最大 ``timeout`` 秒待ち、
+        書き込みスレッドで起きたエラーを送出する。
+        """
+        if self._closed:
             return
+        self._closed = True
+        if self.async_mode:
+            atexit.unregister(self.close)
+            self._put(_STOP, timeout, self._retry_failed_since())
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("Timed out waiting for PoRLogWriter thread to stop")
+        else:
+            self._flush_buffer()
+        self.sink.close()
+        if self.async_mode:
+            self._raise_error()
+
+    def _write_entries(self, entries: List[Dict]) -> Optional[Exception]:
+        """エントリを sink に書き込み（必要ならローテーション）、失敗時はその例外を返す"""
+        if not entries:
+            return None
 
         try:
-            self._rotate_log_file()
-            with open(self.log_path, "a", encoding="utf-8") as f:
-                for entry in self.buffer:
-                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-            logger.info(f"Wrote {len(self.buffer)} entries to {self.log_path}")
-            self.buffer.clear()
-        except (OSError, PermissionError) as e:
+            self.sink.write(entries)
+            logger.info(f"Wrote {len(entries)} entries to {self.log_path}")
+            return None
+        except Exception as e:
             logger.error(f"Failed to write log: {e}")
+            return e
+
+    def _write_batch(self, entries: List[Dict]) -> List[Dict]:
+        """バッチを書き込み、再試行のために保持するエントリを返す
+
+        I/O エラーならバッチ全体を保持する。それ以外（シリアライズできない値など）は
+        1 件ずつ書き直し、書けないエントリだけを破棄する。
+        """
+        error = self._write_entries(entries)
+        if error is None:
+            return []
+        self._error = error
+        if isinstance(error, OSError):
+            return entries
+        kept = []
+        for entry in entries:
+            error = self._write_entries([entry])
+            if error is None:
+                continue
+            self._error = error
+            if isinstance(error, OSError):
+                kept.append(entry)
+            else:
+                logger.error(f"Dropping unwritable log entry: {entry!r}")
+                self.failed += 1
+        return kept
+
+    def _flush_buffer(self) -> None:
+        """バッファの内容をログファイルに書き込み"""
+        if self.buffer:
+            self.buffer = self._write_batch(self.buffer)
 
     def __del__(self):
-        """デストラクタでバッファをフラッシュ"""
-        self._flush_buffer()
+        """デストラクタでバッファをフラッシュしてファイルを確定"""
+        if not getattr(self, "async_mode", True) and not self._closed:
+            self.close()
 
 # 実行例
 if __name__ == "__main__":
+    from por_inference import PoRInference  # 実行例のため残す
+
     por = PoRInference(threshold=0.5)
     log_writer = PoRLogWriter(log_path="logs/por_log.jsonl", max_file_size_mb=5, buffer_size_limit=50)
 
@@ -1,7 +1,7 @@
 import argparse
 from pathlib import Path
 from unconscious_gravity_exp.proxy_config import TurnLog
-from unconscious_gravity_exp.logger import append_log
+from unconscious_gravity_exp.logger import TurnLogWriter
 
 def main():
     parser = argparse.ArgumentParser(description="UGHer CLI runner")
@@ -11,18 +11,19 @@ def main():
 
     Path("data").mkdir(exist_ok=True)
 
-    for i in range(1, args.turns + 1):
-        turn = TurnLog(
-            TurnId=i,
-            Prompt=f"Prompt {i}",
-            Response=f"Response {i}",
-            Q_self=0.5,
-            S_q=0.8,
-            t_total=100 + i,
-            M=0.2 * i
-        )
-        append_log(turn, file=args.log)
-        print(f"[{i}] TurnLog written to {args.log}")
+    with TurnLogWriter(args.log) as writer:
+        for i in range(1, args.turns + 1):
+            turn = TurnLog(
+                TurnId=i,
+                Prompt=f"Prompt {i}",
+                Response=f"Response {i}",
+                Q_self=0.5,
+                S_q=0.8,
+                t_total=100 + i,
+                M=0.2 * i
+            )
+            writer.append(turn)
+            print(f"[{i}] TurnLog written to {args.log}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
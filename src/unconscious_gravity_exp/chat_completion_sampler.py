@@ -1,18 +1,41 @@
 """Simple sampler for OpenAI chat completions."""
 
-from typing import List
+import asyncio
+import logging
+import random
+import threading
+from typing import TYPE_CHECKING, Any, List, Optional, Sequence
+
 import openai
 
+if TYPE_CHECKING:
+    from unconscious_gravity_exp.completion_cache import CompletionCache
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: rate limits, timeouts, dropped connections and 5xx.
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
 
 class ChatCompletionSampler:
     """Utility to sample multiple chat completions using the OpenAI API."""
 
-    def __init__(self, model: str = "gpt-3.5-turbo") -> None:
-        """Initialize with target model name."""
+    def __init__(self, model: str = "gpt-3.5-turbo", cache: Optional["CompletionCache"] = None) -> None:
+        """Initialize with target model name and an optional response cache."""
         self.model = model
+        self.cache = cache
 
     def sample(self, prompt: str, n: int = 1) -> List[str]:
         """Return ``n`` completions for ``prompt``."""
+        if self.cache is not None:
+            return self.cache.get_or_create(self.model, prompt, n, lambda: self._sample(prompt, n))
+        return self._sample(prompt, n)
+
+    def _sample(self, prompt: str, n: int) -> List[str]:
         resp = openai.chat.completions.create(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
@@ -20,3 +43,193 @@ class ChatCompletionSampler:
         )
         return [choice.message.content for choice in resp.choices]
 
+
+class TokenBucket:
+    """Asyncio token bucket: ``rate`` tokens per second, bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError(f"rate must be positive: {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until ``tokens`` are available and take them."""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class AsyncChatCompletionSampler:
+    """Concurrent chat-completion sampler over one shared ``AsyncOpenAI`` client.
+
+    Requests share the client's connection pool, at most ``max_concurrency``
+    are in flight, an optional token bucket caps the request rate, and
+    rate-limit, connection and 5xx errors are retried with exponential
+    backoff and jitter (honouring ``Retry-After``).
+
+    :meth:`sample_batch` runs on a private event loop thread that lives until
+    :meth:`close`, so repeated synchronous calls keep reusing the same client
+    and its open connections. Async callers use :meth:`sample_many` and
+    ``async with`` / :meth:`aclose`. The concurrency and rate limits belong to
+    one event loop. When the sampler is used from a new loop they are
+    recreated, and so is the client if the sampler created it.
+    """
+
+    def __init__(
+        self,
+        model: str = "gpt-3.5-turbo",
+        client: Optional[Any] = None,
+        max_concurrency: int = 16,
+        requests_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        cache: Optional["CompletionCache"] = None,
+        **client_kwargs: Any,
+    ) -> None:
+        """
+        :param model: Target model name.
+        :param client: Pre-built ``openai.AsyncOpenAI`` (or compatible) client.
+        :param max_concurrency: Maximum number of requests in flight.
+        :param requests_per_second: Token-bucket rate limit; ``None`` disables it.
+        :param burst: Token-bucket capacity (defaults to ``requests_per_second``).
+        :param max_retries: Retries per request after the first attempt.
+        :param backoff_base: Backoff before the first retry, doubled per attempt.
+        :param backoff_max: Upper bound on a single backoff.
+        :param cache: Optional response cache; identical concurrent requests are coalesced.
+        :param client_kwargs: Passed to ``openai.AsyncOpenAI`` (e.g. ``base_url``, ``api_key``).
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be positive: {max_concurrency}")
+        self.model = model
+        self._client_kwargs = client_kwargs
+        self._owns_client = client is None
+        self.client = client if client is not None else self._new_client()
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Loop the client and the limits below are bound to (set on first use).
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket: Optional[TokenBucket] = None
+        self._runner: Optional[asyncio.AbstractEventLoop] = None
+        self._runner_thread: Optional[threading.Thread] = None
+        self.cache = cache
+        self.retries = 0
+
+    async def __aenter__(self) -> "AsyncChatCompletionSampler":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    def _new_client(self) -> Any:
+        # Retries are handled here so they share the concurrency and rate limits.
+        return openai.AsyncOpenAI(max_retries=0, **self._client_kwargs)
+
+    def _bind(self) -> None:
+        """Create the limits (and an owned client) for the running loop if it changed."""
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        if self._loop is not None and self._owns_client:
+            # Pooled connections belong to the previous loop and cannot be reused here.
+            self.client = self._new_client()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._bucket = TokenBucket(self.requests_per_second, self.burst) if self.requests_per_second else None
+        self._loop = loop
+
+    async def aclose(self) -> None:
+        """Close the underlying client and its connections."""
+        if self._owns_client and self._loop not in (None, asyncio.get_running_loop()):
+            # The connections belong to an earlier loop; once it is closed they cannot be closed cleanly.
+            self.client, self._loop = self._new_client(), None
+            return
+        await self.client.close()
+
+    def close(self) -> None:
+        """Close the client and stop the event loop thread used by :meth:`sample_batch`."""
+        if self._runner is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.aclose(), self._runner).result()
+        self._runner.call_soon_threadsafe(self._runner.stop)
+        self._runner_thread.join()
+        self._runner.close()
+        self._runner = self._runner_thread = None
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), self.backoff_max)
+        except ValueError:
+            pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _create(self, prompt: str, n: int) -> Any:
+        return await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            n=n,
+        )
+
+    async def sample(self, prompt: str, n: int = 1) -> List[str]:
+        """Return ``n`` completions for ``prompt``."""
+        if self.cache is not None:
+            return await self.cache.aget_or_create(self.model, prompt, n, lambda: self._sample(prompt, n))
+        return await self._sample(prompt, n)
+
+    async def _sample(self, prompt: str, n: int) -> List[str]:
+        self._bind()
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                if self._bucket is not None:
+                    await self._bucket.acquire()
+                try:
+                    resp = await self._create(prompt, n)
+                    return [choice.message.content for choice in resp.choices]
+                except RETRYABLE_ERRORS as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff(attempt, e)
+                    error = type(e).__name__
+            # Back off outside the semaphore so other requests can proceed.
+            attempt += 1
+            self.retries += 1
+            logger.warning("Retrying completion in %.2fs after %s (attempt %d)", delay, error, attempt)
+            await asyncio.sleep(delay)
+
+    async def sample_many(self, prompts: Sequence[str], n: int = 1) -> List[List[str]]:
+        """Sample all ``prompts`` concurrently; results are in prompt order."""
+        return list(await asyncio.gather(*(self.sample(prompt, n) for prompt in prompts)))
+
+    def sample_batch(self, prompts: Sequence[str], n: int = 1) -> List[List[str]]:
+        """Blocking wrapper around :meth:`sample_many` for synchronous callers.
+
+        Calls share one event loop thread and client until :meth:`close`.
+        """
+        if self._runner is None:
+            self._runner = asyncio.new_event_loop()
+            self._runner_thread = threading.Thread(
+                target=self._runner.run_forever, name="AsyncChatCompletionSampler", daemon=True
+            )
+            self._runner_thread.start()
+        return asyncio.run_coroutine_threadsafe(self.sample_many(prompts, n), self._runner).result()
@@ -0,0 +1,202 @@
+"""Disk-backed cache for chat completions with in-flight request coalescing.
+
+Responses are stored in a :class:`models.por_cache.ResultCache` keyed by a
+hash of ``(model, prompt, n)``, so repeated requests are served from disk
+across runs. Entries older than ``ttl`` seconds are treated as misses and
+removed, and the store is capped in size with least-recently-used eviction.
+Concurrent identical requests, from threads or asyncio tasks, are coalesced
+so that only one of them calls the API and the others wait for its result.
+
+Example::
+
+    cache = CompletionCache(".completion_cache", ttl=24 * 3600)
+    sampler = ChatCompletionSampler(cache=cache)
+    sampler.sample("hello", n=3)
+    print(cache.stats())
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from models.por_cache import DEFAULT_MAX_BYTES, ResultCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".completion_cache"
+NAMESPACE = "chat_completion"
+
+
+class CompletionCache:
+    """TTL- and size-bounded completion store with hit/miss and saved-latency counters."""
+
+    def __init__(
+        self,
+        root: str = DEFAULT_CACHE_DIR,
+        ttl: Optional[float] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        """
+        :param root: Cache directory (created on demand).
+        :param ttl: Seconds an entry stays valid; ``None`` keeps entries until evicted.
+        :param max_bytes: Total size above which least-recently-used entries are evicted.
+        """
+        self.store = ResultCache(root, max_bytes=max_bytes)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_latency = 0.0
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        # Keyed by event loop too: an asyncio future can only be awaited on its own loop.
+        self._async_in_flight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+
+    def key(self, model: str, prompt: str, n: int) -> str:
+        """Cache key of a request."""
+        return self.store.make_key(NAMESPACE, {"model": model, "prompt": prompt, "n": n})
+
+    def get(self, model: str, prompt: str, n: int) -> Optional[List[str]]:
+        """Cached completions for the request, or ``None`` on a miss (counters are not touched)."""
+        entry = self._load(self.key(model, prompt, n))
+        return entry["completions"] if entry is not None else None
+
+    def put(self, model: str, prompt: str, n: int, completions: List[str], latency: float = 0.0) -> None:
+        """Store ``completions``; ``latency`` is what later hits are credited as saving."""
+        self._store(self.key(model, prompt, n), completions, latency)
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.store.get_json(key)
+        if entry is None:
+            return None
+        if self.ttl is not None and time.time() - entry["created"] > self.ttl:
+            self.store.discard(key, ".json")
+            logger.info("Expired completion cache entry %s", key)
+            return None
+        return entry
+
+    def _store(self, key: str, completions: List[str], latency: float) -> None:
+        self.store.put_json(key, {"completions": list(completions), "latency": latency, "created": time.time()})
+
+    def _record_hit(self, entry: Dict[str, Any]) -> List[str]:
+        with self._lock:
+            self.hits += 1
+            self.saved_latency += entry["latency"]
+        return entry["completions"]
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get_or_create(self, model: str, prompt: str, n: int, create: Callable[[], List[str]]) -> List[str]:
+        """Return cached completions, or call ``create()`` once for all concurrent identical requests."""
+        key = self.key(model, prompt, n)
+        entry = self._load(key)
+        if entry is not None:
+            return self._record_hit(entry)
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            self._count("coalesced")
+            return list(future.result())
+
+        try:
+            # Another leader may have stored the result since the first lookup.
+            entry = self._load(key)
+            if entry is not None:
+                completions = self._record_hit(entry)
+            else:
+                self._count("misses")
+                started = time.perf_counter()
+                completions = create()
+                self._store(key, completions, time.perf_counter() - started)
+            future.set_result(completions)
+            return completions
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    async def aget_or_create(
+        self,
+        model: str,
+        prompt: str,
+        n: int,
+        create: Callable[[], Awaitable[List[str]]],
+    ) -> List[str]:
+        """Asyncio counterpart of :meth:`get_or_create`; ``create`` is a coroutine function.
+
+        Disk reads and writes run in a worker thread so they do not block the event loop.
+        Identical requests are coalesced per event loop, so the cache can be shared by
+        several loops (e.g. one per thread).
+        """
+        key = self.key(model, prompt, n)
+        loop = asyncio.get_running_loop()
+        flight = (loop, key)
+        with self._lock:
+            future = self._async_in_flight.get(flight)
+        if future is None:
+            entry = await asyncio.to_thread(self._load, key)
+            if entry is not None:
+                return self._record_hit(entry)
+            with self._lock:
+                future = self._async_in_flight.get(flight)
+                leader = future is None
+                if leader:
+                    future = self._async_in_flight[flight] = loop.create_future()
+        else:
+            leader = False
+        if not leader:
+            self._count("coalesced")
+            # Shielded so a cancelled waiter does not cancel the shared call.
+            return list(await asyncio.shield(future))
+
+        try:
+            self._count("misses")
+            started = time.perf_counter()
+            completions = await create()
+            await asyncio.to_thread(self._store, key, completions, time.perf_counter() - started)
+            future.set_result(completions)
+            return completions
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # retrieved here; waiters re-raise it themselves
+            raise
+        finally:
+            with self._lock:
+                del self._async_in_flight[flight]
+
+    @property
+    def requests(self) -> int:
+        return self.hits + self.misses + self.coalesced
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of requests served without an API call (cache hits and coalesced waiters)."""
+        return (self.hits + self.coalesced) / self.requests if self.requests else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Counters as a dict: hits, misses, coalesced, hit_rate and saved_latency (seconds)."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": self.hit_rate,
+                "saved_latency": self.saved_latency,
+            }
+
+    def clear(self) -> None:
+        """Remove every stored entry (counters are kept)."""
+        self.store.clear()
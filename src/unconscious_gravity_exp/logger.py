@@ -1,8 +1,24 @@
+import atexit
+import glob
+import heapq
 import os
+import re
+import shutil
+import socket
+import tempfile
 import time
+from dataclasses import asdict, fields
+from datetime import datetime
+from itertools import groupby
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from unconscious_gravity.por_log_compaction import commit_compaction, recover_compaction
+from unconscious_gravity.por_log_sinks import shard_path
 
 from .proxy_config import TurnLog
 
@@ -10,20 +26,50 @@ from .proxy_config import TurnLog
 LOG_FILE = "por_logs.parquet"
 MAX_FILE_SIZE = 50 * 1024 * 1024  # bytes
 
+# TurnLogWriter のデフォルト: row group あたりの行数と時間ベースの flush 間隔 (秒)
+ROW_GROUP_SIZE = 1024
+FLUSH_INTERVAL = 5.0
+
+_ARROW_TYPES = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+TURN_LOG_SCHEMA = pa.schema([(f.name, _ARROW_TYPES[f.type]) for f in fields(TurnLog)])
+# compact_turn_logs の出力: マージに使った時刻を ``timestamp`` 列として持つ
+COMPACTED_TURN_LOG_SCHEMA = TURN_LOG_SCHEMA.append(pa.field("timestamp", pa.string()))
+
+# ローテーション済みファイル名の ``_{YYYYmmddHHMMSS}[_{n}]`` 部分
+_ROTATED_TS = re.compile(r"_(\d{14})(?:_\d+)?$")
+
+
+def _rotated_path(path: Path) -> Path:
+    """ローテーション先 ``{stem}_{timestamp}{suffix}`` を返す。"""
+    timestamp = time.strftime("%Y%m%d%H%M%S")
+    rotated = path.with_name(f"{path.stem}_{timestamp}{path.suffix}")
+    n = 1
+    while rotated.exists():  # 同じ秒に複数回ローテーションした場合
+        rotated = path.with_name(f"{path.stem}_{timestamp}_{n}{path.suffix}")
+        n += 1
+    return rotated
+
 
-def append_log(turn: TurnLog, file: str = LOG_FILE) -> None:
+def append_log(turn: TurnLog, file: str = LOG_FILE, shard: bool = False) -> None:
     """指定された ``file`` に ``TurnLog`` を追記保存する。
 
     ログファイルのサイズが ``MAX_FILE_SIZE`` を超えるときは自動で
     同じディレクトリ内にタイムスタンプ付きの名前でローテーションする。
+    書き込みは一時ファイル経由の ``os.replace`` で行うので、読み手が
+    書きかけのファイルを見ることはない。複数プロセスから同じ ``file`` に
+    書く場合は ``shard=True`` でプロセスごとのシャード
+    ``{stem}.{host}-{pid}{suffix}`` に書き、:func:`compact_turn_logs` で統合する。
+
+    呼び出しごとにファイル全体を読み書きするため、多数のターンを
+    記録する場合は :class:`TurnLogWriter` を使うこと。
     """
+    if shard:
+        file = shard_path(file)
     path = Path(file)
     path.parent.mkdir(parents=True, exist_ok=True)
 
     if path.exists() and path.stat().st_size > MAX_FILE_SIZE:
-        timestamp = time.strftime("%Y%m%d%H%M%S")
-        rotated_name = path.with_name(f"{path.stem}_{timestamp}{path.suffix}")
-        path.rename(rotated_name)
+        path.rename(_rotated_path(path))
 
     # TurnLog を DataFrame に変換
     df_new = pd.DataFrame([turn.__dict__])
@@ -36,5 +82,270 @@ def append_log(turn: TurnLog, file: str = LOG_FILE) -> None:
         # ログファイルがなければ新規作成
         df_all = df_new
 
-    # Parquet に書き戻す
-    df_all.to_parquet(file, engine="pyarrow", index=False)
+    # Parquet に書き戻す (一時ファイルに書いてから置き換える)
+    tmp = path.with_name(f".{path.name}.tmp")
+    df_all.to_parquet(tmp, engine="pyarrow", index=False)
+    os.replace(tmp, path)
+
+
+class TurnLogWriter:
+    """``TurnLog`` をバッファリングして Parquet に追記するライター。
+
+    ``row_group_size`` 行たまるか ``flush_interval`` 秒経過するごとに、
+    バッファを確定済みの part ファイル ``.{name}.parts/part-NNNNN.parquet``
+    として書き出す (一時ファイル経由の ``os.replace``)。flush 済みのターンは
+    その時点でディスク上の読める Parquet になるので、クラッシュしても失われず、
+    次に同じ ``file`` を開いたときに回収される。``close`` (終了時は ``atexit``)
+    またはローテーション時に、既存の ``file`` と part をこの順で row group として
+    1 ファイルにまとめて ``file`` を置き換える。1 ターンの追記は償却 O(1) で済む。
+    ``append_log`` と同様、まとめたファイルが ``max_file_size`` を超えていれば
+    次の書き出しの前に ``{stem}_{timestamp}{suffix}`` の名前でローテーションする。
+
+    使用例::
+
+        with TurnLogWriter("data/sample.parquet") as writer:
+            writer.append(turn)
+    """
+
+    def __init__(
+        self,
+        file: str = LOG_FILE,
+        row_group_size: int = ROW_GROUP_SIZE,
+        flush_interval: Optional[float] = FLUSH_INTERVAL,
+        max_file_size: int = MAX_FILE_SIZE,
+        shard: bool = False,
+    ) -> None:
+        """
+        :param file: 出力する Parquet ファイル
+        :param row_group_size: この行数たまったら part として書き出す
+        :param flush_interval: 前回の flush からこの秒数が経過した追記で flush する (``None`` で無効)
+        :param max_file_size: このバイト数を超えたらローテーションする
+        :param shard: プロセスごとのシャード ``{stem}.{host}-{pid}{suffix}`` に書く
+        """
+        if row_group_size < 1:
+            raise ValueError(f"row_group_size must be positive: {row_group_size}")
+        self.path = Path(shard_path(file) if shard else file)
+        self.row_group_size = row_group_size
+        self.flush_interval = flush_interval
+        self.max_file_size = max_file_size
+        self.rows_written = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._parts_dir = self.path.with_name(f".{self.path.name}.parts")
+        self._parts: List[Path] = []
+        self._parts_size = 0
+        self._last_flush = time.monotonic()
+        self._closed = False
+        # 前回のプロセスが close せずに終了した場合の part を回収する
+        self._recover()
+        atexit.register(self.close)
+
+    def __enter__(self) -> "TurnLogWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def append(self, turn: TurnLog) -> None:
+        """``turn`` をバッファに追加し、必要なら flush する。"""
+        self._buffer.append(asdict(turn))
+        if len(self._buffer) >= self.row_group_size or (
+            self.flush_interval is not None
+            and time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def _recover(self) -> None:
+        """残っている part を ``file`` にまとめる。"""
+        if self._parts_dir.is_dir():
+            self._parts = sorted(self._parts_dir.glob("part-*.parquet"))
+            self._finish()
+
+    def _finish(self) -> None:
+        """既存の ``file`` と part を 1 ファイルにまとめて ``file`` を置き換える。"""
+        if not self._parts:
+            shutil.rmtree(self._parts_dir, ignore_errors=True)
+            return
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with pq.ParquetWriter(str(tmp), TURN_LOG_SCHEMA) as writer:
+            if self.path.exists():
+                existing = pq.read_table(self.path).select(TURN_LOG_SCHEMA.names).cast(TURN_LOG_SCHEMA)
+                if existing.num_rows:
+                    writer.write_table(existing)
+            for part in self._parts:
+                writer.write_table(pq.read_table(part).cast(TURN_LOG_SCHEMA))
+        os.replace(tmp, self.path)
+        shutil.rmtree(self._parts_dir, ignore_errors=True)
+        self._parts = []
+        self._parts_size = 0
+
+    def flush(self) -> None:
+        """バッファを確定済みの part ファイルとして書き出す。"""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        if self._parts and self._parts_size > self.max_file_size:
+            self._finish()
+        if not self._parts:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size > self.max_file_size:
+                self.path.rename(_rotated_path(self.path))
+            self._parts_dir.mkdir(exist_ok=True)
+        part = self._parts_dir / f"part-{len(self._parts):05d}.parquet"
+        tmp = part.with_name(f".{part.name}.tmp")
+        pq.write_table(pa.Table.from_pylist(self._buffer, schema=TURN_LOG_SCHEMA), tmp)
+        os.replace(tmp, part)
+        self._parts.append(part)
+        self._parts_size += part.stat().st_size
+        self.rows_written += len(self._buffer)
+        self._buffer.clear()
+
+    def close(self) -> None:
+        """残りを flush してファイルを確定する。"""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self.flush()
+        self._finish()
+
+
+def _turn_log_pattern(path: Path) -> "re.Pattern":
+    """``{stem}[.{shard}][_{YYYYmmddHHMMSS}[_{n}]]{suffix}`` に一致する正規表現。"""
+    return re.compile(
+        rf"{re.escape(path.stem)}(?:\.(?P<shard>[^./]+))?"
+        rf"(?:_(?P<ts>\d{{14}})(?:_(?P<n>\d+))?)?{re.escape(path.suffix)}"
+    )
+
+
+def _turn_log_shards(file: str) -> Dict[str, List[Path]]:
+    """シャード ID (``file`` 自身は ``""``) ごとのファイル一覧 (ローテーション順、現行ファイルが最後)。"""
+    path = Path(file)
+    pattern = _turn_log_pattern(path)
+    shards: Dict[str, List[Tuple[Tuple[str, int], Path]]] = {}
+    for candidate in path.parent.glob(f"{glob.escape(path.stem)}*{glob.escape(path.suffix)}"):
+        match = pattern.fullmatch(candidate.name)
+        if match is None or not candidate.is_file():
+            continue
+        # 現行ファイルは "~" (数字より後) でローテーション済みファイルの後に並べる
+        order = (match["ts"] or "~", int(match["n"] or 0))
+        shards.setdefault(match["shard"] or "", []).append((order, candidate))
+    return {shard: [p for _, p in sorted(files)] for shard, files in sorted(shards.items())}
+
+
+def turn_log_files(file: str) -> List[Path]:
+    """``file`` とそのシャード・ローテーション済みファイルの一覧を返す。"""
+    return sorted(p for files in _turn_log_shards(file).values() for p in files)
+
+
+def _in_use(path: Path, shard: str) -> bool:
+    """``path`` (シャード ``shard`` の現行ファイル) にまだ書き込み中のライターがいるか。"""
+    if path.with_name(f".{path.name}.parts").exists() or path.with_name(f".{path.name}.tmp").exists():
+        return True
+    host, _, pid = shard.rpartition("-")
+    if host != socket.gethostname().split(".")[0] or not pid.isdigit() or int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _file_time(path: Path) -> str:
+    """ファイル単位の時刻 (ローテーション時刻、現行ファイルは更新時刻) を ISO 形式で返す。"""
+    match = _ROTATED_TS.search(path.stem)
+    if match is not None:
+        return datetime.strptime(match[1], "%Y%m%d%H%M%S").isoformat()
+    return datetime.fromtimestamp(path.stat().st_mtime).isoformat()
+
+
+def _iter_turns(files: List[Path], shard: str) -> Iterator[Tuple[Tuple[str, str, int], Dict[str, Any]]]:
+    """シャードの行を row group 単位で読み、``((timestamp, shard, TurnId), row)`` を返す。"""
+    for path in files:
+        parquet_file = pq.ParquetFile(path)
+        has_timestamp = "timestamp" in parquet_file.schema_arrow.names
+        file_time = _file_time(path)
+        for batch in parquet_file.iter_batches():
+            table = pa.Table.from_batches([batch])
+            rows = table.select(TURN_LOG_SCHEMA.names).cast(TURN_LOG_SCHEMA).to_pylist()
+            times = table.column("timestamp").to_pylist() if has_timestamp else [file_time] * len(rows)
+            for row, ts in zip(rows, times):
+                yield (ts or file_time, shard, row["TurnId"]), row
+
+
+def compact_turn_logs(
+    file: str,
+    out_dir: str,
+    row_group_size: int = 64 * ROW_GROUP_SIZE,
+    include_active: bool = False,
+) -> int:
+    """シャードとローテーション済みファイルを日付パーティション ``{out_dir}/date=YYYY-MM-DD/{name}`` に統合する。
+
+    各シャードは書き込み順に並んでいるので、``(timestamp, shard, TurnId)`` を
+    キーにした k-way マージで row group ごとにストリーミングし、メモリ使用量は
+    ファイル数 × row group に収まる。``timestamp`` 列のない ``TurnLog`` では
+    ファイルの時刻 (ローテーション時刻、現行ファイルは更新時刻) を使い、
+    出力にはこの時刻を ``timestamp`` 列として残す。新しい行が入る日付の
+    パーティションだけを既存の出力とマージして書き直す。
+    まだ書き込み中のシャード (``TurnLogWriter`` の part や ``append_log`` の
+    一時ファイルがある、または同じホストの書き込みプロセスが生きている) の
+    現行ファイルは、``include_active=True`` でない限り対象外とし、触らない。
+    出力は ``out_dir`` 内の一時ディレクトリに書き、
+    ``unconscious_gravity.por_log_compaction.commit_compaction`` のジャーナルで
+    配置と入力ファイルの削除を確定するので、途中で落ちても次回の実行で
+    完了するか何も残らない。統合した行数を返す。
+    """
+    path = Path(file)
+    os.makedirs(out_dir, exist_ok=True)
+    recover_compaction(out_dir)
+    streams = []
+    inputs: List[Path] = []
+    for shard, files in _turn_log_shards(file).items():
+        active = path if not shard else Path(shard_path(file, shard))
+        if not include_active and active in files and _in_use(active, shard):
+            files = [f for f in files if f != active]
+        if files:
+            inputs.extend(files)
+            streams.append(_iter_turns(files, shard))
+    if not inputs:
+        return 0
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".compact-", dir=out_dir))
+    written: List[str] = []
+    rows = 0
+    try:
+        merged = heapq.merge(*streams, key=lambda item: item[0])
+        for partition, group in groupby(merged, key=lambda item: f"date={item[0][0][:10]}"):
+            # 既存のパーティションは timestamp 列を持つので、新しい行と時刻順にマージできる
+            existing = Path(out_dir) / partition / path.name
+            previous = [_iter_turns([existing], "")] if existing.exists() else []
+            target = tmp_dir / partition / path.name
+            target.parent.mkdir(parents=True)
+            new_rows = 0
+
+            def counted(group=group):
+                nonlocal new_rows
+                for item in group:
+                    new_rows += 1
+                    yield item
+
+            buffer: List[Dict[str, Any]] = []
+            with pq.ParquetWriter(str(target), COMPACTED_TURN_LOG_SCHEMA) as writer:
+                for (timestamp, _, _), row in heapq.merge(*previous, counted(), key=lambda item: item[0]):
+                    buffer.append({**row, "timestamp": timestamp})
+                    if len(buffer) >= row_group_size:
+                        writer.write_table(pa.Table.from_pylist(buffer, schema=COMPACTED_TURN_LOG_SCHEMA))
+                        buffer.clear()
+                if buffer:
+                    writer.write_table(pa.Table.from_pylist(buffer, schema=COMPACTED_TURN_LOG_SCHEMA))
+            rows += new_rows
+            written.append(partition)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    moves = [(str(tmp_dir / p / path.name), str(Path(out_dir) / p / path.name)) for p in written]
+    commit_compaction(out_dir, str(tmp_dir), moves, [str(p) for p in inputs])
+    return rows
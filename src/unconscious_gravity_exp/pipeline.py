@@ -0,0 +1,317 @@
+"""Bounded-queue streaming pipeline: sample -> score -> detect -> log.
+
+:class:`Pipeline` connects stages with bounded queues, each served by its
+own pool of worker threads, so slow network sampling overlaps with scoring
+and with log I/O instead of every stage waiting for the whole batch. A full
+queue blocks its producer, so memory stays bounded and a slow stage throttles
+everything upstream of it, down to the input iterator. Per-stage counters
+(items, errors, busy and blocked time, throughput, utilisation, current and
+peak queue depth) are available from :meth:`Pipeline.stats` while the
+pipeline runs and can be logged periodically with ``report_interval``.
+
+:func:`build_por_pipeline` wires the usual experiment stages:
+``ChatCompletionSampler`` (or any object with ``sample(prompt, n)``) ->
+a ``PoRInference.compute_por_score``-style scorer -> the
+``ugher_exp.por_detector`` kernel -> ``PoRLogWriter`` or ``TurnLogWriter``.
+
+Example::
+
+    with PoRLogWriter("logs/por_log.jsonl") as writer:
+        pipeline = build_por_pipeline(
+            ChatCompletionSampler(), PoRInference().compute_por_score, writer,
+            n=4, sample_workers=16,
+        )
+        stats = pipeline.run(prompts)
+    print(pipeline.format_stats())
+
+Items leave a stage in completion order, so with more than one worker per
+stage the output order may differ from the input order.
+"""
+import itertools
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+import pandas as pd
+
+from ugher_exp.por_detector import apply_detection
+
+from .proxy_config import TurnLog
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 64
+
+_STOP = object()  # end-of-stream marker, one per downstream worker
+
+# Scorer signature of ``PoRInference.compute_por_score``: (question, context, time_score) -> scores with "E".
+ScoreFn = Callable[[str, str, float], Mapping[str, float]]
+
+
+@dataclass
+class Stage:
+    """One pipeline stage: ``fn`` maps an item to the next item, or ``None`` to drop it."""
+
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = QUEUE_SIZE
+
+    def __post_init__(self) -> None:
+        if self.workers < 1:
+            raise ValueError(f"workers must be positive: {self.workers}")
+        if self.queue_size < 1:
+            raise ValueError(f"queue_size must be positive: {self.queue_size}")
+
+
+class _StageStats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.max_queue_depth = 0
+
+
+class Pipeline:
+    """Run items through ``stages`` with bounded queues and per-stage worker threads."""
+
+    def __init__(self, stages: Sequence[Stage], report_interval: Optional[float] = None) -> None:
+        """
+        :param stages: Stages in order; the last stage's results are discarded.
+        :param report_interval: Log :meth:`format_stats` every this many seconds while running.
+        """
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Stage names must be unique: {names}")
+        self.stages = list(stages)
+        self.report_interval = report_interval
+        self._queues: List[queue.Queue] = []
+        self._stats: Dict[str, _StageStats] = {}
+        self._lock = threading.Lock()
+        self._remaining: List[int] = []
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def run(self, items: Iterable[Any]) -> Dict[str, Dict[str, float]]:
+        """Feed ``items`` through the pipeline, wait for every stage to drain and return :meth:`stats`.
+
+        Stage errors are logged and counted and the item is dropped; an error
+        raised by ``items`` itself stops the pipeline cleanly and is re-raised.
+        """
+        self._queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        self._stats = {stage.name: _StageStats() for stage in self.stages}
+        self._remaining = [stage.workers for stage in self.stages]
+        self._started, self._finished = time.perf_counter(), None
+
+        threads = [
+            threading.Thread(target=self._worker, args=(i,), name=f"{stage.name}-{w}", daemon=True)
+            for i, stage in enumerate(self.stages)
+            for w in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        done = threading.Event()
+        monitor = None
+        if self.report_interval:
+            monitor = threading.Thread(target=self._monitor, args=(done,), name="pipeline-monitor", daemon=True)
+            monitor.start()
+
+        try:
+            for item in items:
+                self._put(0, item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                self._queues[0].put(_STOP)
+            for thread in threads:
+                thread.join()
+            self._finished = time.perf_counter()
+            done.set()
+            if monitor is not None:
+                monitor.join()
+        logger.info("Pipeline finished:\n%s", self.format_stats())
+        return self.stats()
+
+    def _put(self, index: int, item: Any) -> None:
+        """Put ``item`` on the input queue of stage ``index``, blocking while it is full."""
+        q = self._queues[index]
+        q.put(item)
+        stats = self._stats[self.stages[index].name]
+        depth = q.qsize()
+        with stats.lock:
+            stats.max_queue_depth = max(stats.max_queue_depth, depth)
+
+    def _worker(self, index: int) -> None:
+        stage = self.stages[index]
+        stats = self._stats[stage.name]
+        inbox = self._queues[index]
+        downstream = index + 1 < len(self.stages)
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                break
+            started = time.perf_counter()
+            try:
+                result = stage.fn(item)
+                failed = False
+            except Exception:
+                logger.exception("Stage %s failed; dropping item", stage.name)
+                result, failed = None, True
+            finished = time.perf_counter()
+            if downstream and result is not None:
+                self._put(index + 1, result)
+            with stats.lock:
+                stats.processed += 1
+                stats.errors += failed
+                stats.busy += finished - started
+                stats.blocked += time.perf_counter() - finished
+
+        with self._lock:
+            self._remaining[index] -= 1
+            last = self._remaining[index] == 0
+        if last and downstream:
+            for _ in range(self.stages[index + 1].workers):
+                self._queues[index + 1].put(_STOP)
+
+    def _monitor(self, done: threading.Event) -> None:
+        while not done.wait(self.report_interval):
+            logger.info("Pipeline progress:\n%s", self.format_stats())
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage counters: ``processed``, ``errors``, ``workers``, ``busy_s``,
+        ``blocked_s`` (waiting on a full downstream queue), ``throughput`` (items/s),
+        ``utilization`` (busy share of worker time), ``queue_depth`` and ``max_queue_depth``.
+        """
+        if self._started is None:
+            return {}
+        elapsed = max((self._finished or time.perf_counter()) - self._started, 1e-9)
+        result = {}
+        for stage, inbox in zip(self.stages, self._queues):
+            stats = self._stats[stage.name]
+            with stats.lock:
+                result[stage.name] = {
+                    "processed": stats.processed,
+                    "errors": stats.errors,
+                    "workers": stage.workers,
+                    "busy_s": stats.busy,
+                    "blocked_s": stats.blocked,
+                    "throughput": stats.processed / elapsed,
+                    "utilization": stats.busy / (elapsed * stage.workers),
+                    # The queued end-of-stream markers are not items.
+                    "queue_depth": inbox.qsize() if self._finished is None else 0,
+                    "max_queue_depth": stats.max_queue_depth,
+                }
+        return result
+
+    def format_stats(self) -> str:
+        """:meth:`stats` as a fixed-width table."""
+        lines = [f"{'stage':<12} {'items':>8} {'errors':>6} {'items/s':>9} {'util':>6} {'queue':>7} {'peak':>5}"]
+        for name, s in self.stats().items():
+            lines.append(
+                f"{name:<12} {s['processed']:>8} {s['errors']:>6} {s['throughput']:>9.1f} "
+                f"{s['utilization']:>6.0%} {s['queue_depth']:>7} {s['max_queue_depth']:>5}"
+            )
+        return "\n".join(lines)
+
+
+def _as_item(source: Union[str, Mapping[str, Any]], index: int) -> Dict[str, Any]:
+    item = {"prompt": source} if isinstance(source, str) else dict(source)
+    item.setdefault("id", index)
+    item.setdefault("context", item["prompt"])
+    item.setdefault("time_score", 1.0)
+    return item
+
+
+def build_por_pipeline(
+    sampler: Any,
+    score: ScoreFn,
+    writer: Any,
+    n: int = 1,
+    threshold: float = 0.5,
+    sample_workers: int = 8,
+    score_workers: int = 2,
+    detect_workers: int = 1,
+    queue_size: int = QUEUE_SIZE,
+    shift_stage: Optional[Any] = None,
+    report_interval: Optional[float] = None,
+) -> Pipeline:
+    """Pipeline sampling ``n`` candidates per prompt, scoring, detecting PoRs and logging them.
+
+    Input items are prompts, or dicts with ``prompt`` and optional ``context``
+    (defaults to the prompt) and ``time_score`` (defaults to ``1.0``).
+
+    :param sampler: Object with ``sample(prompt, n) -> List[str]`` (e.g. ``ChatCompletionSampler``).
+    :param score: ``(candidate, context, time_score) -> {"E": ..., ...}``, e.g. ``PoRInference().compute_por_score``.
+    :param writer: ``PoRLogWriter`` (one ``log_results`` call per candidate, scores and
+        detection results as extra fields) or ``TurnLogWriter`` (one ``TurnLog`` per candidate).
+    :param n: Candidates sampled per prompt.
+    :param threshold: Score threshold passed to ``PoRLogWriter``.
+    :param sample_workers: Concurrent sampling threads (network bound).
+    :param score_workers: Scoring threads.
+    :param detect_workers: Detection threads (forced to 1 with a stateful ``shift_stage``).
+    :param queue_size: Capacity of each stage's input queue.
+    :param shift_stage: Optional ``ugher_exp.cosine_shift.CosineShiftStage`` computing
+        ``cosine_shift`` between a prompt's candidates when the scorer does not provide it.
+    :param report_interval: Log progress every this many seconds.
+    """
+    counter = itertools.count()
+
+    def sample(item: Any) -> Dict[str, Any]:
+        item = _as_item(item, next(counter))
+        item["started"] = time.perf_counter()
+        item["candidates"] = list(sampler.sample(item["prompt"], n))
+        return item
+
+    def score_item(item: Dict[str, Any]) -> Dict[str, Any]:
+        item["scores"] = [dict(score(c, item["context"], item["time_score"])) for c in item["candidates"]]
+        return item
+
+    def detect(item: Dict[str, Any]) -> Dict[str, Any]:
+        df = pd.DataFrame({"session_id": item["id"], "curr_resp": item["candidates"]})
+        if item["scores"] and all("cosine_shift" in s for s in item["scores"]):
+            df["cosine_shift"] = [s["cosine_shift"] for s in item["scores"]]
+        df = apply_detection(df, shift_stage)
+        item["PoR_flag"] = df["PoR_flag"].astype(int).tolist()
+        item["intensity"] = df["intensity"].astype(float).tolist()
+        return item
+
+    if hasattr(writer, "log_results"):
+        def log(item: Dict[str, Any]) -> None:
+            for candidate, scores, flag, intensity in zip(
+                item["candidates"], item["scores"], item["PoR_flag"], item["intensity"]
+            ):
+                extra = {k: v for k, v in scores.items() if k != "E"}
+                extra.update(prompt=item["prompt"], PoR_flag=flag, intensity=intensity)
+                writer.log_results([(candidate, scores["E"])], item["context"], item["time_score"], threshold, extra)
+    else:
+        turn_ids = itertools.count(1)
+
+        def log(item: Dict[str, Any]) -> None:
+            elapsed_ms = int((time.perf_counter() - item["started"]) * 1000)
+            for candidate, scores in zip(item["candidates"], item["scores"]):
+                writer.append(TurnLog(
+                    TurnId=next(turn_ids),
+                    Prompt=item["prompt"],
+                    Response=candidate,
+                    Q_self=float(scores.get("Q", 0.0)),
+                    S_q=float(scores.get("S_q", 0.0)),
+                    t_total=elapsed_ms,
+                    M=float(scores["E"]),
+                ))
+
+    return Pipeline(
+        [
+            Stage("sample", sample, sample_workers, queue_size),
+            Stage("score", score_item, score_workers, queue_size),
+            Stage("detect", detect, 1 if shift_stage is not None else detect_workers, queue_size),
+            # Writers are not thread-safe, so logging always runs on one thread.
+            Stage("log", log, 1, queue_size),
+        ],
+        report_interval=report_interval,
+    )
@@ -0,0 +1,186 @@
+"""Synthetic multi-turn dialog sessions for pipeline benchmarks.
+
+Sessions are generated in vectorised blocks on top of ``PoRSimulator``:
+each turn gets ``Q``, ``S_q`` and ``t`` draws and a base ``E``, which decays
+along the session following ``PoRModel.por_collapse_frequency_array`` with
+random spikes on top. ``cosine_shift`` follows the turn-to-turn change in
+``E`` and responses whose ``E`` crosses the marker threshold carry a
+``[Q]`` marker.
+
+Each block is written to its own ``part-XXXXX.parquet`` file with the
+``TurnLog`` columns plus ``SessionId``, ``E`` and ``cosine_shift``; the
+directory can be read back as one dataset with ``pd.read_parquet(out_dir)``.
+"""
+
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from models.por_formal_models import PoRModel
+from models.por_simulator import PoRSimulator
+
+logger = logging.getLogger(__name__)
+
+Q_MARKER = "[Q]"
+
+
+@dataclass
+class SessionConfig:
+    """Shape of the synthetic sessions."""
+
+    mean_turns: float = 8.0           # 1 + Poisson(mean_turns - 1) turns per session
+    max_turns: int = 64
+    q_range: Tuple[float, float] = (0.3, 1.0)
+    s_range: Tuple[float, float] = (0.3, 1.0)
+    t_range: Tuple[float, float] = (0.3, 1.0)
+    lam_range: Tuple[float, float] = (0.05, 0.5)  # collapse rate λ per session
+    spike_rate: float = 0.05          # probability of a spike per turn
+    spike_scale: float = 0.5          # spike height ~ U(0.5, 1) × spike_scale
+    shift_noise: float = 0.02         # std of noise added to cosine_shift
+    marker_threshold: float = 0.5     # E >= threshold → "[Q]" in the response
+
+
+def _join(*parts) -> pa.Array:
+    """Element-wise string concatenation of Arrow arrays and scalars."""
+    return pc.binary_join_element_wise(*parts, "")
+
+
+def generate_block(
+    rng: np.random.Generator,
+    n_sessions: int,
+    first_session: int = 0,
+    first_turn_id: int = 1,
+    config: Optional[SessionConfig] = None,
+    simulator: Optional[PoRSimulator] = None,
+) -> pa.Table:
+    """Generate ``n_sessions`` consecutive sessions as an Arrow table."""
+    config = config or SessionConfig()
+    simulator = simulator or PoRSimulator()
+    if config.lam_range[0] <= 0 or config.lam_range[0] > config.lam_range[1]:
+        raise ValueError(f"lam_range must be positive with min <= max: {config.lam_range}")
+
+    turns = np.minimum(1 + rng.poisson(max(config.mean_turns - 1.0, 0.0), size=n_sessions), config.max_turns)
+    n_rows = int(turns.sum())
+    starts = np.cumsum(turns) - turns
+    session = np.repeat(np.arange(first_session, first_session + n_sessions), turns)
+    turn = np.arange(n_rows) - np.repeat(starts, turns)
+
+    samples, base_e = simulator.simulate_chunk(
+        rng, n_rows, config.q_range, config.s_range, config.t_range
+    )
+    lam = np.repeat(rng.uniform(config.lam_range[0], config.lam_range[1], size=n_sessions), turns)
+    collapse = PoRModel.por_collapse_frequency_array(lam, turn)
+    spikes = (rng.random(n_rows) < config.spike_rate) * rng.uniform(0.5, 1.0, size=n_rows) * config.spike_scale
+    energy = base_e * (collapse / lam) + spikes
+
+    # Shift between consecutive turns of the same session; the first turn has none.
+    shift = np.abs(np.diff(energy, prepend=energy[:1]))
+    shift = np.clip(shift + rng.normal(0.0, config.shift_noise, size=n_rows), 0.0, 1.0)
+    shift[starts] = 0.0
+
+    session_str = pc.cast(pa.array(session), pa.string())
+    turn_str = pc.cast(pa.array(turn + 1), pa.string())
+    marker = pa.array(np.where(energy >= config.marker_threshold, f" {Q_MARKER}", ""))
+
+    columns = {
+        "TurnId": pa.array(np.arange(first_turn_id, first_turn_id + n_rows)),
+        "Prompt": _join("Session ", session_str, " prompt ", turn_str),
+        "Response": _join("Session ", session_str, " response ", turn_str, marker),
+        "Q_self": pa.array(samples[:, 0]),
+        "S_q": pa.array(samples[:, 1]),
+        "t_total": pa.array((50 + 450 * samples[:, 2]).astype(np.int64)),
+        "M": pa.array(collapse),
+        "SessionId": pa.array(session),
+        "E": pa.array(energy),
+        "cosine_shift": pa.array(shift),
+    }
+    return pa.table(columns)
+
+
+def _write_part(
+    path: str,
+    seed_seq: np.random.SeedSequence,
+    n_sessions: int,
+    first_session: int,
+    config: SessionConfig,
+) -> Tuple[int, int]:
+    """Generate one block and write it as a Parquet part; returns ``(sessions, rows)``.
+
+    Turn ids restart per part at ``first_session * max_turns + 1`` so that
+    parts can be generated independently and still never collide.
+    """
+    rng = np.random.default_rng(seed_seq)
+    table = generate_block(rng, n_sessions, first_session, first_session * config.max_turns + 1, config)
+    pq.write_table(table, path)
+    return n_sessions, table.num_rows
+
+
+def generate_sessions(
+    out_dir: str,
+    n_sessions: int,
+    sessions_per_part: int = 100_000,
+    seed: Optional[int] = None,
+    config: Optional[SessionConfig] = None,
+    n_workers: int = 1,
+) -> List[str]:
+    """Write ``n_sessions`` synthetic sessions to ``out_dir`` as Parquet parts.
+
+    Part ``i`` is drawn from the ``i``-th child of ``SeedSequence(seed)``, so
+    the dataset is reproducible for a given seed regardless of ``n_workers``.
+    Returns the list of written part paths.
+    """
+    if sessions_per_part < 1:
+        raise ValueError(f"sessions_per_part must be positive: {sessions_per_part}")
+    config = config or SessionConfig()
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    root = np.random.SeedSequence(seed)
+    sizes = [min(sessions_per_part, n_sessions - start) for start in range(0, n_sessions, sessions_per_part)]
+    seeds = root.spawn(len(sizes))
+    paths = [str(out / f"part-{i:05d}.parquet") for i in range(len(sizes))]
+    firsts = [i * sessions_per_part for i in range(len(sizes))]
+    configs = [config] * len(sizes)
+
+    if n_workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            counts = list(executor.map(_write_part, paths, seeds, sizes, firsts, configs))
+    else:
+        counts = list(map(_write_part, paths, seeds, sizes, firsts, configs))
+
+    total_rows = sum(rows for _, rows in counts)
+    logger.info("Wrote %s sessions / %s turns to %s (%s parts)", n_sessions, total_rows, out, len(paths))
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic TurnLog sessions as partitioned Parquet")
+    parser.add_argument("--out-dir", type=str, default="data/sessions", help="Output dataset directory")
+    parser.add_argument("--sessions", type=int, default=1000, help="Number of sessions to generate")
+    parser.add_argument("--sessions-per-part", type=int, default=100_000, help="Sessions per Parquet part file")
+    parser.add_argument("--mean-turns", type=float, default=8.0, help="Mean number of turns per session")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    args = parser.parse_args()
+
+    paths = generate_sessions(
+        args.out_dir,
+        args.sessions,
+        sessions_per_part=args.sessions_per_part,
+        seed=args.seed,
+        config=SessionConfig(mean_turns=args.mean_turns),
+        n_workers=args.workers,
+    )
+    print(f"Wrote {len(paths)} part files to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
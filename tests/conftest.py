@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubAPI:
+    """Minimal local imitation of ``POST /v1/chat/completions``."""
+
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.requests = []
+        self.client_ports = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests.append(body)
+                    stub.client_ports.append(self.client_address[1])
+                    fail = stub.failures > 0
+                    stub.failures -= fail
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    if fail:
+                        self._send(429, {"error": {"message": "slow down", "type": "rate_limit"}}, {"Retry-After": "0"})
+                        return
+                    prompt = body["messages"][-1]["content"]
+                    choices = [
+                        {"index": i, "message": {"role": "assistant", "content": f"{prompt}#{i}"}, "finish_reason": "stop"}
+                        for i in range(body.get("n", 1))
+                    ]
+                    self._send(200, {
+                        "id": "cmpl-stub", "object": "chat.completion", "created": 0,
+                        "model": body["model"], "choices": choices,
+                    })
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_api():
+    apis = []
+
+    def make(**kwargs):
+        api = StubAPI(**kwargs)
+        apis.append(api)
+        return api
+
+    yield make
+    for api in apis:
+        api.close()
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from unconscious_gravity_exp.chat_completion_sampler import AsyncChatCompletionSampler, TokenBucket
+
+
+def _sampler(api, **kwargs):
+    return AsyncChatCompletionSampler(model="stub-model", base_url=api.base_url, api_key="test", **kwargs)
+
+
+def test_sample_many_preserves_order_and_bounds_concurrency(stub_api):
+    api = stub_api(delay=0.05)
+    prompts = [f"p{i}" for i in range(12)]
+    results = _sampler(api, max_concurrency=3).sample_batch(prompts, n=2)
+
+    assert results == [[f"p{i}#0", f"p{i}#1"] for i in range(12)]
+    assert len(api.requests) == 12
+    assert all(r["model"] == "stub-model" and r["n"] == 2 for r in api.requests)
+    assert 1 < api.max_in_flight <= 3
+
+
+def test_retries_rate_limited_requests(stub_api):
+    api = stub_api(failures=2)
+    sampler = _sampler(api, backoff_base=0.01)
+    assert sampler.sample_batch(["hello"]) == [["hello#0"]]
+    assert sampler.retries == 2
+    assert len(api.requests) == 3
+
+
+def test_gives_up_after_max_retries(stub_api):
+    api = stub_api(failures=10)
+
+    async def run():
+        async with _sampler(api, max_retries=1, backoff_base=0.01) as sampler:
+            await sampler.sample("hello")
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(run())
+    assert len(api.requests) == 2
+
+
+def test_token_bucket_limits_request_rate(stub_api):
+    api = stub_api()
+    sampler = _sampler(api, requests_per_second=20, burst=1)
+    start = time.monotonic()
+    sampler.sample_batch([f"p{i}" for i in range(6)])
+    # One request from the initial burst, then one every 50ms.
+    assert time.monotonic() - start >= 0.2
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_sample_batch_reuses_client_connections_across_calls(stub_api):
+    api = stub_api()
+    sampler = _sampler(api)
+    try:
+        assert sampler.sample_batch(["a"]) == [["a#0"]]
+        assert sampler.sample_batch(["b"]) == [["b#0"]]
+    finally:
+        sampler.close()
+    assert len(api.client_ports) == 2
+    assert api.client_ports[0] == api.client_ports[1]  # same kept-alive connection
+
+    # A closed sampler starts a fresh loop and client on the next call.
+    assert sampler.sample_batch(["c"]) == [["c#0"]]
+    sampler.close()
+
+
+def test_sampler_can_be_used_from_several_event_loops(stub_api):
+    api = stub_api()
+    sampler = _sampler(api, max_concurrency=2, requests_per_second=100)
+    assert asyncio.run(sampler.sample_many(["a", "b", "c"])) == [["a#0"], ["b#0"], ["c#0"]]
+    assert asyncio.run(sampler.sample_many(["d"])) == [["d#0"]]
+    asyncio.run(sampler.aclose())
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("openai")
+
+from unconscious_gravity_exp.chat_completion_sampler import AsyncChatCompletionSampler, ChatCompletionSampler
+from unconscious_gravity_exp.completion_cache import CompletionCache
+
+
+def test_hits_are_served_from_disk_across_instances(tmp_path):
+    calls = []
+
+    def create():
+        calls.append(1)
+        time.sleep(0.01)
+        return ["a", "b"]
+
+    cache = CompletionCache(str(tmp_path))
+    assert cache.get_or_create("m", "p", 2, create) == ["a", "b"]
+    assert cache.get_or_create("m", "p", 2, create) == ["a", "b"]
+    cache.get_or_create("m", "p", 1, create)  # n is part of the key
+
+    reopened = CompletionCache(str(tmp_path))
+    assert reopened.get_or_create("m", "p", 2, create) == ["a", "b"]
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    assert reopened.hit_rate == 1.0
+    assert reopened.saved_latency >= 0.01
+
+
+def test_concurrent_identical_requests_are_coalesced(tmp_path):
+    cache = CompletionCache(str(tmp_path))
+    calls = []
+    release = threading.Event()
+
+    def create():
+        calls.append(1)
+        release.wait(5)
+        return ["x"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("m", "p", 1, create)))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    while cache.coalesced < 4:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [["x"]] * 5
+    assert cache.stats()["misses"] == 1 and cache.hit_rate == pytest.approx(0.8)
+
+
+def test_failed_call_is_not_cached(tmp_path):
+    cache = CompletionCache(str(tmp_path))
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_create("m", "p", 1, fail)
+    assert cache.get("m", "p", 1) is None
+    assert cache.get_or_create("m", "p", 1, lambda: ["ok"]) == ["ok"]
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    cache = CompletionCache(str(tmp_path), ttl=60)
+    cache.put("m", "p", 1, ["old"])
+    assert cache.get("m", "p", 1) == ["old"]
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("m", "p", 1) is None
+    assert list(tmp_path.glob("*/*.json")) == []
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path):
+    cache = CompletionCache(str(tmp_path), max_bytes=400)
+    cache.put("m", "a", 1, ["x" * 100])
+    cache.put("m", "b", 1, ["y" * 100])
+    assert cache.get("m", "a", 1) is not None  # refresh "a"
+    cache.put("m", "c", 1, ["z" * 100])
+
+    assert cache.get("m", "b", 1) is None
+    assert cache.get("m", "a", 1) is not None
+    assert cache.store.size() <= 400
+
+
+def test_sync_sampler_uses_cache(tmp_path, monkeypatch):
+    calls = []
+    sampler = ChatCompletionSampler(model="m", cache=CompletionCache(str(tmp_path)))
+    monkeypatch.setattr(sampler, "_sample", lambda prompt, n: calls.append(prompt) or [prompt.upper()] * n)
+
+    assert sampler.sample("hi", n=2) == ["HI", "HI"]
+    assert sampler.sample("hi", n=2) == ["HI", "HI"]
+    assert calls == ["hi"]
+
+
+def test_async_sampler_coalesces_duplicate_prompts(tmp_path, stub_api):
+    api = stub_api(delay=0.05)
+    cache = CompletionCache(str(tmp_path))
+    sampler = AsyncChatCompletionSampler(model="stub-model", base_url=api.base_url, api_key="test", cache=cache)
+    prompts = ["a", "b", "a", "a", "b"]
+
+    assert sampler.sample_batch(prompts) == [[f"{p}#0"] for p in prompts]
+    assert len(api.requests) == 2
+    assert cache.stats()["coalesced"] == 3
+
+    again = AsyncChatCompletionSampler(model="stub-model", base_url=api.base_url, api_key="test", cache=cache)
+    assert again.sample_batch(["a"]) == [["a#0"]]
+    assert len(api.requests) == 2
+    assert cache.hits == 1
+
+
+def test_async_lookups_do_not_block_the_event_loop(tmp_path):
+    cache = CompletionCache(str(tmp_path))
+    threads = []
+    for name in ("_load", "_store"):
+        method = getattr(cache, name)
+        setattr(cache, name, lambda *a, _m=method: threads.append(threading.get_ident()) or _m(*a))
+
+    async def create():
+        return ["x"]
+
+    async def run():
+        first = await cache.aget_or_create("m", "p", 1, create)
+        return first, await cache.aget_or_create("m", "p", 1, create)
+
+    assert asyncio.run(run()) == (["x"], ["x"])
+    assert cache.hits == 1 and cache.misses == 1
+    assert len(threads) == 3 and threading.get_ident() not in threads
+
+
+def test_async_requests_on_different_event_loops_do_not_share_futures(tmp_path):
+    cache = CompletionCache(str(tmp_path))
+    started = threading.Event()
+    results, errors = [], []
+
+    async def create():
+        started.set()
+        await asyncio.sleep(0.2)
+        return ["x"]
+
+    def worker():
+        try:
+            results.append(asyncio.run(cache.aget_or_create("m", "p", 1, create)))
+        except Exception as e:
+            errors.append(e)
+
+    first = threading.Thread(target=worker)
+    first.start()
+    assert started.wait(5)
+    second = threading.Thread(target=worker)
+    second.start()
+    first.join(5)
+    second.join(5)
+
+    assert errors == []
+    assert results == [["x"], ["x"]]
+    assert cache.misses == 2 and cache.coalesced == 0
+    assert cache._async_in_flight == {}
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ugher_exp.cosine_shift import CosineShiftStage
+from ugher_exp.por_detector import THRESHOLD, detect_pors, detect_pors_stream
+
+VOCAB = ["alpha", "beta", "gamma", "Q"]
+calls = []
+
+
+def bag_of_words(texts):
+    """Tiny deterministic embedding backend for tests."""
+    calls.append(len(texts))
+    return np.array([[text.split().count(word) for word in VOCAB] for text in texts], dtype=float)
+
+
+
+def make_log():
+    return pd.DataFrame(
+        {
+            "session_id": [1, 1, 1, 2, 2, 3],
+            "curr_resp": ["alpha", "alpha", "beta", "alpha beta", "gamma", "alpha"],
+        }
+    )
+
+
+def test_shift_is_segmented_by_session():
+    calls.clear()
+    df = CosineShiftStage(bag_of_words, batch_size=4)(make_log())
+
+    expected = [0.0, 0.0, 1.0, 0.0, 1.0, 0.0]
+    assert df["cosine_shift"].tolist() == pytest.approx(expected)
+    assert calls == [4, 2]
+
+
+def test_shift_carries_state_across_batches():
+    whole = CosineShiftStage(bag_of_words)(make_log())["cosine_shift"]
+
+    stage = CosineShiftStage(bag_of_words)
+    parts = [stage(make_log().iloc[i:i + 2].copy())["cosine_shift"] for i in range(0, 6, 2)]
+    assert pd.concat(parts).tolist() == pytest.approx(whole.tolist())
+
+
+def test_detection_computes_missing_shift(tmp_path):
+    path = tmp_path / "raw.parquet"
+    make_log().to_parquet(path)
+
+    batch = detect_pors(str(path), CosineShiftStage(bag_of_words))
+    out = tmp_path / "out.csv"
+    stats = detect_pors_stream(str(path), str(out), batch_size=4, shift_stage=CosineShiftStage(bag_of_words))
+
+    assert batch["PoR_flag"].tolist() == (batch["cosine_shift"] > THRESHOLD).astype(int).tolist()
+    assert stats["flags"] == int(batch["PoR_flag"].sum())
+    assert pd.read_csv(out)["cosine_shift"].tolist() == pytest.approx(batch["cosine_shift"].tolist())
@@ -26,3 +26,68 @@ def test_dummy_dialog_creates_parquet(tmp_path):
 
     expected_cols = list(TurnLog.__annotations__.keys())
     assert set(df.columns) == set(expected_cols), f"Unexpected schema: {df.columns.tolist()}"
+
+
+def _turn(i):
+    return TurnLog(TurnId=i, Prompt=f"p{i}", Response=f"r{i}", Q_self=0.5, S_q=0.5, t_total=i, M=0.1)
+
+
+def test_turn_log_writer_appends_row_groups_to_existing_file(tmp_path):
+    import pyarrow.parquet as pq
+
+    from unconscious_gravity_exp.logger import TurnLogWriter, append_log
+
+    log_file = tmp_path / "logs" / "turns.parquet"
+    append_log(_turn(0), file=str(log_file))
+
+    with TurnLogWriter(str(log_file), row_group_size=4, flush_interval=None) as writer:
+        for i in range(1, 11):
+            writer.append(_turn(i))
+        assert writer.rows_written == 8
+        assert pd.read_parquet(log_file)["TurnId"].tolist() == [0]  # finalised on close
+
+    df = pd.read_parquet(log_file)
+    assert df["TurnId"].tolist() == list(range(11))
+    assert list(df.columns) == list(TurnLog.__annotations__.keys())
+    assert pq.ParquetFile(log_file).num_row_groups == 4
+    assert [p.name for p in log_file.parent.iterdir()] == ["turns.parquet"]
+
+
+def test_turn_log_writer_rotates_by_size(tmp_path):
+    from unconscious_gravity_exp.logger import TurnLogWriter
+
+    log_file = tmp_path / "turns.parquet"
+    with TurnLogWriter(str(log_file), row_group_size=2, flush_interval=None, max_file_size=1) as writer:
+        writer.append(_turn(1))
+        writer.append(_turn(2))
+        assert list(tmp_path.glob("turns_*.parquet")) == []
+        writer.append(_turn(3))
+        writer.append(_turn(4))
+        assert len(list(tmp_path.glob("turns_*.parquet"))) == 1
+        writer.append(_turn(5))
+
+    rotated = sorted(tmp_path.glob("turns_*.parquet"))
+    assert [pd.read_parquet(p)["TurnId"].tolist() for p in rotated] == [[1, 2], [3, 4]]
+    assert pd.read_parquet(log_file)["TurnId"].tolist() == [5]
+
+
+def test_turn_log_writer_flushes_are_durable_and_recovered(tmp_path):
+    import atexit
+
+    from unconscious_gravity_exp.logger import TurnLogWriter
+
+    log_file = tmp_path / "turns.parquet"
+    crashed = TurnLogWriter(str(log_file), row_group_size=2, flush_interval=None)
+    for i in range(5):
+        crashed.append(_turn(i))
+    # Flushed turns are readable before close; the unflushed one is still buffered.
+    parts = tmp_path / ".turns.parquet.parts"
+    assert sorted(pd.read_parquet(parts)["TurnId"]) == [0, 1, 2, 3]
+    atexit.unregister(crashed.close)  # simulate a process that exits without closing
+    del crashed
+
+    with TurnLogWriter(str(log_file)) as writer:
+        assert pd.read_parquet(log_file)["TurnId"].tolist() == [0, 1, 2, 3]
+        writer.append(_turn(10))
+    assert pd.read_parquet(log_file)["TurnId"].tolist() == [0, 1, 2, 3, 10]
+    assert [p.name for p in tmp_path.iterdir()] == ["turns.parquet"]
@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from unconscious_gravity.por_log_writer import PoRLogWriter
+from unconscious_gravity_exp.logger import TurnLogWriter
+from unconscious_gravity_exp.pipeline import Pipeline, Stage, build_por_pipeline
+
+
+class FakeSampler:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def sample(self, prompt, n=1):
+        time.sleep(self.delay)
+        return [f"{prompt} answer {i}" + (" Q" if i == 0 else "") for i in range(n)]
+
+
+def fake_score(question, context, time_score):
+    return {"E": 0.9 if question.endswith("Q") else 0.1, "Q": 0.5, "S_q": 0.4, "t": time_score, "sim": 0.0}
+
+
+def test_pipeline_overlaps_slow_stage_workers():
+    out = []
+    pipeline = Pipeline([
+        Stage("slow", lambda x: time.sleep(0.05) or x * 2, workers=8),
+        Stage("sink", out.append),
+    ])
+    started = time.perf_counter()
+    stats = pipeline.run(range(16))
+
+    assert sorted(out) == [x * 2 for x in range(16)]
+    assert time.perf_counter() - started < 16 * 0.05 / 2
+    assert stats["slow"]["processed"] == 16 and stats["sink"]["processed"] == 16
+    assert stats["slow"]["throughput"] > 0
+
+
+def test_bounded_queues_apply_backpressure():
+    consumed = []
+    produced = []
+    gate = threading.Event()
+
+    def source():
+        for i in range(20):
+            produced.append(i)
+            yield i
+
+    def slow_sink(x):
+        gate.wait(5)
+        consumed.append(x)
+
+    pipeline = Pipeline([Stage("pass", lambda x: x, queue_size=2), Stage("sink", slow_sink, queue_size=2)])
+    runner = threading.Thread(target=pipeline.run, args=(source(),))
+    runner.start()
+    time.sleep(0.2)
+    # One item in the sink, two queued for it, one held by "pass", two queued for "pass" (+1 being put).
+    assert len(produced) <= 7
+    assert pipeline.stats()["sink"]["queue_depth"] == 2
+    gate.set()
+    runner.join()
+
+    stats = pipeline.stats()
+    assert sorted(consumed) == list(range(20))
+    assert stats["pass"]["max_queue_depth"] <= 2 and stats["sink"]["max_queue_depth"] <= 2
+    assert stats["pass"]["blocked_s"] > 0
+
+
+def test_stage_errors_are_counted_and_dropped():
+    out = []
+
+    def picky(x):
+        if x % 3 == 0:
+            raise ValueError(x)
+        return x
+
+    stats = Pipeline([Stage("picky", picky, workers=2), Stage("sink", out.append)]).run(range(9))
+    assert sorted(out) == [1, 2, 4, 5, 7, 8]
+    assert stats["picky"]["errors"] == 3 and stats["sink"]["processed"] == 6
+
+
+def test_source_errors_stop_pipeline():
+    def source():
+        yield 1
+        raise RuntimeError("source failed")
+
+    with pytest.raises(RuntimeError):
+        Pipeline([Stage("a", lambda x: x, workers=3)]).run(source())
+
+
+def test_stage_validation():
+    with pytest.raises(ValueError):
+        Stage("a", lambda x: x, workers=0)
+    with pytest.raises(ValueError):
+        Pipeline([Stage("a", lambda x: x), Stage("a", lambda x: x)])
+
+
+def test_por_pipeline_logs_scored_detections(tmp_path):
+    log_path = tmp_path / "por_log.jsonl"
+    with PoRLogWriter(str(log_path), buffer_size_limit=1000) as writer:
+        pipeline = build_por_pipeline(FakeSampler(delay=0.01), fake_score, writer, n=2, sample_workers=4)
+        stats = pipeline.run(["p1", "p2", {"prompt": "p3", "context": "ctx", "time_score": 0.5}])
+
+    entries = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert len(entries) == 6
+    assert {e["prompt"] for e in entries} == {"p1", "p2", "p3"}
+    by_question = {e["question"]: e for e in entries}
+    marked = by_question["p3 answer 0 Q"]
+    assert marked["fired"] and marked["PoR_flag"] == 1 and marked["context"] == "ctx" and marked["time_score"] == 0.5
+    assert not by_question["p3 answer 1"]["fired"] and by_question["p3 answer 1"]["PoR_flag"] == 0
+    assert all(0.0 < e["intensity"] < 1.0 for e in entries)
+    assert [stats[s]["processed"] for s in ("sample", "score", "detect", "log")] == [3, 3, 3, 3]
+    assert "sample" in pipeline.format_stats()
+
+
+def test_por_pipeline_writes_turn_logs(tmp_path):
+    path = tmp_path / "turns.parquet"
+    with TurnLogWriter(str(path)) as writer:
+        build_por_pipeline(FakeSampler(), fake_score, writer, n=3).run([f"p{i}" for i in range(4)])
+
+    df = pd.read_parquet(path)
+    assert len(df) == 12
+    assert sorted(df["TurnId"]) == list(range(1, 13))
+    assert set(df["Prompt"]) == {"p0", "p1", "p2", "p3"}
+    assert (df.loc[df["Response"].str.endswith("Q"), "M"] == 0.9).all()
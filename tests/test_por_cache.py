@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from models.por_cache import ResultCache
+from models.por_simulator import PoRSimulator
+from PoR_eval import evaluate_por
+
+
+def test_simulation_cache_hit_is_memory_mapped(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"))
+    first = PoRSimulator(seed=2).simulate_distribution_parallel(n=500, chunk_size=200, cache=cache)
+
+    sim = PoRSimulator(seed=2)
+    monkeypatch.setattr(sim, "iter_chunks", lambda *a, **k: (_ for _ in ()).throw(AssertionError("recomputed")))
+    out = tmp_path / "out.csv"
+    second = sim.simulate_distribution_parallel(n=500, chunk_size=200, cache=cache, output_file=str(out))
+
+    assert isinstance(second.base, np.memmap)
+    assert np.array_equal(first, second)
+    assert np.allclose(pd.read_csv(out)["E"], first)
+
+
+def test_simulation_cache_key_depends_on_inputs(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    a = PoRSimulator(seed=2).simulate_distribution_parallel(n=100, cache=cache)
+    b = PoRSimulator(seed=3).simulate_distribution_parallel(n=100, cache=cache)
+    c = PoRSimulator(seed=2).simulate_distribution_parallel(n=100, q_range=(0.5, 1.0), cache=cache)
+
+    assert not np.array_equal(a, b)
+    assert not np.array_equal(a, c)
+    assert len(list((tmp_path / "cache").glob("*/*.npy"))) == 3
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=2500)
+    cache.put_array("aa" + "0" * 62, np.zeros(100))
+    cache.put_array("bb" + "0" * 62, np.zeros(100))
+    assert cache.get_array("aa" + "0" * 62) is not None  # refresh "aa"
+    cache.put_array("cc" + "0" * 62, np.zeros(100))
+
+    assert cache.get_array("bb" + "0" * 62) is None
+    assert cache.get_array("aa" + "0" * 62) is not None
+    assert cache.size() <= 2500
+
+
+def test_cache_only_scans_when_over_the_cap(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=2500)
+    evictions = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: evictions.append(1) or evict())
+
+    cache.put_array("aa" + "0" * 62, np.zeros(100))
+    cache.put_array("aa" + "0" * 62, np.ones(100))  # overwriting does not grow the store
+    cache.put_array("bb" + "0" * 62, np.zeros(100))
+    assert evictions == []
+    cache.discard("bb" + "0" * 62, ".npy")
+    cache.put_array("cc" + "0" * 62, np.zeros(100))
+    assert evictions == []
+
+    cache.put_array("dd" + "0" * 62, np.zeros(100))
+    assert evictions == [1]
+    assert cache.size() <= 2500
+
+
+def test_entries_removed_concurrently_are_misses(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=1500)
+    cache.put_array("aa" + "0" * 62, np.zeros(100))
+    cache.put_table("bb" + "0" * 62, pd.DataFrame({"x": [1, 2]}))
+
+    # Another process evicts the entry right after the hit refreshed it.
+    hit = cache._hit
+    monkeypatch.setattr(cache, "_hit", lambda path: hit(path) and (path.unlink() or True))
+    assert cache.get_array("aa" + "0" * 62) is None
+    assert cache.get_table("bb" + "0" * 62) is None
+    monkeypatch.undo()
+
+    cache.put_array("cc" + "0" * 62, np.zeros(100))
+    glob = type(cache.root).glob
+    monkeypatch.setattr(type(cache.root), "glob",
+                        lambda self, pattern: [self / "zz" / "vanished.npy", *glob(self, pattern)])
+    cache.put_array("dd" + "0" * 62, np.zeros(100))
+    assert cache.size() <= 1500
+    cache.clear()
+    assert cache.size() == 0
+
+
+def test_evaluate_por_cache_invalidated_by_file_change(tmp_path, capsys):
+    cache = ResultCache(str(tmp_path / "cache"))
+    path = tmp_path / "eval.csv"
+    pd.DataFrame({"question": ["a", "b"], "Q": [1.0, 0.1], "S_q": [1.0, 0.1], "t": [1.0, 0.1]}).to_csv(path, index=False)
+
+    first = evaluate_por(str(path), cache=cache)
+    pd.testing.assert_frame_equal(evaluate_por(str(path), cache=cache), first)
+
+    pd.DataFrame({"question": ["a"], "Q": [0.1], "S_q": [0.1], "t": [0.1]}).to_csv(path, index=False)
+    assert len(evaluate_por(str(path), cache=cache)) == 1
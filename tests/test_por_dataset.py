@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ugher_exp.cosine_shift import CosineShiftStage
+from ugher_exp.por_dataset import detect_dataset, resolve_shards
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def make_shards(root: Path):
+    for hour in range(3):
+        shard = root / "date=2025-01-01" / f"hour={hour:02d}.parquet"
+        shard.parent.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(
+            {"cosine_shift": [0.1 * hour, 0.5, 0.0], "curr_resp": ["a", "b", "Q"]}
+        ).to_parquet(shard)
+    pd.DataFrame({"cosine_shift": [0.9], "curr_resp": ["x"]}).to_csv(root / "extra.csv", index=False)
+
+
+def test_detect_dataset_mirrors_layout_and_skips_up_to_date(tmp_path):
+    src, out = tmp_path / "logs", tmp_path / "out"
+    make_shards(src)
+
+    stats = detect_dataset(str(src), str(out), workers=2)
+    assert stats["shards"] == 4 and stats["processed"] == 4
+    assert stats["rows"] == 10 and stats["flags"] == 3 * 2 + 1
+    assert (out / "date=2025-01-01" / "hour=02.parquet").exists()
+    assert "PoR_flag" in pd.read_csv(out / "extra.csv").columns
+
+    again = detect_dataset(str(src), str(out))
+    assert again["processed"] == 0 and again["skipped"] == 4
+
+    touched = src / "date=2025-01-01" / "hour=01.parquet"
+    future = os.stat(out / "date=2025-01-01" / "hour=01.parquet").st_mtime + 10
+    os.utime(touched, (future, future))
+    assert detect_dataset(str(src), str(out))["processed"] == 1
+
+
+def test_output_dir_inside_input_is_not_scanned(tmp_path):
+    make_shards(tmp_path)
+    out = tmp_path / "out"
+    assert detect_dataset(str(tmp_path), str(out))["shards"] == 4
+    again = detect_dataset(str(tmp_path), str(out))
+    assert again["shards"] == 4 and again["processed"] == 0
+    assert not (out / "out").exists()
+
+
+def length_embed(texts):
+    return np.array([[len(t), 1.0] for t in texts])
+
+
+def test_detect_dataset_computes_missing_cosine_shift(tmp_path):
+    src, out = tmp_path / "logs", tmp_path / "out"
+    src.mkdir()
+    for name in ("a", "b"):
+        pd.DataFrame({"session_id": [1, 1], "curr_resp": ["x", "xxxxxxxx"]}).to_parquet(src / f"{name}.parquet")
+
+    for workers in (1, 2):
+        stats = detect_dataset(str(src), str(out), workers=workers, force=True,
+                               shift_stage=CosineShiftStage(length_embed))
+        assert stats["processed"] == 2
+        for name in ("a", "b"):
+            shifts = pd.read_parquet(out / f"{name}.parquet")["cosine_shift"]
+            # The first turn of every shard starts a new session.
+            assert shifts[0] == 0.0 and shifts[1] > 0.0
+
+
+def test_resolve_shards_glob(tmp_path):
+    make_shards(tmp_path)
+    root, shards = resolve_shards(str(tmp_path / "**" / "*.parquet"))
+    assert root == tmp_path / "date=2025-01-01"
+    assert len(shards) == 3
+
+
+def test_cli_dataset_mode(tmp_path):
+    make_shards(tmp_path / "logs")
+    result = subprocess.run(
+        [sys.executable, "-m", "ugher_exp.por_detector", "-i", str(tmp_path / "logs"), "-o", str(tmp_path / "out"), "-w", "2"],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "PYTHONPATH": "src"},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "4/4 shards processed" in result.stdout
+    assert "7 PoR flags in 10 rows" in result.stdout
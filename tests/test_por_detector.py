@@ -1,7 +1,8 @@
 import pandas as pd
+import pyarrow.parquet as pq
 from pandas.testing import assert_series_equal
 
-from ugher_exp.por_detector import detect_pors, THRESHOLD, sigmoid
+from ugher_exp.por_detector import detect_pors, detect_pors_arrow, detect_pors_stream, THRESHOLD, sigmoid
 
 MARKER = "\ue001Q\ue001"
 
@@ -44,3 +45,80 @@ def test_detect_pors_parquet(tmp_path):
 
     assert_series_equal(result["PoR_flag"], expected_flags(df), check_names=False)
     assert_series_equal(result["intensity"], expected_intensity(df), check_names=False)
+
+
+def make_large_df(n=1000):
+    return pd.DataFrame(
+        {
+            "cosine_shift": [(i % 10) / 10 for i in range(n)],
+            "curr_resp": [f"resp {i} {MARKER}" if i % 7 == 0 else f"resp {i}" for i in range(n)],
+        }
+    )
+
+
+def test_detect_pors_stream_matches_batch(tmp_path):
+    df = make_large_df()
+    src = tmp_path / "input.parquet"
+    df.to_parquet(src, row_group_size=128)
+
+    for suffix in (".parquet", ".csv"):
+        out = tmp_path / f"output{suffix}"
+        stats = detect_pors_stream(str(src), str(out), batch_size=100)
+
+        expected = detect_pors(str(src))
+        written = pd.read_parquet(out) if suffix == ".parquet" else pd.read_csv(out)
+        assert stats == {"rows": len(df), "flags": int(expected["PoR_flag"].sum())}
+        assert_series_equal(written["PoR_flag"], expected["PoR_flag"], check_dtype=False)
+        assert_series_equal(written["intensity"], expected["intensity"])
+
+
+def test_detect_pors_stream_promotes_column_types_across_batches(tmp_path):
+    src = tmp_path / "input.csv"
+    src.write_text(
+        "cosine_shift,curr_resp,turn,note\n"
+        "0.1,a,1,\n"
+        "0.5,b,2,\n"
+        "0.2,Q,2.5,x\n"
+        "0.9,c,3,y\n"
+    )
+    out = tmp_path / "output.parquet"
+    stats = detect_pors_stream(str(src), str(out), batch_size=2)
+
+    written = pd.read_parquet(out)
+    expected = detect_pors(str(src))
+    assert stats["rows"] == 4
+    assert pq.ParquetFile(out).metadata.num_row_groups == 2
+    assert written["turn"].tolist() == [1.0, 2.0, 2.5, 3.0]
+    assert written["note"].isna().tolist() == [True, True, False, False]
+    assert written["note"].tolist()[2:] == ["x", "y"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["input.csv", "output.parquet"]
+    assert_series_equal(written["PoR_flag"], expected["PoR_flag"], check_dtype=False)
+
+
+def test_arrow_kernel_matches_reference_exactly(tmp_path):
+    shifts = [0.5, -1000.0, 800.0, 0.35, 0.3500001, float("nan"), None, -3.7, 12.25, "bad"]
+    resps = ["hi", None, "Q", "", f"x {MARKER}", "q lower", "QQ", None, "plain", "[Q]"]
+    df = pd.DataFrame({"cosine_shift": shifts, "curr_resp": resps, "other": range(len(shifts))})
+    path = tmp_path / "mixed.csv"
+    df.to_csv(path, index=False)
+
+    reference = pd.read_csv(path)
+    ref_shift = pd.to_numeric(reference["cosine_shift"], errors="coerce").fillna(0.0)
+    ref_flag = ((ref_shift > THRESHOLD) | reference["curr_resp"].fillna("").str.contains("Q")).astype(int)
+    ref_intensity = ref_shift.apply(sigmoid)
+
+    for result in (detect_pors(str(path)), detect_pors_arrow(str(path)).to_pandas()):
+        assert result["PoR_flag"].tolist() == ref_flag.tolist()
+        assert result["intensity"].to_numpy().tobytes() == ref_intensity.to_numpy().tobytes()
+
+
+def test_detect_pors_arrow_reads_only_needed_columns(tmp_path):
+    df = make_large_df(50)
+    df["payload"] = "x" * 100
+    path = tmp_path / "input.parquet"
+    df.to_parquet(path)
+
+    table = detect_pors_arrow(str(path))
+
+    assert table.column_names == ["cosine_shift", "curr_resp", "PoR_flag", "intensity"]
+    assert table.column("PoR_flag").to_pylist() == detect_pors(str(path))["PoR_flag"].tolist()
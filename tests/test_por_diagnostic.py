@@ -34,4 +34,152 @@ def test_generate_report(tmp_path, sample_logs):
     assert "- Total entries: 2" in content
     assert "- Error count: 1" in content
     assert "- Average latency: 100.00 ms" in content
-    assert "- Success rate: 50.0%" in content
\ No newline at end of file
+    assert "- Success rate: 50.0%" in content
+
+def test_analyze_stream_reads_json_and_jsonl(sample_logs, capsys):
+    lines = [
+        json.dumps({"status": "ok", "latency_ms": 10}),
+        "{broken",
+        json.dumps({"status": "ok"}),
+        "",
+    ]
+    (sample_logs / "por_log.jsonl").write_text("\n".join(lines))
+
+    diag = PoRDiagnostic(sample_logs)
+    metrics = diag.analyze_stream()
+
+    assert diag.logs == []
+    assert metrics["total_entries"] == 4
+    assert metrics["error_count"] == 1
+    assert metrics["average_latency_ms"] == pytest.approx((50 + 150 + 10) / 3)
+    assert "por_log.jsonl:2" in capsys.readouterr().out
+
+    diag.load_logs()
+    assert diag.analyze_logs() == metrics
+
+
+def test_read_ranges_split_lines_exactly_once(tmp_path):
+    from por_diagnostics.parallel import plan_reads, read_range
+
+    path = tmp_path / "big.jsonl"
+    lines = [json.dumps({"status": "ok", "i": i, "pad": "x" * (i % 13)}) for i in range(500)]
+    path.write_text("\n".join(lines) + "\n")
+
+    tasks = plan_reads([path], block_bytes=97)
+    assert len(tasks) > 10
+    data = b"".join(read_range(*task) for task in tasks)
+    assert data.decode().splitlines() == lines
+
+
+def test_analyze_parallel_matches_stream(sample_logs, capsys):
+    from por_diagnostics.parallel import aggregate_parallel
+
+    entries = [{"status": "ok" if i % 4 else "error", "latency_ms": i} for i in range(300)]
+    (sample_logs / "por_log.jsonl").write_text("\n".join(json.dumps(e) for e in entries) + "\nnot json\n")
+
+    diag = PoRDiagnostic(sample_logs)
+    expected = diag.analyze_stream()
+    capsys.readouterr()
+
+    assert diag.analyze_parallel(workers=2) == expected
+    assert aggregate_parallel(diag.log_files(), workers=2, block_bytes=256).to_metrics() == pytest.approx(expected)
+    out = capsys.readouterr().out
+    assert "invalid.json" in out
+    assert "por_log.jsonl" in out
+
+
+def test_analyze_incremental_rereads_only_changed_files(sample_logs, tmp_path, monkeypatch):
+    manifest = tmp_path / "state" / "manifest.json"
+    diag = PoRDiagnostic(sample_logs)
+    first = diag.analyze_incremental(manifest)
+    assert first == diag.analyze_stream()
+
+    read = []
+    original = PoRDiagnostic.iter_file_entries
+
+    def tracking(filepath):
+        read.append(filepath.name)
+        return original(filepath)
+
+    monkeypatch.setattr(PoRDiagnostic, "iter_file_entries", staticmethod(tracking))
+
+    assert diag.analyze_incremental(manifest) == first
+    assert read == []
+
+    read.clear()
+    (sample_logs / "log3.json").write_text(json.dumps({"status": "ok", "latency_ms": 100}))
+    (sample_logs / "log1.json").unlink()
+    metrics = diag.analyze_incremental(manifest, workers=1)
+    assert read == ["log3.json"]
+    assert metrics["total_entries"] == 2
+    assert metrics["average_latency_ms"] == pytest.approx(125)
+
+
+def test_quantile_sketch_relative_error_and_merge():
+    from por_diagnostics.sketch import QuantileSketch
+
+    values = [float(v) for v in range(1, 10001)]
+    left, right = QuantileSketch(0.01), QuantileSketch(0.01)
+    for v in values[::2]:
+        left.add(v)
+    for v in values[1::2]:
+        right.add(v)
+    sketch = QuantileSketch.from_dict(json.loads(json.dumps(left.merge(right).to_dict())))
+
+    assert sketch.count == len(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.01)
+    assert sketch.quantile(1.0) == 10000
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_percentiles_and_time_buckets_in_reports(tmp_path):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    entries = [
+        {"status": "ok" if i % 10 else "error", "latency_ms": i + 1,
+         "timestamp": f"2024-05-01T{10 + i // 60:02d}:{i % 60:02d}:30"}
+        for i in range(120)
+    ]
+    (log_dir / "por_log.jsonl").write_text("\n".join(json.dumps(e) for e in entries))
+
+    diag = PoRDiagnostic(log_dir)
+    metrics = diag.analyze_stream()
+    assert metrics["latency_p50_ms"] == pytest.approx(60, rel=0.02)
+    assert metrics["latency_p99_ms"] == pytest.approx(119, rel=0.02)
+    assert metrics["latency_max_ms"] == 120
+    assert [b["start"] for b in metrics["per_hour"]] == ["2024-05-01T10:00", "2024-05-01T11:00"]
+    assert [b["count"] for b in metrics["per_hour"]] == [60, 60]
+    assert metrics["per_hour"][0]["error_count"] == 6
+    assert len(metrics["per_minute"]) == 120
+    assert diag.analyze_parallel(workers=2) == metrics
+
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    diag.run(out_dir)
+    report = (out_dir / "por_eval_result.md").read_text()
+    assert "- Latency max: 120.00 ms" in report
+    assert "| 2024-05-01T11:00 | 60 | 6 |" in report
+    assert json.loads((out_dir / "por_eval_result.json").read_text()) == metrics
+
+
+def test_utc_z_and_offset_timestamps_share_buckets(tmp_path):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    entries = [
+        {"status": "ok", "latency_ms": 1, "timestamp": "2024-05-01T10:15:00Z"},
+        {"status": "ok", "latency_ms": 2, "timestamp": "2024-05-01T12:15:30+02:00"},
+        {"status": "ok", "latency_ms": 3, "timestamp": "not a time"},
+        {"status": "ok", "latency_ms": 4},
+    ]
+    (log_dir / "por_log.jsonl").write_text("\n".join(json.dumps(e) for e in entries))
+
+    diag = PoRDiagnostic(log_dir)
+    metrics = diag.analyze_stream()
+    assert metrics["per_minute"] == [
+        {**metrics["per_minute"][0], "start": "2024-05-01T10:15", "count": 2}
+    ]
+    assert metrics["timestamp_errors"] == 1
+    assert diag.analyze_parallel(workers=2) == metrics
+    assert diag.analyze_incremental(tmp_path / "manifest.json") == metrics
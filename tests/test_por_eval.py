@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from PoR_eval import THRESHOLD, evaluate_por, evaluate_por_chunked, round_decimals
+
+
+@pytest.fixture
+def eval_csv(tmp_path):
+    df = pd.DataFrame(
+        {
+            "question": [f"q{i}" for i in range(10)],
+            "Q": [0.9, 0.2, 1.0, 0.8, 0.5, 0.95, 0.1, 0.7, 1.0, 0.6],
+            "S_q": [0.9, 0.5, 1.0, 0.9, 0.5, 0.9, 0.3, 0.8, 0.6, 0.9],
+            "t": [0.9, 0.5, 0.6, 0.9, 1.0, 0.8, 0.2, 0.9, 0.9, 0.95],
+        }
+    )
+    path = tmp_path / "eval.csv"
+    df.to_csv(path, index=False)
+    return path, df
+
+
+def test_evaluate_por_flags(eval_csv, capsys):
+    path, df = eval_csv
+    result = evaluate_por(str(path))
+
+    E = df["Q"] * df["S_q"] * df["t"]
+    assert list(result["PoR_fired"]) == ["✅" if e >= THRESHOLD else "❌" for e in E]
+    assert list(result["E"]) == [round(e, 4) for e in E]
+    assert "question" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_evaluate_por_chunked_matches_full(eval_csv, tmp_path, suffix, capsys):
+    path, df = eval_csv
+    out = tmp_path / f"result{suffix}"
+
+    summary = evaluate_por_chunked(str(path), str(out), chunksize=3, verbose=False)
+
+    full = evaluate_por(str(path))
+    written = pd.read_csv(out) if suffix == ".csv" else pd.read_parquet(out)
+    pd.testing.assert_frame_equal(written, full)
+    assert summary["rows"] == 10
+    assert summary["fired"] == (full["PoR_fired"] == "✅").sum()
+    assert summary["E_max"] == pytest.approx((df["Q"] * df["S_q"] * df["t"]).max())
+
+
+def test_e_is_rounded_like_builtin_round(tmp_path, capsys):
+    path = tmp_path / "eval.csv"
+    pd.DataFrame({"question": ["a", "b"], "Q": [0.00125, 0.12345], "S_q": [1.0, 1.0], "t": [1.0, 1.0]}).to_csv(path, index=False)
+    result = evaluate_por(str(path))
+    assert list(result["E"]) == [round(0.00125, 4), round(0.12345, 4)] == [0.0013, 0.1235]
+
+
+def test_round_decimals_matches_builtin_round():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        rng.random(20_000),
+        -3 * rng.random(20_000),
+        np.round(rng.random(20_000), 5),  # near-ties at the fifth decimal
+        [0.00125, 0.12345, 0.03125, -0.03125, 5e-05, -1e-05, 1e20, np.nan, np.inf],
+    ])
+    expected = np.array([round(v, 4) for v in values.tolist()])
+    np.testing.assert_array_equal(round_decimals(values, 4), expected)
+
+
+@pytest.mark.parametrize("in_suffix", [".csv", ".parquet"])
+@pytest.mark.parametrize("out_suffix", [".csv", ".parquet"])
+def test_evaluate_por_chunked_empty_input_writes_header(tmp_path, in_suffix, out_suffix):
+    empty = pd.DataFrame({"question": pd.Series(dtype=str), "Q": [], "S_q": [], "t": []})
+    path = tmp_path / f"eval{in_suffix}"
+    empty.to_csv(path, index=False) if in_suffix == ".csv" else empty.to_parquet(path)
+    out = tmp_path / f"result{out_suffix}"
+
+    summary = evaluate_por_chunked(str(path), str(out), verbose=False)
+
+    written = pd.read_csv(out) if out_suffix == ".csv" else pd.read_parquet(out)
+    assert list(written.columns) == ["question", "Q", "S_q", "t", "E", "PoR_fired"]
+    assert len(written) == 0
+    assert summary["rows"] == 0 and summary["firing_rate"] is None
+
+
+def test_evaluate_por_chunked_parquet_mixed_int_and_float_chunks(tmp_path):
+    path = tmp_path / "eval.csv"
+    path.write_text("question,Q,S_q,t\na,1,1,1\nb,1,1,1\nc,0.5,1,1\n")
+    out = tmp_path / "result.parquet"
+
+    summary = evaluate_por_chunked(str(path), str(out), chunksize=2, verbose=False)
+
+    written = pd.read_parquet(out)
+    assert summary["rows"] == 3
+    assert written["Q"].tolist() == [1.0, 1.0, 0.5]
+    assert written["E"].tolist() == [1.0, 1.0, 0.5]
+    assert (written.dtypes[["Q", "S_q", "t", "E"]] == "float64").all()
@@ -0,0 +1,209 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from unconscious_gravity.por_log_compaction import compact_logs, compaction_inputs
+from unconscious_gravity.por_log_sinks import JSONLSink, read_log, shard_files, shard_path
+from unconscious_gravity.por_log_writer import PoRLogWriter
+from unconscious_gravity_exp.logger import TurnLogWriter, append_log, compact_turn_logs
+from unconscious_gravity_exp.proxy_config import TurnLog
+
+
+def _log_from_worker(log_path, worker):
+    with PoRLogWriter(log_path, buffer_size_limit=7, shard=True) as writer:
+        for i in range(20):
+            writer.log_results([(f"w{worker}-{i}", 0.7)], "ctx", 0.9, 0.5, extra_data={"worker": worker})
+    return os.getpid()
+
+
+def _turns_from_worker(log_path, worker):
+    with TurnLogWriter(log_path, row_group_size=3, shard=True) as writer:
+        for i in range(5):
+            writer.append(TurnLog(TurnId=worker * 100 + i, Prompt="p", Response="r",
+                                  Q_self=0.5, S_q=0.5, t_total=1, M=0.0))
+    append_log(TurnLog(TurnId=worker * 100 + 99, Prompt="p", Response="r",
+                       Q_self=0.5, S_q=0.5, t_total=1, M=0.0), file=log_path, shard=True)
+
+
+def test_shard_path_and_discovery(tmp_path):
+    path = str(tmp_path / "por_log.jsonl")
+    assert shard_path(path, "host-1") == str(tmp_path / "por_log.host-1.jsonl")
+    for name in ("por_log.jsonl", "por_log.a-1.jsonl", "por_log.b-2.jsonl", "por_log.a-1.jsonl.20240101_000000"):
+        (tmp_path / name).write_text("")
+    assert [os.path.basename(p) for p in shard_files(path)] == ["por_log.jsonl", "por_log.a-1.jsonl", "por_log.b-2.jsonl"]
+    assert compaction_inputs(path) == [[str(tmp_path / "por_log.a-1.jsonl.20240101_000000")]]
+
+
+def test_processes_log_to_shards_and_compact(tmp_path):
+    path = str(tmp_path / "logs" / "por_log.jsonl")
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        pids = list(pool.map(_log_from_worker, [path] * 3, range(3)))
+
+    shards = shard_files(path)
+    assert len(shards) == len(set(pids))
+    assert not os.path.exists(path)
+
+    out_dir = str(tmp_path / "compacted")
+    stats = compact_logs(path, out_dir, fmt="parquet", include_active=True)
+    assert stats["entries"] == 60
+    assert shard_files(path) == []
+
+    partitions = os.listdir(out_dir)
+    assert partitions == [f"date={pd.Timestamp.now():%Y-%m-%d}"]
+    entries = list(read_log(os.path.join(out_dir, partitions[0], "por_log.parquet")))
+    timestamps = [e["timestamp"] for e in entries]
+    assert timestamps == sorted(timestamps)
+    assert sorted(e["question"] for e in entries) == sorted(f"w{w}-{i}" for w in range(3) for i in range(20))
+
+
+def test_compaction_partitions_by_date_and_merges_earlier_output(tmp_path):
+    path = str(tmp_path / "por_log.jsonl")
+
+    def entry(day, minute, shard):
+        return {"question": f"{shard}-{day}-{minute}", "score": 0.1, "context": "c",
+                "timestamp": f"2024-05-{day:02d}T12:{minute:02d}:00", "time_score": 1.0,
+                "threshold": 0.5, "fired": False}
+
+    for shard in ("a-1", "b-2"):
+        with JSONLSink(shard_path(path, shard), normalize=True) as sink:
+            sink.write([entry(1, m, shard) for m in range(0, 60, 20)])
+            sink.rotate()
+            sink.write([entry(2, m, shard) for m in range(shard == "b-2", 60, 20)])
+            sink.rotate()
+
+    out_dir = str(tmp_path / "out")
+    assert compact_logs(path, out_dir)["partitions"] == 2
+    with JSONLSink(shard_path(path, "a-1")) as sink:
+        sink.write([entry(2, 59, "late")])
+        sink.rotate()
+    compact_logs(path, out_dir)
+
+    day2 = [e["question"] for e in read_log(os.path.join(out_dir, "date=2024-05-02", "por_log.jsonl"))]
+    assert day2 == ["a-1-2-0", "b-2-2-1", "a-1-2-20", "b-2-2-21", "a-1-2-40", "b-2-2-41", "late-2-59"]
+    assert len(list(read_log(os.path.join(out_dir, "date=2024-05-01", "por_log.jsonl")))) == 6
+    assert sorted(os.listdir(tmp_path)) == ["out"]
+
+
+def _partition_files(out_dir):
+    return sorted(p for p in Path(out_dir).glob("date=*/*.parquet"))
+
+
+def test_turn_log_shards_compact_in_shard_order(tmp_path):
+    path = str(tmp_path / "turns.parquet")
+    out_dir = tmp_path / "compacted"
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        list(pool.map(_turns_from_worker, [path] * 2, range(2)))
+
+    assert compact_turn_logs(path, str(out_dir)) == 12
+    (partition,) = _partition_files(out_dir)
+    assert partition.name == "turns.parquet" and partition.parent.name.startswith("date=")
+    compacted = pd.read_parquet(partition)
+    ids = compacted["TurnId"].tolist()
+    # Colliding TurnIds across processes are kept apart: each shard stays contiguous and in order.
+    shards = [[0, 1, 2, 3, 4, 99], [100, 101, 102, 103, 104, 199]]
+    assert ids in (shards[0] + shards[1], shards[1] + shards[0])
+    assert compacted["timestamp"].is_monotonic_increasing
+    assert os.listdir(tmp_path) == ["compacted"]
+
+    # A later run merges new rows into the existing partition.
+    append_log(TurnLog(TurnId=500, Prompt="p", Response="r", Q_self=0.5, S_q=0.5, t_total=1, M=0.0), file=path)
+    assert compact_turn_logs(path, str(out_dir)) == 1
+    assert pd.read_parquet(partition)["TurnId"].tolist() == ids + [500]
+
+
+def test_turn_log_compaction_skips_in_use_shards_and_unrelated_files(tmp_path):
+    path = str(tmp_path / "turns.parquet")
+    out_dir = str(tmp_path / "compacted")
+    turn = TurnLog(TurnId=1, Prompt="p", Response="r", Q_self=0.5, S_q=0.5, t_total=1, M=0.0)
+    append_log(turn, file=str(tmp_path / "turns.a-1.parquet"))
+    append_log(turn, file=str(tmp_path / "turns_backup.parquet"))
+    append_log(turn, file=str(tmp_path / "turns.old.copy.parquet"))
+
+    writer = TurnLogWriter(path, row_group_size=1, shard=True)
+    writer.append(turn)  # flushed into a part: this process's shard is still being written
+    try:
+        assert compact_turn_logs(path, out_dir) == 1
+    finally:
+        writer.close()
+    assert sorted(os.listdir(tmp_path)) == sorted([
+        "compacted", "turns_backup.parquet", "turns.old.copy.parquet", os.path.basename(writer.path),
+    ])
+    assert compact_turn_logs(path, out_dir) == 1
+    assert sum(len(pd.read_parquet(p)) for p in _partition_files(out_dir)) == 2
+
+
+def test_turn_log_compaction_leaves_active_main_file_alone(tmp_path):
+    path = str(tmp_path / "turns.parquet")
+    out_dir = str(tmp_path / "compacted")
+    turns = [TurnLog(TurnId=i, Prompt="p", Response="r", Q_self=0.5, S_q=0.5, t_total=1, M=0.0) for i in range(4)]
+    with TurnLogWriter(path) as writer:
+        writer.append(turns[0])
+        writer.append(turns[1])
+    append_log(turns[2], file=str(tmp_path / "turns.a-1.parquet"))
+
+    with TurnLogWriter(path, row_group_size=1) as writer:
+        writer.append(turns[3])  # the main file is being written
+        assert compact_turn_logs(path, out_dir) == 1
+    assert pd.read_parquet(path)["TurnId"].tolist() == [0, 1, 3]
+    assert [pd.read_parquet(p)["TurnId"].tolist() for p in _partition_files(out_dir)] == [[2]]
+
+
+def _day_entry(day, minute, shard="a-1"):
+    return {"question": f"{shard}-{day}-{minute}", "score": 0.1, "context": "c",
+            "timestamp": f"2024-05-{day:02d}T12:{minute:02d}:00", "time_score": 1.0,
+            "threshold": 0.5, "fired": False}
+
+
+def _write_rotated(path, entries, shard="a-1"):
+    with JSONLSink(shard_path(path, shard)) as sink:
+        sink.write(entries)
+        sink.rotate()
+
+
+def test_compaction_only_rewrites_touched_partitions(tmp_path):
+    path = str(tmp_path / "por_log.jsonl")
+    out_dir = str(tmp_path / "out")
+    _write_rotated(path, [_day_entry(1, 0), _day_entry(2, 0)])
+    compact_logs(path, out_dir)
+    day1 = os.path.join(out_dir, "date=2024-05-01", "por_log.jsonl")
+    before = os.stat(day1).st_ino
+
+    _write_rotated(path, [_day_entry(2, 30), _day_entry(3, 0)])
+    stats = compact_logs(path, out_dir)
+    assert stats == {"files": 1, "entries": 2, "partitions": 2}
+    assert os.stat(day1).st_ino == before
+    day2 = os.path.join(out_dir, "date=2024-05-02", "por_log.jsonl")
+    assert [e["question"] for e in read_log(day2)] == ["a-1-2-0", "a-1-2-30"]
+
+
+def test_interrupted_compaction_is_finished_without_duplicates(tmp_path, monkeypatch):
+    from unconscious_gravity import por_log_compaction
+
+    path = str(tmp_path / "por_log.jsonl")
+    out_dir = str(tmp_path / "out")
+    _write_rotated(path, [_day_entry(1, m) for m in range(3)])
+
+    # Crash right after the commit point: nothing moved, inputs still present.
+    apply_journal = por_log_compaction._apply_journal
+    monkeypatch.setattr(por_log_compaction, "_apply_journal", lambda out_dir: False)
+    compact_logs(path, out_dir)
+    assert compaction_inputs(path)
+    monkeypatch.setattr(por_log_compaction, "_apply_journal", apply_journal)
+
+    assert compact_logs(path, out_dir)["files"] == 0
+    day1 = os.path.join(out_dir, "date=2024-05-01", "por_log.jsonl")
+    assert len(list(read_log(day1))) == 3
+    assert compaction_inputs(path) == []
+    assert sorted(os.listdir(out_dir)) == ["date=2024-05-01"]
+
+
+def test_kept_inputs_are_not_compacted_twice(tmp_path):
+    path = str(tmp_path / "por_log.jsonl")
+    out_dir = str(tmp_path / "out")
+    _write_rotated(path, [_day_entry(1, m) for m in range(3)])
+    compact_logs(path, out_dir, remove_inputs=False)
+    assert compact_logs(path, out_dir, remove_inputs=False)["files"] == 0
+    assert len(compaction_inputs(path)) == 1
+    assert len(list(read_log(os.path.join(out_dir, "date=2024-05-01", "por_log.jsonl")))) == 3
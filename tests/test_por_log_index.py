@@ -0,0 +1,118 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from unconscious_gravity.por_log_index import load_index, query_time_range
+from unconscious_gravity.por_log_sinks import JSONLSink, iter_log_files, open_log_sink, read_logs
+
+
+def _entries(hour, n):
+    return [
+        {
+            "question": f"q{hour}-{i}",
+            "score": 0.6,
+            "timestamp": f"2024-05-01T{hour:02d}:{i:02d}:00",
+            "context": f"ctx {hour}",
+            "time_score": 0.9,
+            "threshold": 0.5,
+            "fired": True,
+        }
+        for i in range(n)
+    ]
+
+
+def _write(path, **kwargs):
+    with open_log_sink(path, **kwargs) as sink:
+        for hour in range(6):
+            sink.write(_entries(hour, 10))
+            if hour in (1, 3):
+                sink.rotate()
+
+
+@pytest.mark.parametrize("suffix, kwargs", [
+    (".jsonl", {}),
+    (".jsonl", {"normalize": True, "compress_on_rotation": True}),
+    (".arrow", {}),
+    (".parquet", {}),
+])
+def test_query_time_range_matches_full_scan(tmp_path, suffix, kwargs):
+    path = str(tmp_path / f"por_log{suffix}")
+    _write(path, **kwargs)
+    assert len(iter_log_files(path)) == 3
+
+    start, end = "2024-05-01T02:05:00", datetime(2024, 5, 1, 4, 3)
+    expected = [e for e in read_logs(path) if start <= e["timestamp"] < end.isoformat()]
+    result = list(query_time_range(path, start, end))
+    assert result == expected
+    assert len(result) == 5 + 10 + 3
+    assert list(query_time_range(path)) == list(read_logs(path))
+
+
+def test_query_reads_only_overlapping_blocks(tmp_path, monkeypatch):
+    path = str(tmp_path / "por_log.jsonl")
+    with JSONLSink(path, normalize=True) as sink:
+        for hour in range(6):
+            sink.write(_entries(hour, 10))
+
+    blocks, contexts = load_index(path)
+    assert [b["rows"] for b in blocks] == [10] * 6
+    assert blocks[2]["min_ts"] == "2024-05-01T02:00:00"
+    assert len(contexts) == 6
+
+    reads = []
+    original = json.loads
+
+    def counting(data, *args, **kwargs):
+        reads.append(data)
+        return original(data, *args, **kwargs)
+
+    monkeypatch.setattr("unconscious_gravity.por_log_index.json.loads", counting)
+    result = list(query_time_range(path, "2024-05-01T05:00:00"))
+    assert [r["context"] for r in result] == ["ctx 5"] * 10
+    index_lines = 6 + 6  # blocks + contexts in the sidecar
+    assert len(reads) - index_lines == 11  # one block: its context record and entries
+
+
+def test_unindexed_data_is_still_scanned(tmp_path):
+    path = str(tmp_path / "por_log.jsonl")
+    with JSONLSink(path, index=False) as sink:
+        sink.write(_entries(0, 3))
+    with JSONLSink(path) as sink:
+        sink.write(_entries(1, 3))
+
+    assert len(load_index(path)[0]) == 1
+    assert len(list(query_time_range(path, "2024-05-01T00:01:00"))) == 2 + 3
+
+
+def test_stale_index_is_ignored(tmp_path):
+    path = str(tmp_path / "por_log.jsonl")
+    with JSONLSink(path) as sink:
+        sink.write(_entries(0, 5))
+    assert len(load_index(path)[0]) == 1
+
+    # Rewritten without its index (e.g. restored from a backup): the old offsets are meaningless.
+    entries = _entries(3, 2) + _entries(4, 2)
+    with open(path, "w") as f:
+        f.write("".join(json.dumps(e) + "\n" for e in entries))
+    assert load_index(path) == ([], {})
+    assert [e["question"] for e in query_time_range(path, "2024-05-01T04:00:00")] == ["q4-0", "q4-1"]
+
+
+def test_compressed_logs_are_read_forwards(tmp_path, monkeypatch):
+    import gzip
+
+    path = str(tmp_path / "por_log.jsonl")
+    with JSONLSink(path, normalize=True, compress_on_rotation=True) as sink:
+        for hour in range(6):
+            sink.write([{**e, "context": "shared"} for e in _entries(hour, 10)])
+        rotated = sink.rotate()
+    assert rotated.endswith(".gz") and len(load_index(rotated)[0]) == 6
+
+    seeks = []
+    seek = gzip.GzipFile.seek
+    monkeypatch.setattr(gzip.GzipFile, "seek", lambda self, offset, *a: seeks.append(offset) or seek(self, offset, *a))
+    result = list(query_time_range(rotated, "2024-05-01T01:00:00", "2024-05-01T02:00:00"))
+    # The context record lives in the first block, before the one queried.
+    assert [r["context"] for r in result] == ["shared"] * 10
+    assert seeks == sorted(seeks)
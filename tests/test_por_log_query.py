@@ -0,0 +1,102 @@
+import pyarrow as pa
+import pytest
+
+from unconscious_gravity.por_log_query import query_logs
+from unconscious_gravity.por_log_sinks import open_log_sink
+from unconscious_gravity_exp.logger import TurnLogWriter
+from unconscious_gravity_exp.proxy_config import TurnLog
+
+
+def _entries(hour):
+    return [
+        {
+            "question": f"q{hour}-{i}",
+            "score": i / 10,
+            "timestamp": f"2024-05-01T{hour:02d}:{i:02d}:00",
+            "context": "ctx",
+            "time_score": 0.9,
+            "threshold": 0.5,
+            "fired": i >= 5,
+            "model_version": "v2" if hour % 2 else "v1",
+        }
+        for i in range(10)
+    ]
+
+
+def _table(batches):
+    return pa.Table.from_batches(list(batches))
+
+
+@pytest.mark.parametrize("suffix, kwargs", [
+    (".jsonl", {}),
+    (".jsonl", {"normalize": True, "compress_on_rotation": True}),
+    (".parquet", {}),
+    (".parquet", {"extra_columns": ["model_version"]}),
+    (".arrow", {}),
+])
+def test_query_logs_projects_and_filters(tmp_path, suffix, kwargs):
+    path = str(tmp_path / f"por_log{suffix}")
+    with open_log_sink(path, **kwargs) as sink:
+        for hour in range(4):
+            sink.write(_entries(hour))
+            if hour == 1:
+                sink.rotate()
+
+    table = _table(query_logs(
+        path,
+        columns=["question", "score"],
+        filters=[("fired", "==", True), ("model_version", "==", "v2"), ("score", "<", 0.8)],
+        start="2024-05-01T01:06:00",
+    ))
+    assert table.column_names == ["question", "score"]
+    assert table.column("question").to_pylist() == ["q1-6", "q1-7", "q3-5", "q3-6", "q3-7"]
+
+    everything = _table(query_logs(path, columns=["question", "model_version"]))
+    assert everything.num_rows == 40
+    assert everything.column("model_version").to_pylist()[:11] == ["v1"] * 10 + ["v2"]
+
+
+def test_query_logs_over_turn_logs_and_directories(tmp_path):
+    with TurnLogWriter(str(tmp_path / "runs" / "turns.parquet"), row_group_size=5) as writer:
+        for i in range(20):
+            writer.append(TurnLog(TurnId=i, Prompt=f"p{i}", Response="r", Q_self=i / 20, S_q=0.5, t_total=i, M=0.0))
+
+    batches = list(query_logs(str(tmp_path / "runs"), columns=["TurnId"],
+                              filters=[("Q_self", ">=", 0.5), ("TurnId", "not in", [12, 13])], batch_size=4))
+    assert all(b.num_rows <= 4 for b in batches)
+    assert _table(batches).column("TurnId").to_pylist() == [10, 11, 14, 15, 16, 17, 18, 19]
+
+
+def test_query_logs_rejects_unknown_operator(tmp_path):
+    with pytest.raises(ValueError):
+        list(query_logs(str(tmp_path / "por_log.jsonl"), filters=[("score", "~", 1)]))
+
+
+def test_query_logs_keeps_one_schema_when_a_field_is_absent_from_a_batch(tmp_path):
+    path = str(tmp_path / "por_log.jsonl")
+    with open_log_sink(path) as sink:
+        sink.write([{k: v for k, v in e.items() if k != "model_version"} for e in _entries(0)])
+        sink.write(_entries(1))
+
+    batches = list(query_logs(path, columns=["question", "model_version", "score"], batch_size=10))
+    assert len(batches) == 2
+    assert batches[0].schema == batches[1].schema
+    assert batches[0].schema.field("model_version").type == pa.string()
+    table = _table(batches)
+    assert table.column("model_version").to_pylist() == [None] * 10 + ["v2"] * 10
+
+    typed = _table(query_logs(path, columns=["run"], schema=pa.schema([("run", pa.int64())])))
+    assert typed.schema.field("run").type == pa.int64()
+
+
+def test_query_logs_default_columns_match_across_formats(tmp_path):
+    schemas = []
+    for suffix in (".jsonl", ".parquet", ".arrow"):
+        path = str(tmp_path / f"por_log{suffix}")
+        with open_log_sink(path) as sink:
+            sink.write(_entries(0))
+        table = _table(query_logs(path))
+        assert table.num_rows == 10
+        schemas.append(table.schema)
+    assert schemas[0] == schemas[1] == schemas[2]
+    assert schemas[0].names == ["question", "score", "timestamp", "context", "time_score", "threshold", "fired"]
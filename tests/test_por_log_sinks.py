@@ -0,0 +1,147 @@
+import gzip
+import os
+
+import pytest
+
+from unconscious_gravity.por_log_sinks import (
+    ArrowIPCSink,
+    JSONLSink,
+    ParquetSink,
+    iter_log_files,
+    log_format,
+    open_log_sink,
+    read_log,
+    read_logs,
+)
+from unconscious_gravity.por_log_writer import PoRLogWriter
+
+
+def _entries(start, n):
+    return [
+        {
+            "question": f"q{i}",
+            "score": i / 10,
+            "timestamp": f"2024-05-01T10:00:{i:02d}",
+            "context": "ctx",
+            "time_score": 0.9,
+            "threshold": 0.5,
+            "fired": i >= 5,
+            "model_version": "v1",
+            "run": i,
+        }
+        for i in range(start, start + n)
+    ]
+
+
+def test_log_format_handles_rotated_names():
+    assert log_format("logs/por_log.jsonl") == "jsonl"
+    assert log_format("logs/por_log.jsonl.20240101_120000.gz") == "jsonl"
+    assert log_format("logs/por_log.parquet.20240101_120000") == "parquet"
+    assert log_format("logs/por_log.arrow") == "arrow"
+    assert isinstance(open_log_sink("x/por_log.feather"), ArrowIPCSink)
+
+
+def test_jsonl_sink_gzips_rotated_files(tmp_path):
+    path = str(tmp_path / "por_log.jsonl")
+    with JSONLSink(path, max_file_size_mb=0, compress_on_rotation=True) as sink:
+        sink.write(_entries(0, 3))
+        sink.write(_entries(3, 3))
+
+    files = iter_log_files(path)
+    assert files[0].endswith(".gz") and files[-1] == path
+    with gzip.open(files[0], "rt", encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+    assert list(read_logs(path)) == _entries(0, 6)
+
+
+@pytest.mark.parametrize("suffix, sink_cls", [(".parquet", ParquetSink), (".arrow", ArrowIPCSink)])
+def test_columnar_sinks_round_trip(tmp_path, suffix, sink_cls):
+    path = str(tmp_path / f"por_log{suffix}")
+    with sink_cls(path, extra_columns=["model_version"]) as sink:
+        sink.write(_entries(0, 4))
+        sink.write(_entries(4, 4))
+
+    assert sink.schema.field("model_version").type.value_type == "string"
+    assert list(read_log(path)) == _entries(0, 8)
+
+    # Re-opening rotates the finished file away instead of overwriting it.
+    with sink_cls(path) as sink:
+        sink.write(_entries(8, 2))
+    assert len(iter_log_files(path)) == 2
+    assert [e["run"] for e in read_logs(path)] == list(range(10))
+
+
+def test_parquet_sink_writes_one_row_group_per_batch(tmp_path):
+    import pyarrow.parquet as pq
+
+    path = str(tmp_path / "por_log.parquet")
+    writer = PoRLogWriter(path, buffer_size_limit=3)
+    for i in range(7):
+        writer.log_results([(f"q{i}", 0.6)], "ctx", 0.9, 0.5, extra_data={"model_version": "v2"})
+    writer.close()
+
+    assert pq.ParquetFile(path).num_row_groups == 3
+    entries = list(read_log(path))
+    assert len(entries) == 7
+    assert {e["model_version"] for e in entries} == {"v2"}
+    assert os.listdir(tmp_path) == ["por_log.parquet"]
+
+
+@pytest.mark.parametrize("suffix, sink_cls", [(".parquet", ParquetSink), (".arrow", ArrowIPCSink)])
+def test_columnar_file_size_grows_linearly_with_distinct_contexts(tmp_path, suffix, sink_cls):
+    def size(batches):
+        path = str(tmp_path / f"{batches}{suffix}")
+        with sink_cls(path, max_file_size_mb=float("inf")) as sink:
+            for b in range(batches):
+                entries = _entries(0, 5)
+                for entry in entries:
+                    entry["context"] = f"{b:05d}" * 100
+                sink.write(entries)
+        assert len(list(read_log(path))) == 5 * batches
+        return os.path.getsize(path)
+
+    small, large = size(50), size(200)
+    assert large < 4.5 * small
+
+
+def test_normalized_jsonl_writes_each_context_once(tmp_path):
+    from unconscious_gravity.por_log_sinks import LogRecord
+
+    plain_path = str(tmp_path / "plain.jsonl")
+    path = str(tmp_path / "por_log.jsonl")
+    entries = _entries(0, 6)
+    for i, entry in enumerate(entries):
+        entry["run"] = i // 3  # two calls sharing their context fields
+        entry["context"] = "long context " * 50
+    with JSONLSink(plain_path) as sink:
+        sink.write(entries)
+    with JSONLSink(path, normalize=True) as sink:
+        sink.write(entries[:4])
+        sink.write(entries[4:])
+
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()
+    assert len(lines) == 6 + 2
+    assert os.path.getsize(path) < os.path.getsize(plain_path) / 2
+
+    records = list(read_log(path))
+    assert all(isinstance(r, LogRecord) for r in records)
+    assert records == entries
+    raw = list(read_log(path, rehydrate=False))
+    assert set(raw[0]) == {"question", "score", "timestamp", "fired", "_ctx"}
+    assert raw[0]["_ctx"] != raw[3]["_ctx"]
+
+
+def test_normalized_contexts_repeat_after_rotation(tmp_path):
+    path = str(tmp_path / "por_log.jsonl")
+    writer = PoRLogWriter(path, max_file_size_mb=0, buffer_size_limit=2, normalize=True)
+    for i in range(3):
+        writer.log_results([(f"a{i}", 0.4), (f"b{i}", 0.7)], "ctx", 0.9, 0.5, extra_data={"model_version": "v1"})
+    writer.close()
+
+    files = iter_log_files(path)
+    assert len(files) == 3
+    for file in files:
+        records = list(read_log(file))
+        assert [r["model_version"] for r in records] == ["v1", "v1"]
+    assert [r["fired"] for r in read_logs(path)] == [False, True] * 3
@@ -0,0 +1,187 @@
+import json
+import threading
+
+import pytest
+
+from unconscious_gravity.por_log_writer import PoRLogWriter
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_sync_writer_flushes_at_buffer_limit(tmp_path):
+    log_path = tmp_path / "logs" / "por_log.jsonl"
+    writer = PoRLogWriter(str(log_path), buffer_size_limit=3)
+    writer.log_results([("q1", 0.2), ("q2", 0.8)], "ctx", 0.9, 0.5)
+    assert not log_path.exists()
+    writer.log_results([("q3", 0.6)], "ctx", 0.9, 0.5, extra_data={"model_version": "v1"})
+
+    entries = _read(log_path)
+    assert [e["question"] for e in entries] == ["q1", "q2", "q3"]
+    assert [e["fired"] for e in entries] == [False, True, True]
+    assert entries[2]["model_version"] == "v1"
+
+
+def test_async_writer_writes_on_background_thread(tmp_path, monkeypatch):
+    log_path = tmp_path / "por_log.jsonl"
+    threads = set()
+    original = PoRLogWriter._write_entries
+
+    def tracking(self, entries):
+        if entries:
+            threads.add(threading.current_thread().name)
+        return original(self, entries)
+
+    monkeypatch.setattr(PoRLogWriter, "_write_entries", tracking)
+
+    with PoRLogWriter(str(log_path), buffer_size_limit=1000, async_mode=True, flush_interval=60) as writer:
+        writer.log_results([(f"q{i}", 0.1 * i) for i in range(10)], "ctx", 0.5, 0.5)
+        writer.flush()
+        assert len(_read(log_path)) == 10
+        writer.log_results([("last", 1.0)], "ctx", 0.5, 0.5)
+
+    assert [e["question"] for e in _read(log_path)][-1] == "last"
+    assert threads == {"PoRLogWriter"}
+
+
+def test_async_writer_flushes_on_interval(tmp_path):
+    log_path = tmp_path / "por_log.jsonl"
+    writer = PoRLogWriter(str(log_path), buffer_size_limit=1000, async_mode=True, flush_interval=0.05)
+    try:
+        writer.log_results([("q", 1.0)], "ctx", 0.5, 0.5)
+        for _ in range(100):
+            if log_path.exists():
+                break
+            threading.Event().wait(0.02)
+        assert len(_read(log_path)) == 1
+    finally:
+        writer.close()
+
+
+@pytest.mark.parametrize("policy, kept", [("drop_newest", ["q0", "q1"]), ("drop_oldest", ["q3", "q4"])])
+def test_async_writer_backpressure_drops(tmp_path, monkeypatch, policy, kept):
+    log_path = tmp_path / "por_log.jsonl"
+    release = threading.Event()
+    original = PoRLogWriter._writer_loop
+
+    def stalled(self):
+        release.wait()
+        original(self)
+
+    monkeypatch.setattr(PoRLogWriter, "_writer_loop", stalled)
+    writer = PoRLogWriter(str(log_path), async_mode=True, queue_size=2, backpressure=policy)
+    writer.log_results([(f"q{i}", 1.0) for i in range(5)], "ctx", 0.5, 0.5)
+    assert writer.dropped == 3
+    release.set()
+    writer.close()
+
+    assert [e["question"] for e in _read(log_path)] == kept
+
+
+def test_invalid_backpressure_policy():
+    with pytest.raises(ValueError):
+        PoRLogWriter("unused.jsonl", async_mode=True, backpressure="ignore")
+
+
+def test_async_writer_survives_unserialisable_entries(tmp_path):
+    np = pytest.importorskip("numpy")
+    log_path = tmp_path / "por_log.jsonl"
+    writer = PoRLogWriter(str(log_path), async_mode=True, buffer_size_limit=10, queue_size=4, flush_interval=60)
+    writer.log_results([("ok1", 0.9)], "ctx", 0.5, 0.5)
+    writer.log_results([("bad", np.float32(0.7))], "ctx", 0.5, 0.5)
+    writer.log_results([("ok2", 0.1)], "ctx", 0.5, 0.5)
+
+    with pytest.raises(TypeError):
+        writer.flush(timeout=5)
+    assert writer._thread.is_alive()
+    assert writer.failed == 1
+    assert [e["question"] for e in _read(log_path)] == ["ok1", "ok2"]
+
+    # The writer keeps working (and the queue keeps draining) after the error.
+    writer.log_results([(f"q{i}", 0.1) for i in range(20)], "ctx", 0.5, 0.5)
+    writer.close(timeout=5)
+    assert len(_read(log_path)) == 22
+
+
+def test_write_errors_keep_batch_for_retry(tmp_path, monkeypatch):
+    log_path = tmp_path / "por_log.jsonl"
+    writer = PoRLogWriter(str(log_path), async_mode=True, flush_interval=60)
+    original = writer.sink.write
+    failures = iter([OSError("disk full")])
+
+    def flaky(entries):
+        for error in failures:
+            raise error
+        original(entries)
+
+    monkeypatch.setattr(writer.sink, "write", flaky)
+    writer.log_results([("q1", 0.9), ("q2", 0.1)], "ctx", 0.5, 0.5)
+    with pytest.raises(OSError):
+        writer.flush(timeout=5)
+    writer.flush(timeout=5)
+    writer.close(timeout=5)
+    assert [e["question"] for e in _read(log_path)] == ["q1", "q2"]
+    assert writer.failed == 0
+
+
+def test_repeated_write_errors_do_not_grow_retained_batch(tmp_path, monkeypatch):
+    log_path = tmp_path / "por_log.jsonl"
+    writer = PoRLogWriter(
+        str(log_path), async_mode=True, buffer_size_limit=5, queue_size=5,
+        flush_interval=0.05, backpressure="drop_newest",
+    )
+    original = writer.sink.write
+    sizes = []
+    broken = threading.Event()
+    broken.set()
+
+    def failing(entries):
+        sizes.append(len(entries))
+        if broken.is_set():
+            raise OSError("disk full")
+        original(entries)
+
+    monkeypatch.setattr(writer.sink, "write", failing)
+    for i in range(20):
+        writer.log_results([(f"q{i}-{j}", 0.1) for j in range(5)], "ctx", 0.5, 0.5)
+        threading.Event().wait(0.02)
+    with pytest.raises(OSError):
+        writer.flush(timeout=5)
+    assert max(sizes) <= 5
+    assert writer.dropped > 0
+
+    broken.clear()
+    writer.flush(timeout=5)
+    writer.close(timeout=5)
+    assert len(_read(log_path)) == 100 - writer.dropped
+    assert writer.failed == 0
+
+
+def test_close_discards_batch_when_sink_keeps_failing(tmp_path, monkeypatch):
+    log_path = tmp_path / "por_log.jsonl"
+    writer = PoRLogWriter(str(log_path), async_mode=True, buffer_size_limit=2, queue_size=2, flush_interval=60)
+
+    def failing(entries):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(writer.sink, "write", failing)
+    writer.log_results([("q1", 0.9), ("q2", 0.1), ("q3", 0.1), ("q4", 0.1)], "ctx", 0.5, 0.5)
+    with pytest.raises(OSError):
+        writer.close(timeout=5)
+    assert not writer._thread.is_alive()
+    assert writer.failed == 4
+
+
+def test_default_sink_options_are_passed_through(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    jsonl = PoRLogWriter(str(tmp_path / "por_log.jsonl"), compress_on_rotation=True)
+    assert jsonl.sink.compress_on_rotation
+    jsonl.close()
+
+    log_path = tmp_path / "por_log.parquet"
+    writer = PoRLogWriter(str(log_path), extra_columns=["model_version"])
+    writer.log_results([("q", 0.9)], "ctx", 0.5, 0.5, extra_data={"model_version": "v1"})
+    writer.close()
+    assert pq.read_table(log_path).column("model_version").to_pylist() == ["v1"]
@@ -66,6 +66,13 @@ class TestPoRModelCalculations:
             rel_tol=1e-9
         )
 
+    def test_por_collapse_frequency_array_matches_scalar(self):
+        lam = np.array([1.0, 0.5, 2.0])
+        t = np.array([0.0, 2.0, 3.0])
+        expected = [PoRModel.por_collapse_frequency(l, x) for l, x in zip(lam, t)]
+        assert np.allclose(PoRModel.por_collapse_frequency_array(lam, t), expected)
+        assert isinstance(PoRModel.por_collapse_frequency(0.5, 2.0), float)
+
     @pytest.mark.parametrize("I_q,E_m,R_def,theta,expected", [
         (10.0, 5.0, 4.0, 8.0, True),
         (1.0, 1.0, 0.0, 2.0, False),
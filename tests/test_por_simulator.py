@@ -0,0 +1,110 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.por_simulator import PoRSimulator
+
+
+def test_parallel_is_identical_across_worker_counts():
+    serial = PoRSimulator(seed=123).simulate_distribution_parallel(n=2500, chunk_size=400, n_workers=1)
+    parallel = PoRSimulator(seed=123).simulate_distribution_parallel(n=2500, chunk_size=400, n_workers=2)
+
+    assert serial.shape == (2500,)
+    assert np.array_equal(serial, parallel)
+
+
+def test_parallel_does_not_touch_global_state():
+    sim = PoRSimulator()
+    sim.seed = 7
+    state = np.random.get_state()[1].copy()
+    py_state = random.getstate()
+
+    sim.simulate_distribution_parallel(n=100, chunk_size=30)
+
+    assert np.array_equal(np.random.get_state()[1], state)
+    assert random.getstate() == py_state
+
+
+def test_parallel_respects_ranges_and_model():
+    sim = PoRSimulator(seed=1)
+    chunks = list(sim.iter_chunks(n=50, q_range=(0.5, 1.0), s_range=(0.2, 0.4), chunk_size=20))
+
+    assert [len(e) for _, e in chunks] == [20, 20, 10]
+    samples = np.concatenate([s for s, _ in chunks])
+    results = np.concatenate([e for _, e in chunks])
+    assert samples[:, 0].min() >= 0.5
+    assert samples[:, 1].max() <= 0.4
+    assert np.allclose(results, samples[:, 0] * samples[:, 1] * samples[:, 2])
+
+
+def test_parallel_rejects_bad_arguments():
+    sim = PoRSimulator(seed=1)
+    with pytest.raises(ValueError):
+        sim.simulate_distribution_parallel(n=10, n_workers=0)
+    with pytest.raises(ValueError):
+        sim.simulate_distribution_parallel(n=10, distribution="no_such_distribution")
+
+
+def test_stream_summary_matches_materialised_run(tmp_path):
+    kwargs = dict(n=5000, q_range=(0.2, 1.0), chunk_size=700)
+    full = PoRSimulator(seed=5).simulate_distribution_parallel(**kwargs)
+    out = tmp_path / "stream.csv"
+    summary = PoRSimulator(seed=5).simulate_stream(thresholds=(0.1, 0.5), bins=2000, output_file=str(out), **kwargs)
+
+    assert summary.count == len(full)
+    assert summary.mean == pytest.approx(full.mean())
+    assert summary.variance == pytest.approx(full.var())
+    assert summary.firing_rate() == {0.1: pytest.approx((full >= 0.1).mean()), 0.5: pytest.approx((full >= 0.5).mean())}
+    assert summary.quantile(0.5) == pytest.approx(np.quantile(full, 0.5), abs=1e-3)
+    assert summary.hist.sum() == len(full)
+
+    written = pd.read_csv(out)
+    assert len(written) == len(full)
+    assert np.allclose(written["E"], full)
+
+
+def test_summary_merge_equals_single_pass():
+    from models.por_summary import PoRSummary
+
+    values = np.random.default_rng(0).uniform(size=1000)
+    whole = PoRSummary()
+    whole.update(values)
+    left, right = PoRSummary(), PoRSummary()
+    left.update(values[:300])
+    right.update(values[300:])
+    left.merge(right)
+
+    assert left.count == whole.count
+    assert left.mean == pytest.approx(whole.mean)
+    assert left.variance == pytest.approx(whole.variance)
+    assert np.array_equal(left.hist, whole.hist)
+
+
+@pytest.mark.parametrize("suffix", [".npy", ".parquet", ".arrow", ".csv"])
+def test_chunked_sinks_round_trip(tmp_path, suffix):
+    from models.por_sinks import load_results
+
+    out = tmp_path / f"results{suffix}"
+    results = PoRSimulator(seed=9).simulate_distribution_parallel(n=1000, chunk_size=300, output_file=str(out))
+
+    loaded = load_results(str(out))
+    if suffix == ".npy":
+        assert loaded.shape == (1000, 4)
+        column = np.asarray(loaded[:, 3])
+    elif suffix == ".csv":
+        column = loaded["E"].to_numpy()
+    else:
+        assert loaded.num_rows == 1000
+        column = loaded.column("E").to_numpy()
+    assert np.allclose(column, results)
+
+
+def test_parquet_sink_writes_one_row_group_per_chunk(tmp_path):
+    import pyarrow.parquet as pq
+
+    out = tmp_path / "results.parquet"
+    PoRSimulator(seed=9).simulate_stream(n=1000, chunk_size=300, output_file=str(out))
+
+    assert pq.ParquetFile(out).num_row_groups == 4
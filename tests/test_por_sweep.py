@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.por_simulator import PoRSimulator
+from models.por_sweep import PoRSweep
+
+
+@pytest.fixture
+def sweep():
+    return PoRSweep(PoRSimulator(seed=4), n=20_000, block_elements=50_000)
+
+
+def test_grid_matches_direct_computation(sweep):
+    result = sweep.grid(
+        q_ranges=[(0.0, 1.0), (0.5, 1.0)],
+        thresholds=[0.1, 0.3],
+        k=[1.0, 2.0],
+        gamma=[1.0, 2.0],
+    )
+
+    assert len(result) == 16
+    u = sweep.base
+    row = result[(result.q_lo == 0.5) & (result.threshold == 0.1) & (result.k == 2.0) & (result.gamma == 2.0)].iloc[0]
+    q = 0.5 + 0.5 * u[:, 0]
+    energy = q * u[:, 1] * u[:, 2]
+    assert row.firing_rate == pytest.approx((energy >= 0.1).mean())
+    assert row.mean_phase_gradient == pytest.approx((2.0 * energy * u[:, 1] ** 2).mean())
+
+
+def test_grid_firing_rate_monotone_in_threshold(sweep):
+    result = sweep.grid(thresholds=np.linspace(0.0, 1.0, 11))
+    assert (np.diff(result["firing_rate"].to_numpy()) <= 0).all()
+
+
+def test_sensitivity_picks_out_varied_factor(sweep):
+    result = sweep.grid(thresholds=[0.05, 0.2, 0.4], k=[1.0, 3.0])
+    table = PoRSweep.sensitivity(result, "firing_rate")
+
+    first = dict(zip(table.factor, table.first_order))
+    assert first["threshold"] > 0.9
+    assert first["k"] == pytest.approx(0.0)
+
+
+def test_sobol_indices(sweep):
+    table = sweep.sobol({"threshold": (0.0, 0.5), "k": (0.5, 2.0)}, n_design=64, output="firing_rate", seed=0)
+
+    indices = table.set_index("factor")
+    assert indices.loc["threshold", "total_order"] > 0.5
+    assert abs(indices.loc["k", "total_order"]) < 0.05
+
+
+def test_evaluate_rejects_unknown_factor(sweep):
+    with pytest.raises(ValueError):
+        sweep.evaluate(pd.DataFrame({"nope": [1.0]}))
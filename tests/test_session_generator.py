@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from unconscious_gravity_exp.proxy_config import TurnLog
+from unconscious_gravity_exp.session_generator import Q_MARKER, SessionConfig, generate_sessions
+
+
+def test_generate_sessions_writes_turnlog_parts(tmp_path):
+    paths = generate_sessions(str(tmp_path / "sessions"), n_sessions=250, sessions_per_part=100, seed=3)
+
+    assert [p.rsplit("/", 1)[-1] for p in paths] == ["part-00000.parquet", "part-00001.parquet", "part-00002.parquet"]
+    df = pd.read_parquet(tmp_path / "sessions")
+    assert set(TurnLog.__annotations__) <= set(df.columns)
+    assert df["SessionId"].nunique() == 250
+    assert df["TurnId"].is_unique
+
+    first_turns = df.groupby("SessionId").head(1)
+    assert (first_turns["cosine_shift"] == 0.0).all()
+    assert df["cosine_shift"].between(0.0, 1.0).all()
+
+    marked = df["Response"].str.contains(Q_MARKER, regex=False)
+    assert np.array_equal(marked.to_numpy(), (df["E"] >= SessionConfig().marker_threshold).to_numpy())
+
+
+def test_generate_sessions_is_reproducible_across_workers(tmp_path):
+    generate_sessions(str(tmp_path / "a"), n_sessions=120, sessions_per_part=50, seed=11)
+    generate_sessions(str(tmp_path / "b"), n_sessions=120, sessions_per_part=50, seed=11, n_workers=2)
+
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "a"), pd.read_parquet(tmp_path / "b"))